@@ -7,58 +7,109 @@
 
     Module *blackfox* exposes *BlackFox*, a class with all the optimization methods and controls.
 
+    Names are imported lazily on first access (PEP 562), so ``import blackfox`` does not load
+    the REST client, the generated models or optional dependencies until they are used.
+
 """
 
 
 from __future__ import absolute_import
 
-from blackfox_restapi.rest import ApiException
-
-# import models into sdk package
-from blackfox_restapi.models.convergency_criterion import ConvergencyCriterion
-from blackfox_restapi.models.input_config import InputConfig
-from blackfox_restapi.models.input_window_config import InputWindowConfig
-from blackfox_restapi.models.input_window_range_config import InputWindowRangeConfig
-from blackfox_restapi.models.output_config import OutputConfig
-from blackfox_restapi.models.output_window_config import OutputWindowConfig
-from blackfox_restapi.models.output_window_config import OutputWindowConfig
-from blackfox_restapi.models.optimization_engine_config import OptimizationEngineConfig
-from blackfox_restapi.models.range import Range
-from blackfox_restapi.models.range_int import RangeInt
-from blackfox_restapi.models.neural_network_type import NeuralNetworkType
-from blackfox_restapi.models.binary_metric import BinaryMetric
-from blackfox_restapi.models.regression_metric import RegressionMetric
-from blackfox_restapi.models.encoding import Encoding
-from blackfox_restapi.models.neural_network_activation_function import NeuralNetworkActivationFunction
-from blackfox_restapi.models.neural_network_training_algorithm import NeuralNetworkTrainingAlgorithm
-
-# import ann models
-from blackfox_restapi.models.ann_hidden_layer_config import AnnHiddenLayerConfig
-from blackfox_restapi.models.ann_layer_config import AnnLayerConfig
-from blackfox_restapi.models.ann_optimization_config import AnnOptimizationConfig
-from blackfox_restapi.models.ann_optimization_status import AnnOptimizationStatus
-from blackfox_restapi.models.ann_model import AnnModel
-from blackfox_restapi.models.ann_series_optimization_config import AnnSeriesOptimizationConfig
-from blackfox_restapi.models.ann_optimization_engine_config import AnnOptimizationEngineConfig
-from blackfox_restapi.models.optimization_algorithm import OptimizationAlgorithm
-# import rnn models
-from blackfox_restapi.models.rnn_hidden_layer_config import RnnHiddenLayerConfig
-from blackfox_restapi.models.rnn_optimization_config import RnnOptimizationConfig
-from blackfox_restapi.models.rnn_optimization_status import RnnOptimizationStatus
-from blackfox_restapi.models.rnn_model import RnnModel
-# import random forest models
-from blackfox_restapi.models.random_forest_optimization_config import RandomForestOptimizationConfig
-from blackfox_restapi.models.random_forest_optimization_status import RandomForestOptimizationStatus
-from blackfox_restapi.models.random_forest_model import RandomForestModel
-from blackfox_restapi.models.random_forest_series_optimization_config import RandomForestSeriesOptimizationConfig
-from blackfox_restapi.models.random_forest_model_type import RandomForestModelType
-
-# import xgboost models
-from blackfox_restapi.models.xg_boost_optimization_config import XGBoostOptimizationConfig
-from blackfox_restapi.models.xg_boost_optimization_status import XGBoostOptimizationStatus
-from blackfox_restapi.models.xg_boost_model import XGBoostModel
-from blackfox_restapi.models.xg_boost_series_optimization_config import XGBoostSeriesOptimizationConfig
-
-from blackfox.black_fox import BlackFox
-from blackfox.log_writer import LogWriter
-from blackfox.csv_log_writer import CsvLogWriter
\ No newline at end of file
+import importlib
+
+# public name -> module it is imported from
+_exports = {
+    'ApiException': 'blackfox_restapi.rest',
+
+    # models
+    'ConvergencyCriterion': 'blackfox_restapi.models.convergency_criterion',
+    'InputConfig': 'blackfox_restapi.models.input_config',
+    'InputWindowConfig': 'blackfox_restapi.models.input_window_config',
+    'InputWindowRangeConfig': 'blackfox_restapi.models.input_window_range_config',
+    'OutputConfig': 'blackfox_restapi.models.output_config',
+    'OutputWindowConfig': 'blackfox_restapi.models.output_window_config',
+    'OptimizationEngineConfig': 'blackfox_restapi.models.optimization_engine_config',
+    'Range': 'blackfox_restapi.models.range',
+    'RangeInt': 'blackfox_restapi.models.range_int',
+    'NeuralNetworkType': 'blackfox_restapi.models.neural_network_type',
+    'BinaryMetric': 'blackfox_restapi.models.binary_metric',
+    'RegressionMetric': 'blackfox_restapi.models.regression_metric',
+    'Encoding': 'blackfox_restapi.models.encoding',
+    'NeuralNetworkActivationFunction': 'blackfox_restapi.models.neural_network_activation_function',
+    'NeuralNetworkTrainingAlgorithm': 'blackfox_restapi.models.neural_network_training_algorithm',
+
+    # ann models
+    'AnnHiddenLayerConfig': 'blackfox_restapi.models.ann_hidden_layer_config',
+    'AnnLayerConfig': 'blackfox_restapi.models.ann_layer_config',
+    'AnnOptimizationConfig': 'blackfox_restapi.models.ann_optimization_config',
+    'AnnOptimizationStatus': 'blackfox_restapi.models.ann_optimization_status',
+    'AnnModel': 'blackfox_restapi.models.ann_model',
+    'AnnSeriesOptimizationConfig': 'blackfox_restapi.models.ann_series_optimization_config',
+    'AnnOptimizationEngineConfig': 'blackfox_restapi.models.ann_optimization_engine_config',
+    'OptimizationAlgorithm': 'blackfox_restapi.models.optimization_algorithm',
+
+    # rnn models
+    'RnnHiddenLayerConfig': 'blackfox_restapi.models.rnn_hidden_layer_config',
+    'RnnOptimizationConfig': 'blackfox_restapi.models.rnn_optimization_config',
+    'RnnOptimizationStatus': 'blackfox_restapi.models.rnn_optimization_status',
+    'RnnModel': 'blackfox_restapi.models.rnn_model',
+
+    # random forest models
+    'RandomForestOptimizationConfig': 'blackfox_restapi.models.random_forest_optimization_config',
+    'RandomForestOptimizationStatus': 'blackfox_restapi.models.random_forest_optimization_status',
+    'RandomForestModel': 'blackfox_restapi.models.random_forest_model',
+    'RandomForestSeriesOptimizationConfig': 'blackfox_restapi.models.random_forest_series_optimization_config',
+    'RandomForestModelType': 'blackfox_restapi.models.random_forest_model_type',
+
+    # xgboost models
+    'XGBoostOptimizationConfig': 'blackfox_restapi.models.xg_boost_optimization_config',
+    'XGBoostOptimizationStatus': 'blackfox_restapi.models.xg_boost_optimization_status',
+    'XGBoostModel': 'blackfox_restapi.models.xg_boost_model',
+    'XGBoostSeriesOptimizationConfig': 'blackfox_restapi.models.xg_boost_series_optimization_config',
+
+    'BlackFox': 'blackfox.black_fox',
+    'BlackFoxApiClient': 'blackfox.api_client',
+    'keep_alive_socket_options': 'blackfox.api_client',
+    'RetryPolicy': 'blackfox.retry',
+    'CircuitBreaker': 'blackfox.retry',
+    'CircuitOpenError': 'blackfox.retry',
+    'MetricsSink': 'blackfox.instrumentation',
+    'InMemoryMetrics': 'blackfox.instrumentation',
+    'PrometheusExporter': 'blackfox.prometheus_exporter',
+    'TrafficRecorder': 'blackfox.traffic',
+    'TrafficReplay': 'blackfox.traffic',
+    'BufferedWriter': 'blackfox.buffered_writer',
+    'StatusStore': 'blackfox.status_store',
+    'FastDecoder': 'blackfox.decoding',
+    'OnnxPredictor': 'blackfox.inference',
+    'SklearnPredictor': 'blackfox.inference',
+    'XGBoostPredictor': 'blackfox.inference',
+    'load_predictor': 'blackfox.inference',
+    'ModelServer': 'blackfox.serving',
+    'ModelPool': 'blackfox.model_pool',
+    'Ensemble': 'blackfox.ensemble',
+    'predict_file': 'blackfox.batch_predict',
+    'optimize_onnx_model': 'blackfox.onnx_optimization',
+    'compare_onnx_models': 'blackfox.onnx_optimization',
+    'SeriesWindows': 'blackfox.windowing',
+    'Preprocessor': 'blackfox.preprocessing',
+    'LogWriter': 'blackfox.log_writer',
+    'CsvLogWriter': 'blackfox.csv_log_writer',
+    'JsonLinesSink': 'blackfox.bulk_metadata',
+    'ParquetSink': 'blackfox.bulk_metadata'
+}
+
+__all__ = list(_exports)
+
+
+def __getattr__(name):
+    module = _exports.get(name)
+    if module is None:
+        raise AttributeError("module 'blackfox' has no attribute '" + name + "'")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_exports))
@@ -0,0 +1,206 @@
+import time
+import json
+import socket
+import threading
+from blackfox_restapi import rest
+from blackfox_restapi.api_client import ApiClient
+from urllib3.util.retry import Retry
+from urllib3.connection import HTTPConnection
+from blackfox.retry import RetryPolicy, CircuitBreaker
+from blackfox.instrumentation import MetricsSink
+from blackfox.status_records import STATUS_RECORDS
+from blackfox.decoding import FastDecoder, DEFAULT_ENDPOINTS
+
+
+def keep_alive_socket_options(idle=60, interval=10, count=6):
+    """Socket options enabling TCP keep-alive probes on pooled connections.
+
+    Parameters
+    ----------
+    idle : int
+        Seconds a connection is idle before the first probe is sent
+    interval : int
+        Seconds between probes
+    count : int
+        Number of failed probes after which the connection is dropped
+
+    Returns
+    -------
+    list[tuple]
+        socket options usable as BlackFox socket_options
+    """
+    options = list(HTTPConnection.default_socket_options)
+    options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+    # TCP_KEEP* constants are platform specific
+    if hasattr(socket, 'TCP_KEEPIDLE'):
+        options.append((socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, idle))
+    if hasattr(socket, 'TCP_KEEPINTVL'):
+        options.append((socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, interval))
+    if hasattr(socket, 'TCP_KEEPCNT'):
+        options.append((socket.IPPROTO_TCP, socket.TCP_KEEPCNT, count))
+    return options
+
+
+class BlackFoxApiClient(ApiClient):
+    """ApiClient with a tunable urllib3 connection pool, shared by all BlackFox *Api objects.
+
+    Parameters
+    ----------
+    configuration : Configuration
+        Swagger client configuration
+    num_pools : int
+        Number of per-host connection pools kept by the pool manager
+    pool_maxsize : int
+        Number of connections kept alive per host; should be at least the number of threads using the client
+    pool_block : bool
+        If True, requests wait for a free connection instead of opening a throwaway one when the pool is full
+    timeout : float or (float, float)
+        Default (connect, read) timeout in seconds for requests that do not set _request_timeout;
+        a single number is used for both
+    socket_options : list[tuple]
+        Socket options set on new connections, defaults to keep_alive_socket_options()
+    retry_policy : RetryPolicy
+        Policy for retrying failed requests, defaults to RetryPolicy()
+    circuit_breaker : CircuitBreaker
+        Circuit breaker shared by all requests, defaults to CircuitBreaker()
+    metrics : MetricsSink
+        Sink receiving per-endpoint timings, transferred bytes and retries, disabled by default
+    recorder : TrafficRecorder
+        Optional recorder receiving every request/response exchange
+    replay : TrafficReplay
+        Optional recording served instead of sending requests to the service
+    compact_statuses : bool
+        If True, status endpoints are decoded into StatusRecord objects instead of generated models
+    decoder : FastDecoder
+        Decoder of the endpoints bypassing ApiClient.deserialize,
+        defaults to FastDecoder() (without the status endpoints if compact_statuses is False)
+
+    """
+
+    def __init__(self, configuration, num_pools=4, pool_maxsize=16, pool_block=False, timeout=None, socket_options=None,
+                 retry_policy=None, circuit_breaker=None, metrics=None, recorder=None, replay=None,
+                 compact_statuses=False, decoder=None):
+        configuration.connection_pool_maxsize = pool_maxsize
+        # failed requests are retried by retry_policy, urllib3 only follows redirects
+        configuration.retries = Retry(total=None, connect=False, read=False, other=0, redirect=3,
+                                      raise_on_redirect=False)
+        super(BlackFoxApiClient, self).__init__(configuration)
+        # the generated ApiClient does not pass pools_size; its client has not opened a connection yet
+        self.rest_client.pool_manager.clear()
+        self.rest_client = rest.RESTClientObject(configuration, pools_size=num_pools)
+        if socket_options is None:
+            socket_options = keep_alive_socket_options()
+        self.rest_client.pool_manager.connection_pool_kw.update(
+            block=pool_block,
+            socket_options=socket_options
+        )
+        self.timeout = timeout
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.circuit_breaker = circuit_breaker if circuit_breaker is not None else CircuitBreaker()
+        # ServiceHandshake run before the first request, set by BlackFox
+        self.handshake = None
+        self.metrics = metrics if metrics is not None else MetricsSink()
+        # endpoint of the call in progress, used to label request metrics
+        self.current = threading.local()
+        self.recorder = recorder
+        self.replay = replay
+        if decoder is None:
+            decoder = FastDecoder(endpoints=dict((e, t) for e, t in DEFAULT_ENDPOINTS.items()
+                                                 if compact_statuses or t not in STATUS_RECORDS))
+        self.decoder = decoder
+
+    def call_api(self, resource_path, method, *args, **kwargs):
+        # calls nest when the first request triggers the handshake
+        previous = getattr(self.current, 'endpoint', None), getattr(self.current, 'resource', None)
+        # the decoder is selected by endpoint, deserialize only gets the response type
+        self.current.resource = (method, resource_path)
+        try:
+            if not self.metrics.enabled:
+                self.current.endpoint = None
+                return super(BlackFoxApiClient, self).call_api(resource_path, method, *args, **kwargs)
+            endpoint = method + ' ' + resource_path
+            self.current.endpoint = endpoint
+            with self.metrics.timer('api_request_seconds', endpoint=endpoint):
+                return super(BlackFoxApiClient, self).call_api(resource_path, method, *args, **kwargs)
+        finally:
+            self.current.endpoint, self.current.resource = previous
+
+    def deserialize(self, response, response_type):
+        if not self.decoder.handles(getattr(self.current, 'resource', None), response_type):
+            return super(BlackFoxApiClient, self).deserialize(response, response_type)
+        return self.decoder.decode(response.data, response_type, self.deserialize_data)
+
+    def deserialize_data(self, data, klass):
+        """Deserializes parsed JSON data into klass (a model name, 'datetime', 'list[...]', ...)."""
+        return self._ApiClient__deserialize(data, klass)
+
+    def __count_bytes(self, method, post_params, body, response):
+        endpoint = getattr(self.current, 'endpoint', None) or method
+        sent = 0
+        if body is not None:
+            sent += len(json.dumps(body))
+        for _, value in post_params or []:
+            # files are (filename, data, mime type) tuples
+            sent += len(value[1]) if isinstance(value, tuple) else len(str(value))
+        self.metrics.count('api_bytes_sent', sent, endpoint=endpoint)
+        if response is not None and response.data is not None:
+            self.metrics.count('api_bytes_received', len(response.data), endpoint=endpoint)
+
+    def __send(self, method, url, query_params, headers, post_params, body, _preload_content, _request_timeout):
+        if self.replay is not None:
+            return self.replay.request(method, url, query_params)
+        try:
+            response = super(BlackFoxApiClient, self).request(
+                method, url, query_params=query_params, headers=headers,
+                post_params=post_params, body=body,
+                _preload_content=_preload_content,
+                _request_timeout=_request_timeout)
+        except Exception as e:
+            if self.recorder is not None:
+                self.recorder.record(method, url, query_params, error=e)
+            raise e
+        if self.recorder is not None:
+            self.recorder.record(method, url, query_params, response=response)
+        return response
+
+    def request(self, method, url, query_params=None, headers=None,
+                post_params=None, body=None, _preload_content=True,
+                _request_timeout=None):
+        if _request_timeout is None:
+            _request_timeout = self.timeout
+        if isinstance(_request_timeout, (int, float)):
+            # RESTClientObject only understands int or (connect, read) tuples
+            _request_timeout = (_request_timeout, _request_timeout)
+        # a replayed recording does not talk to a service
+        if self.handshake is not None and self.replay is None:
+            self.handshake.ensure()
+        attempt = 0
+        while True:
+            attempt += 1
+            self.circuit_breaker.before_request()
+            try:
+                response = self.__send(method, url, query_params, headers, post_params, body,
+                                       _preload_content, _request_timeout)
+            except Exception as e:
+                if self.retry_policy.is_transient(e):
+                    self.circuit_breaker.record_failure()
+                else:
+                    # the service answered, e.g. 404 from exists
+                    self.circuit_breaker.record_success()
+                if not self.retry_policy.should_retry(method, e, attempt):
+                    raise e
+                if self.metrics.enabled:
+                    self.metrics.count('api_retries', endpoint=getattr(self.current, 'endpoint', None) or method)
+                if self.replay is not None:
+                    self.replay.sleep(self.retry_policy.backoff(attempt))
+                else:
+                    time.sleep(self.retry_policy.backoff(attempt))
+            else:
+                self.circuit_breaker.record_success()
+                if self.metrics.enabled:
+                    self.__count_bytes(method, post_params, body, response)
+                return response
+
+    def close(self):
+        super(BlackFoxApiClient, self).close()
+        self.rest_client.pool_manager.clear()
@@ -0,0 +1,287 @@
+"""Streaming file-to-file batch prediction.
+
+Input rows are read in chunks by a reader thread, scored by a pool of compute threads and written in
+input order by a writer thread. At most max_in_flight chunks are held in memory, so memory stays
+constant for files of any size. CSV files are read with pandas when it is installed (csv module
+otherwise), Parquet files with pyarrow.
+"""
+import os
+import csv
+import time
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+_END = object()
+
+
+def _is_parquet(path):
+    return path.lower().endswith(('.parquet', '.pq'))
+
+
+def _column_index(header, columns):
+    if columns is None:
+        return None
+    return [header.index(c) if isinstance(c, str) else c for c in columns]
+
+
+def _numeric(np, rows):
+    try:
+        return np.array(rows, dtype=np.float64)
+    except ValueError:
+        # categorical columns are encoded by the preprocessor
+        return np.array(rows, dtype=object)
+
+
+def iter_csv_chunks(path, chunk_rows=65536, columns=None, header=True, delimiter=','):
+    """Yields the rows of a CSV file as numpy arrays of at most chunk_rows rows.
+
+    Parameters
+    ----------
+    columns : list[str or int]
+        Input columns by name or index (index only without a header), all columns if None
+    header : bool
+        If True, the first line holds the column names
+    """
+    import numpy as np
+    if not header and columns is not None and any(isinstance(c, str) for c in columns):
+        raise ValueError('Columns selected by name need a CSV header, use column indexes with header=False')
+    try:
+        import pandas
+    except ImportError:
+        pandas = None
+    if pandas is not None:
+        if columns is not None and header:
+            # usecols and frame[...] need names when the file has a header
+            names = list(pandas.read_csv(path, nrows=0, sep=delimiter).columns)
+            columns = [names[c] if isinstance(c, int) else c for c in columns]
+        reader = pandas.read_csv(path, chunksize=chunk_rows, header=0 if header else None,
+                                 usecols=columns, sep=delimiter)
+        for frame in reader:
+            if columns is not None:
+                frame = frame[columns]
+            yield frame.to_numpy()
+        return
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f, delimiter=delimiter)
+        names = next(reader) if header else None
+        index = _column_index(names, columns)
+        rows = []
+        for row in reader:
+            if not row:
+                continue
+            rows.append([row[i] for i in index] if index is not None else row)
+            if len(rows) >= chunk_rows:
+                yield _numeric(np, rows)
+                rows = []
+        if rows:
+            yield _numeric(np, rows)
+
+
+def iter_parquet_chunks(path, chunk_rows=65536, columns=None):
+    """Yields the rows of a Parquet file as numpy arrays of at most chunk_rows rows (requires pyarrow)."""
+    import numpy as np
+    import pyarrow.parquet as pq
+    parquet_file = pq.ParquetFile(path)
+    if columns is not None:
+        names = parquet_file.schema_arrow.names
+        columns = [names[c] if isinstance(c, int) else c for c in columns]
+    for batch in parquet_file.iter_batches(batch_size=chunk_rows, columns=columns):
+        yield np.column_stack([column.to_numpy(zero_copy_only=False) for column in batch.columns])
+
+
+def _output_names(predictor):
+    """Default output column names when no prediction was made, from the model outputs when known."""
+    width = None
+    session = getattr(predictor, 'session', None)
+    if session is not None:
+        shape = [o.shape for o in session.get_outputs() if o.name == predictor.output_name][0]
+        width = shape[-1] if len(shape) > 1 and isinstance(shape[-1], int) else 1
+    elif getattr(predictor, 'preprocessor', None) is not None:
+        width = len(predictor.preprocessor.outputs)
+    return ['prediction_%d' % i for i in range(width or 1)]
+
+
+class _CsvWriter(object):
+
+    def __init__(self, path, names, delimiter):
+        self.file = open(path, mode='w', newline='', encoding='utf-8')
+        self.delimiter = delimiter
+        if names is not None:
+            self.file.write(delimiter.join(names) + '\n')
+
+    def write(self, np, predictions):
+        np.savetxt(self.file, predictions, delimiter=self.delimiter, fmt='%.9g')
+
+    def close(self):
+        self.file.close()
+
+
+class _ParquetWriter(object):
+
+    def __init__(self, path, names):
+        import pyarrow
+        import pyarrow.parquet as pq
+        self.pa = pyarrow
+        self.pq = pq
+        self.path = path
+        self.names = names
+        self.writer = None
+
+    def write(self, np, predictions):
+        columns = [self.pa.array(predictions[:, i]) for i in range(predictions.shape[1])]
+        table = self.pa.table(columns, names=self.names)
+        if self.writer is None:
+            self.writer = self.pq.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is None:
+            self.writer = self.pq.ParquetWriter(
+                self.path, self.pa.schema([(name, self.pa.float64()) for name in self.names]))
+        self.writer.close()
+
+
+def predict_file(predictor, input_path, output_path, chunk_rows=65536, columns=None, output_columns=None,
+                 inverse_transform_outputs=True, threads=None, max_in_flight=None, header=True, delimiter=',',
+                 model_kind='ann', model_type=None, pool=None):
+    """Scores every row of an input CSV/Parquet file and writes the predictions to an output CSV/Parquet file.
+
+    Parameters
+    ----------
+    predictor : Predictor or str
+        Predictor (see load_predictor or BlackFox.get_predictor), with a preprocessor for models without
+        an integrated scaler; with several threads, prefer predictors using one thread each
+        (e.g. intra_op_threads=1). A model path is loaded through the model pool.
+    input_path : str
+        CSV or Parquet (.parquet, .pq) file with input rows
+    output_path : str
+        CSV or Parquet file receiving one row of predictions per input row, in input order
+    chunk_rows : int
+        Rows read, scored and written at a time
+    columns : list[str or int]
+        Input columns by name or index, in the order of the optimization inputs; all columns if None
+    output_columns : list[str]
+        Output column names, defaults to prediction_0, prediction_1, ...
+    inverse_transform_outputs : bool
+        If True and the predictor has a preprocessor, predictions are mapped back to the output ranges
+    threads : int
+        Number of compute threads, defaults to the number of CPUs
+    max_in_flight : int
+        Maximum number of chunks read but not yet written, defaults to 2 * threads
+    header : bool
+        If True, the input CSV has a header line (and the output CSV gets one)
+    delimiter : str
+        CSV delimiter
+    model_kind : str
+        Kind of the model when predictor is a path, see load_predictor
+    model_type : str
+        Format of the model when predictor is a path, see load_predictor
+    pool : ModelPool
+        Pool loading a model path, defaults to the process-wide pool
+
+    Returns
+    -------
+    dict
+        rows, chunks, seconds and rows_per_second
+    """
+    import numpy as np
+    if isinstance(predictor, str):
+        from blackfox.model_pool import get_default_pool
+        pool = pool if pool is not None else get_default_pool()
+        # a rewritten model file is a different model
+        model_id = 'file:' + os.path.abspath(predictor) + ':' + str(os.stat(predictor).st_mtime_ns)
+        predictor = pool.get(model_id, predictor, model_kind, model_type)
+    threads = threads or os.cpu_count() or 1
+    max_in_flight = max_in_flight or 2 * threads
+    if _is_parquet(input_path):
+        chunks = iter_parquet_chunks(input_path, chunk_rows, columns)
+    else:
+        chunks = iter_csv_chunks(input_path, chunk_rows, columns, header, delimiter)
+
+    def score(chunk):
+        # the predictor replays the input scaling/encoding of its preprocessor
+        y = np.asarray(predictor.predict(chunk))
+        if inverse_transform_outputs and getattr(predictor, 'preprocessor', None) is not None:
+            return predictor.preprocessor.inverse_transform_outputs(y)
+        return y.reshape(len(y), -1)
+
+    # ordered futures from the reader to the writer; the semaphore bounds chunks in memory
+    futures = queue.Queue()
+    in_flight = threading.BoundedSemaphore(max_in_flight)
+    errors = []
+    stats = {'rows': 0, 'chunks': 0}
+    start = time.perf_counter()
+
+    def read(executor):
+        try:
+            for chunk in chunks:
+                if len(chunk) == 0:
+                    continue
+                in_flight.acquire()
+                if errors:
+                    break
+                futures.put(executor.submit(score, chunk))
+        except Exception as e:
+            errors.append(e)
+        finally:
+            futures.put(_END)
+
+    # written to a temporary file next to the output and renamed on success, so a failed run
+    # never leaves a partial output behind
+    temp_path = output_path + '.tmp'
+
+    def open_writer(names):
+        if _is_parquet(output_path):
+            return _ParquetWriter(temp_path, names)
+        return _CsvWriter(temp_path, names if header else None, delimiter)
+
+    def write():
+        writer = None
+        try:
+            while True:
+                future = futures.get()
+                if future is _END:
+                    break
+                try:
+                    if errors:
+                        # after the first error the remaining chunks are only drained
+                        future.cancel()
+                        continue
+                    predictions = future.result()
+                    if writer is None:
+                        writer = open_writer(
+                            output_columns or ['prediction_%d' % i for i in range(predictions.shape[1])])
+                    writer.write(np, predictions)
+                    stats['rows'] += len(predictions)
+                    stats['chunks'] += 1
+                except Exception as e:
+                    errors.append(e)
+                finally:
+                    in_flight.release()
+            if writer is None and not errors:
+                # empty input: an output with only the header
+                writer = open_writer(output_columns or _output_names(predictor))
+        except Exception as e:
+            errors.append(e)
+        finally:
+            if writer is not None:
+                writer.close()
+
+    with ThreadPoolExecutor(max_workers=threads, thread_name_prefix='blackfox-predict') as executor:
+        reader = threading.Thread(target=read, args=(executor,), name='blackfox-predict-reader')
+        writer = threading.Thread(target=write, name='blackfox-predict-writer')
+        reader.daemon = writer.daemon = True
+        reader.start()
+        writer.start()
+        reader.join()
+        writer.join()
+    if errors:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise errors[0]
+    os.replace(temp_path, output_path)
+    seconds = time.perf_counter() - start
+    stats['seconds'] = seconds
+    stats['rows_per_second'] = stats['rows'] / seconds if seconds > 0 else None
+    return stats
@@ -0,0 +1,6 @@
+"""
+    blackfox.bench
+
+    Client-side benchmarks. Every benchmark is runnable as a module and prints machine-readable JSON.
+
+"""
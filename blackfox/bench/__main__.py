@@ -0,0 +1,11 @@
+"""Runs the client benchmark suite, see blackfox.bench.client.
+
+Usage::
+
+    python -m blackfox.bench --rows 1000,100000 --output bench.json
+"""
+import sys
+from blackfox.bench.client import main
+
+if __name__ == '__main__':
+    sys.exit(main())
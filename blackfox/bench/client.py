@@ -0,0 +1,307 @@
+"""Benchmarks the client-side data preparation, hashing, upload, polling and download paths.
+
+Usage::
+
+    python -m blackfox.bench.client --rows 1000,100000,1000000 --output bench.json
+    python -m blackfox.bench.client --compare bench.json
+    python -m blackfox.bench.client --full --output bench-full.json
+
+By default data sets of 1k to 1M rows are measured; --full adds 10M rows, which takes minutes
+per case and several GB of memory since the client builds its data sets as Python lists.
+
+Every case runs in a fresh interpreter against an in-process simulator (see blackfox.simulator),
+so peak RSS is reported per case. The output is a single JSON document; with --compare the
+throughput of each case is compared with a previous run and the exit status is 1 if any case
+is slower than the allowed tolerance.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import subprocess
+from io import BytesIO
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows
+    resource = None
+
+DEFAULT_ROWS = [1000, 10000, 100000, 1000000]
+FULL_ROWS = DEFAULT_ROWS + [10000000]
+DEFAULT_MODEL_SIZES = [64 * 1024, 1024 * 1024, 16 * 1024 * 1024]
+ROW_CASES = ['fill_inputs', 'fill_outputs', 'create_tmp_csv', 'sha1', 'upload_data_set']
+CASES = ROW_CASES + ['poll_status', 'download_model', 'copy_model']
+
+
+class _NullLogWriter(object):
+
+    def write_neural_network_statues(self, id, statuses):
+        pass
+
+    def write_random_forest_statues(self, id, statuses):
+        pass
+
+    def write_xgboost_statues(self, id, statuses):
+        pass
+
+    def write_string(self, msg):
+        pass
+
+
+def peak_rss_kb():
+    """Peak resident set size of this process in kilobytes, None where unsupported."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes elsewhere
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+
+def make_data_set(rows, inputs=10, outputs=1, seed=0):
+    random_state = random.Random(seed)
+    input_set = [[random_state.random() for _ in range(inputs)] for _ in range(rows)]
+    output_set = [[random_state.random() for _ in range(outputs)] for _ in range(rows)]
+    return input_set, output_set
+
+
+def _timed(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run_case(case, rows=1000, model_size=64 * 1024, generations=50, polls=200, repeat=3):
+    """Runs one benchmark case in this process.
+
+    Parameters
+    ----------
+    case : str
+        One of CASES
+    rows : int
+        Number of data set rows, used by fill_*, create_tmp_csv, sha1 and upload_data_set
+    model_size : int
+        Model size in bytes, used by download_model and copy_model
+    generations : int
+        Length of the status history returned by each poll, used by poll_status
+    polls : int
+        Number of status polls, used by poll_status
+    repeat : int
+        The fastest of repeat runs is reported
+
+    Returns
+    -------
+    dict
+        case parameters, seconds, throughput and its unit, peak RSS before and after the case
+    """
+    from blackfox import BlackFox, AnnOptimizationConfig, NeuralNetworkType
+    from blackfox.simulator import Simulator
+
+    result = {'case': case}
+    simulator = Simulator(generation_seconds=0.001, total_generations=generations, model_size=model_size).start()
+    tmp_paths = []
+    try:
+        bf = BlackFox(simulator.url)
+        if case in ROW_CASES:
+            result['rows'] = rows
+            input_set, output_set = make_data_set(rows)
+            result['rss_before_kb'] = peak_rss_kb()
+            if case == 'fill_inputs':
+                seconds = _timed(lambda: bf._BlackFox__fill_inputs(None, input_set), repeat)
+            elif case == 'fill_outputs':
+                seconds = _timed(lambda: bf._BlackFox__fill_outputs(None, output_set), repeat)
+            elif case == 'create_tmp_csv':
+                seconds = _timed(lambda: tmp_paths.append(
+                    bf._BlackFox__create_tmp_csv(AnnOptimizationConfig(), input_set, output_set)), repeat)
+            else:
+                path = bf._BlackFox__create_tmp_csv(AnnOptimizationConfig(), input_set, output_set)
+                tmp_paths.append(path)
+                result['bytes'] = os.path.getsize(path)
+                if case == 'sha1':
+                    seconds = _timed(lambda: bf._BlackFox__sha1(path), repeat)
+                else:
+                    def upload():
+                        # every upload is a new data set for the service
+                        simulator.service.data_sets.clear()
+                        bf.upload_data_set(path)
+                    bf.client.handshake.ensure()
+                    seconds = _timed(upload, repeat)
+            result['throughput'] = rows / seconds
+            result['unit'] = 'rows/s'
+        elif case == 'poll_status':
+            result['generations'] = generations
+            result['polls'] = polls
+            id = bf.ann_optimization_api.start(ann_optimization_config=AnnOptimizationConfig())
+            # let the optimization finish so every poll returns the full history
+            time.sleep(generations * simulator.service.generation_seconds + 0.1)
+            log_writer = _NullLogWriter()
+            result['rss_before_kb'] = peak_rss_kb()
+
+            def poll():
+                for _ in range(polls):
+                    statuses = bf.ann_optimization_api.get_status(id)
+                    bf._BlackFox__log_nn_statues(log_writer, id, statuses)
+            seconds = _timed(poll, repeat)
+            result['throughput'] = polls / seconds
+            result['unit'] = 'polls/s'
+        elif case in ('download_model', 'copy_model'):
+            result['model_size'] = model_size
+            id = bf.ann_optimization_api.start(ann_optimization_config=AnnOptimizationConfig())
+            model_id = bf.ann_optimization_api.get_model_id(id, 0)
+            result['rss_before_kb'] = peak_rss_kb()
+            if case == 'download_model':
+                def download():
+                    stream = bf.download_ann_model(model_id, model_type=NeuralNetworkType.H5)
+                    tmp_paths.append(stream.name)
+                    stream.close()
+                seconds = _timed(download, repeat)
+            else:
+                # continue_*_optimization reads the downloaded file into a BytesIO
+                stream = bf.download_ann_model(model_id, model_type=NeuralNetworkType.H5)
+                tmp_paths.append(stream.name)
+                stream.close()
+
+                def copy():
+                    with open(stream.name, 'rb') as f:
+                        BytesIO(f.read())
+                seconds = _timed(copy, repeat)
+            result['throughput'] = model_size / seconds
+            result['unit'] = 'bytes/s'
+        else:
+            raise Exception('Unknown benchmark case: ' + str(case))
+        result['seconds'] = seconds
+        result['peak_rss_kb'] = peak_rss_kb()
+        bf.close()
+    finally:
+        simulator.stop()
+        for path in tmp_paths:
+            if os.path.exists(path):
+                os.remove(path)
+    return result
+
+
+def run_suite(rows=DEFAULT_ROWS, model_sizes=DEFAULT_MODEL_SIZES, cases=CASES, generations=50, polls=200, repeat=3):
+    """Runs every case and size in a fresh interpreter.
+
+    Returns
+    -------
+    dict
+        environment information and a list of case results
+    """
+    results = []
+    for case in cases:
+        if case in ROW_CASES:
+            variants = [['--rows', str(r)] for r in rows]
+        elif case == 'poll_status':
+            variants = [[]]
+        else:
+            variants = [['--model-sizes', str(s)] for s in model_sizes]
+        for variant in variants:
+            args = [sys.executable, '-m', 'blackfox.bench.client', '--single', case,
+                    '--generations', str(generations), '--polls', str(polls), '--repeat', str(repeat)] + variant
+            out = subprocess.check_output(args)
+            results.append(json.loads(out.decode('utf-8').strip().splitlines()[-1]))
+    return {
+        'benchmark': 'client',
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'results': results
+    }
+
+
+def _case_key(result):
+    return tuple((k, result.get(k)) for k in ('case', 'rows', 'model_size', 'generations', 'polls'))
+
+
+def compare(baseline, current, tolerance=0.2):
+    """Compares the throughput of two suite runs.
+
+    Parameters
+    ----------
+    baseline : dict
+        Previous run_suite result
+    current : dict
+        New run_suite result
+    tolerance : float
+        Allowed relative throughput loss
+
+    Returns
+    -------
+    list[dict]
+        case, baseline and current throughput, ratio and regression flag for every case present in both runs
+    """
+    previous = dict((_case_key(r), r) for r in baseline['results'])
+    rows = []
+    for r in current['results']:
+        b = previous.get(_case_key(r))
+        if b is None:
+            continue
+        ratio = r['throughput'] / b['throughput']
+        rows.append({
+            'case': dict(_case_key(r)),
+            'baseline': b['throughput'],
+            'current': r['throughput'],
+            'unit': r['unit'],
+            'ratio': ratio,
+            'regression': ratio < 1 - tolerance
+        })
+    return rows
+
+
+def _sizes(value):
+    return [int(float(s)) for s in value.split(',') if s]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark BlackFox client data paths against the simulator')
+    parser.add_argument('--rows', type=_sizes,
+                        help='comma separated data set sizes, e.g. 1000,1e6,1e7')
+    parser.add_argument('--full', action='store_true', help='also measure data sets of 10M rows')
+    parser.add_argument('--model-sizes', type=_sizes, default=DEFAULT_MODEL_SIZES,
+                        help='comma separated model sizes in bytes')
+    parser.add_argument('--cases', default=','.join(CASES))
+    parser.add_argument('--generations', type=int, default=50)
+    parser.add_argument('--polls', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='also write the result to this file')
+    parser.add_argument('--compare', help='result file of a previous run')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    parser.add_argument('--single', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.rows is None:
+        args.rows = FULL_ROWS if args.full else DEFAULT_ROWS
+
+    if args.single is not None:
+        print(json.dumps(run_case(args.single, rows=args.rows[0], model_size=args.model_sizes[0],
+                                  generations=args.generations, polls=args.polls, repeat=args.repeat)))
+        return 0
+
+    cases = [c for c in args.cases.split(',') if c]
+    for case in cases:
+        if case not in CASES:
+            parser.error('unknown case ' + case)
+    result = run_suite(args.rows, args.model_sizes, cases, args.generations, args.polls, args.repeat)
+    status = 0
+    if args.compare is not None:
+        with open(args.compare, encoding='utf-8') as f:
+            result['comparison'] = compare(json.load(f), result, args.tolerance)
+        if any(c['regression'] for c in result['comparison']):
+            status = 1
+    text = json.dumps(result, indent=2)
+    if args.output is not None:
+        with open(args.output, mode='w', encoding='utf-8') as f:
+            f.write(text)
+    print(text)
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
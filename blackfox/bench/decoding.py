@@ -0,0 +1,95 @@
+"""Compares decoding of large status lists and metadata with ApiClient.deserialize and FastDecoder.
+
+Usage::
+
+    python -m blackfox.bench.decoding --statuses 10000
+"""
+import sys
+import json
+import time
+import argparse
+
+
+class _Response(object):
+
+    def __init__(self, data):
+        self.data = data
+
+
+def make_status_body(count, engine='ann'):
+    """JSON body of a status poll with count entries, as returned by the simulator."""
+    from blackfox.simulator import SimulatedOptimization
+    optimization = SimulatedOptimization(engine, {'inputs': [None] * 10}, count - 1, 1e-9, 0)
+    return json.dumps(optimization.statuses(time.time() + 1))
+
+
+def make_metadata_body(columns=100):
+    return json.dumps({
+        'inputs': [{'range': {'min': 0.0, 'max': float(i)}, 'encoding': 'None'} for i in range(columns)],
+        'outputs': [{'range': {'min': 0.0, 'max': 1.0}}],
+        'scaler': {'name': 'MinMax', 'featureRange': [-1, 1]}
+    })
+
+
+def _timed(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def measure(statuses=10000, repeat=5):
+    """Decodes a status list and a metadata dict with every available decoder.
+
+    Returns
+    -------
+    dict
+        seconds per decoder and speedup relative to ApiClient.deserialize
+    """
+    from blackfox_restapi.api_client import ApiClient
+    from blackfox.decoding import FastDecoder
+
+    api_client = ApiClient()
+    deserialize = api_client._ApiClient__deserialize
+    decoders = {'json': FastDecoder(backend='json')}
+    try:
+        decoders['orjson'] = FastDecoder(backend='orjson')
+    except Exception:
+        pass
+
+    cases = [
+        ('status_list', 'list[AnnOptimizationStatus]', make_status_body(statuses)),
+        ('metadata', 'object', make_metadata_body())
+    ]
+    results = []
+    for name, response_type, body in cases:
+        response = _Response(body)
+        generated = _timed(lambda: api_client.deserialize(response, response_type), repeat)
+        result = {
+            'case': name,
+            'bytes': len(body),
+            'entries': statuses if name == 'status_list' else None,
+            'generated_seconds': generated
+        }
+        for backend, decoder in decoders.items():
+            seconds = _timed(lambda: decoder.decode(body, response_type, deserialize), repeat)
+            result[backend + '_seconds'] = seconds
+            result[backend + '_speedup'] = generated / seconds
+        results.append(result)
+    return {'benchmark': 'decoding', 'repeat': repeat, 'results': results}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark response decoding')
+    parser.add_argument('--statuses', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+    print(json.dumps(measure(args.statuses, args.repeat), indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,276 @@
+"""Compares the local inference speed of every format a model can be downloaded in.
+
+Usage::
+
+    python -m blackfox.bench.formats --url http://localhost:50476 --model-id <id> --kind ann
+    python -m blackfox.bench.formats --url http://localhost:50476 --optimization-id <id> --kind random_forest
+    python -m blackfox.bench.formats --models onnx=model.onnx,h5=model.h5 --kind ann
+
+Neural networks are fetched as h5, onnx and pb (NeuralNetworkType) plus the optimized and int8
+variants of the ONNX model (see blackfox.onnx_optimization); random forests as binary and onnx
+(RandomForestModelType). Every format is measured in a fresh interpreter for cold load time,
+p50/p99 single-row latency, batch throughput and peak RSS; the fastest format is recommended.
+h5 and pb models need tensorflow; formats whose libraries are missing are reported with an error.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+from blackfox.bench.client import peak_rss_kb
+
+FORMATS = {
+    'ann': ['h5', 'onnx', 'pb', 'onnx-optimized', 'onnx-int8'],
+    'rnn': ['h5', 'onnx', 'pb', 'onnx-optimized', 'onnx-int8'],
+    'random_forest': ['binary', 'onnx'],
+    'xgboost': ['xgboost']
+}
+
+
+class _KerasPredictor(object):
+
+    def __init__(self, path):
+        from tensorflow import keras
+        self.model = keras.models.load_model(path, compile=False)
+        self.features = self.model.input_shape[-1]
+
+    def predict(self, data):
+        # calling the model avoids the per-call overhead of model.predict for small batches
+        return self.model(data, training=False).numpy()
+
+    def close(self):
+        pass
+
+
+class _FrozenGraphPredictor(object):
+
+    def __init__(self, path):
+        import tensorflow as tf
+        graph_def = tf.compat.v1.GraphDef()
+        with open(path, 'rb') as f:
+            graph_def.ParseFromString(f.read())
+        self.graph = tf.Graph()
+        with self.graph.as_default():
+            tf.compat.v1.import_graph_def(graph_def, name='')
+        operations = self.graph.get_operations()
+        placeholders = [op for op in operations if op.type == 'Placeholder']
+        if len(placeholders) != 1:
+            raise Exception('Expected a frozen graph with one input, got ' + str(len(placeholders)))
+        self.input = placeholders[0].outputs[0]
+        self.output = operations[-1].outputs[0]
+        self.features = self.input.shape[-1]
+        self.session = tf.compat.v1.Session(graph=self.graph)
+
+    def predict(self, data):
+        return self.session.run(self.output, {self.input: data})
+
+    def close(self):
+        self.session.close()
+
+
+def _load(path, kind, model_format):
+    from blackfox.inference import load_predictor
+    if model_format == 'h5':
+        return _KerasPredictor(path)
+    if model_format == 'pb':
+        return _FrozenGraphPredictor(path)
+    if model_format == 'binary':
+        return load_predictor(path, kind, 'binary')
+    return load_predictor(path, kind, None if model_format == 'xgboost' else 'onnx')
+
+
+def _input_width(predictor):
+    if hasattr(predictor, 'features'):
+        return predictor.features
+    if hasattr(predictor, 'input_shape'):
+        return predictor.input_shape[-1]
+    if hasattr(predictor, 'booster'):
+        return predictor.booster.num_features()
+    if getattr(predictor, 'estimator', None) is not None:
+        return predictor.estimator.n_features_in_
+    return None
+
+
+def run_format(path, kind, model_format, features=None, rows=100000, requests=1000, repeat=3):
+    """Measures one model file, meant to run in a fresh interpreter.
+
+    Returns
+    -------
+    dict
+        load_seconds (load and first prediction), p50_ms/p99_ms single-row latency,
+        batch rows_per_second, rss_before_kb and peak_rss_kb
+    """
+    import numpy as np
+    result = {'format': model_format, 'bytes': os.path.getsize(path), 'rss_before_kb': peak_rss_kb()}
+    start = time.perf_counter()
+    predictor = _load(path, kind, model_format)
+    features = features or _input_width(predictor)
+    if not isinstance(features, int):
+        raise Exception('Cannot read the input width of the ' + model_format + ' model, pass --features')
+    x = np.random.RandomState(0).rand(rows, features).astype(np.float32)
+    predictor.predict(x[:1])
+    result['load_seconds'] = time.perf_counter() - start
+    latencies = []
+    for i in range(requests):
+        row = x[i % rows:i % rows + 1]
+        start = time.perf_counter()
+        predictor.predict(row)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    result['p50_ms'] = latencies[len(latencies) // 2] * 1000
+    result['p99_ms'] = latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))] * 1000
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        predictor.predict(x)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    result['rows'] = rows
+    result['rows_per_second'] = rows / best
+    result['peak_rss_kb'] = peak_rss_kb()
+    predictor.close()
+    return result
+
+
+def fetch_formats(bf, model_id, kind, directory, integrate_scaler=True, formats=None):
+    """Downloads a model in every format of its kind and builds the optimized ONNX variants.
+
+    Returns
+    -------
+    dict
+        format -> model path, or format -> error message for formats that could not be fetched
+    """
+    from blackfox.onnx_optimization import optimize_onnx_model
+    paths = {}
+    for model_format in formats or FORMATS[kind]:
+        try:
+            if model_format.startswith('onnx-'):
+                if not isinstance(paths.get('onnx'), str) or not os.path.exists(paths['onnx']):
+                    raise Exception('needs the onnx format')
+                quantization = 'int8' if model_format == 'onnx-int8' else None
+                paths[model_format] = optimize_onnx_model(paths['onnx'], quantization)
+                continue
+            path = os.path.join(directory, model_id + '.' + model_format)
+            if kind == 'ann':
+                bf.download_ann_model(model_id, integrate_scaler=integrate_scaler, model_type=model_format, path=path)
+            elif kind == 'rnn':
+                bf.download_rnn_model(model_id, integrate_scaler=integrate_scaler, model_type=model_format, path=path)
+            elif kind == 'random_forest':
+                bf.download_random_forest_model(model_id, model_type=model_format, path=path)
+            else:
+                bf.download_xgboost_model(model_id, path=path)
+            paths[model_format] = path
+        except Exception as e:
+            paths[model_format] = 'error: ' + str(e)
+    return paths
+
+
+def best_model_id(bf, optimization_id, kind):
+    """Returns the model id of the current best generation of an optimization."""
+    status_getters = {
+        'ann': (bf.get_ann_optimization_status, bf.ann_optimization_api),
+        'rnn': (bf.get_rnn_optimization_status, bf.rnn_optimization_api),
+        'random_forest': (bf.get_random_forest_optimization_status, bf.rf_optimization_api),
+        'xgboost': (bf.get_xgboost_optimization_status, bf.xgb_optimization_api)
+    }
+    get_status, api = status_getters[kind]
+    # one status per generation, the last one is the current state (as in continue_*_optimization)
+    statuses = get_status(optimization_id)
+    if not statuses or statuses[-1].best_model is None:
+        raise Exception('Optimization ' + optimization_id + ' has no model yet')
+    return api.get_model_id(optimization_id, statuses[-1].generation)
+
+
+def measure(paths, kind, features=None, rows=100000, requests=1000, repeat=3):
+    """Measures every model file in a fresh interpreter and recommends the fastest format.
+
+    Parameters
+    ----------
+    paths : dict
+        format -> model path (or error message)
+
+    Returns
+    -------
+    dict
+        results per format, and the recommended format for single-row latency (lowest p50)
+        and for batch throughput (highest rows/s)
+    """
+    results = []
+    for model_format, path in paths.items():
+        if path.startswith('error: ') or not os.path.exists(path):
+            error = path[len('error: '):] if path.startswith('error: ') else path + " doesn't exist"
+            results.append({'format': model_format, 'error': error})
+            continue
+        args = [sys.executable, '-m', 'blackfox.bench.formats', '--single', model_format, '--path', path,
+                '--kind', kind, '--rows', str(rows), '--requests', str(requests), '--repeat', str(repeat)]
+        if features is not None:
+            args += ['--features', str(features)]
+        process = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if process.returncode != 0:
+            error = process.stderr.decode('utf-8', 'replace').strip().splitlines()
+            results.append({'format': model_format, 'error': error[-1] if error else 'failed'})
+            continue
+        results.append(json.loads(process.stdout.decode('utf-8').strip().splitlines()[-1]))
+    measured = [r for r in results if 'error' not in r]
+    return {
+        'benchmark': 'formats',
+        'kind': kind,
+        'cpus': os.cpu_count(),
+        'results': results,
+        'recommended_latency': min(measured, key=lambda r: r['p50_ms'])['format'] if measured else None,
+        'recommended_throughput': max(measured, key=lambda r: r['rows_per_second'])['format'] if measured else None
+    }
+
+
+def _models(value):
+    return dict(item.split('=', 1) for item in value.split(',') if item)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark local inference of every downloadable model format')
+    parser.add_argument('--url', help='BlackFox service url')
+    parser.add_argument('--model-id')
+    parser.add_argument('--optimization-id', help='benchmark the best model of this optimization')
+    parser.add_argument('--models', type=_models, help='local files instead of downloads, e.g. onnx=m.onnx,h5=m.h5')
+    parser.add_argument('--kind', default='ann', choices=sorted(FORMATS))
+    parser.add_argument('--formats', help='comma separated subset of the formats of the kind')
+    parser.add_argument('--no-integrate-scaler', action='store_true')
+    parser.add_argument('--directory', help='where downloaded models are kept, defaults to a temporary directory')
+    parser.add_argument('--features', type=int, help='input width, read from the model when omitted')
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='also write the result to this file')
+    parser.add_argument('--single', help=argparse.SUPPRESS)
+    parser.add_argument('--path', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.single is not None:
+        print(json.dumps(run_format(args.path, args.kind, args.single, args.features,
+                                    args.rows, args.requests, args.repeat)))
+        return 0
+
+    formats = [f for f in args.formats.split(',') if f] if args.formats else None
+    if args.models is not None:
+        paths = args.models
+    else:
+        if args.url is None or (args.model_id is None and args.optimization_id is None):
+            parser.error('pass --url with --model-id or --optimization-id, or --models')
+        from blackfox.black_fox import BlackFox
+        bf = BlackFox(args.url)
+        model_id = args.model_id or best_model_id(bf, args.optimization_id, args.kind)
+        directory = args.directory or tempfile.mkdtemp(prefix='blackfox-formats-')
+        paths = fetch_formats(bf, model_id, args.kind, directory, not args.no_integrate_scaler, formats)
+    result = measure(paths, args.kind, args.features, args.rows, args.requests, args.repeat)
+    text = json.dumps(result, indent=2)
+    print(text)
+    if args.output is not None:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
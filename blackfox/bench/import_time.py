@@ -0,0 +1,65 @@
+"""Measures ``import blackfox`` time in fresh interpreters and enforces a budget.
+
+Usage::
+
+    python -m blackfox.bench.import_time --budget-ms 20
+
+Exits with status 1 if the median import time exceeds the budget or if the import
+loads one of the heavy modules that should only be loaded on use.
+"""
+import sys
+import json
+import argparse
+import subprocess
+
+HEAVY_MODULES = ['blackfox_restapi', 'urllib3', 'numpy', 'pandas', 'pyarrow', 'onnxruntime']
+
+_PROBE = '''
+import sys, time, json
+start = time.perf_counter()
+import blackfox
+elapsed = time.perf_counter() - start
+print(json.dumps({'seconds': elapsed, 'modules': sorted(m for m in %r if m in sys.modules)}))
+''' % (HEAVY_MODULES,)
+
+
+def measure(runs=10, statement=_PROBE):
+    """Imports blackfox in runs fresh interpreters.
+
+    Returns
+    -------
+    dict
+        median, min and max import time in milliseconds and heavy modules loaded by the import
+    """
+    times = []
+    loaded = set()
+    for _ in range(runs):
+        out = subprocess.check_output([sys.executable, '-c', statement])
+        result = json.loads(out.decode('utf-8').strip().splitlines()[-1])
+        times.append(result['seconds'] * 1000)
+        loaded.update(result['modules'])
+    times.sort()
+    return {
+        'benchmark': 'import_time',
+        'runs': runs,
+        'median_ms': times[len(times) // 2],
+        'min_ms': times[0],
+        'max_ms': times[-1],
+        'heavy_modules_loaded': sorted(loaded)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure import blackfox time')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--budget-ms', type=float, default=20.0)
+    args = parser.parse_args(argv)
+    result = measure(args.runs)
+    result['budget_ms'] = args.budget_ms
+    result['passed'] = result['median_ms'] <= args.budget_ms and not result['heavy_modules_loaded']
+    print(json.dumps(result))
+    return 0 if result['passed'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
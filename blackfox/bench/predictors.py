@@ -0,0 +1,104 @@
+"""Measures local scoring throughput per model type and parallelism setting.
+
+Usage::
+
+    python -m blackfox.bench.predictors --rows 1000000 --features 20
+
+Models are trained on synthetic data with the libraries producing BlackFox artifacts
+(scikit-learn random forest, XGBoost, and the random forest exported to ONNX with skl2onnx);
+model types whose libraries are not installed are skipped.
+"""
+import os
+import sys
+import json
+import time
+import pickle
+import argparse
+
+
+def _timed(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def make_models(features, seed=0):
+    """Trains small models on synthetic data and returns {name: (model kind, model type, bytes)}."""
+    import numpy as np
+    random_state = np.random.RandomState(seed)
+    x = random_state.rand(5000, features).astype(np.float32)
+    y = x[:, 0] * 2 + np.sin(x[:, 1] * 6) + random_state.rand(5000) * 0.1
+    models = {}
+    try:
+        from sklearn.ensemble import RandomForestRegressor
+        forest = RandomForestRegressor(n_estimators=100, max_depth=10, random_state=seed).fit(x, y)
+        models['random_forest_binary'] = ('random_forest', 'binary', pickle.dumps(forest))
+        try:
+            from skl2onnx import to_onnx
+            models['random_forest_onnx'] = ('random_forest', 'onnx', to_onnx(forest, x[:1]).SerializeToString())
+        except ImportError:
+            pass
+    except ImportError:
+        pass
+    try:
+        import xgboost
+        booster = xgboost.train({'max_depth': 6, 'nthread': 1}, xgboost.DMatrix(x, label=y), num_boost_round=100)
+        models['xgboost'] = ('xgboost', None, bytes(booster.save_raw('ubj')))
+    except ImportError:
+        pass
+    return models
+
+
+def measure(rows=1000000, features=20, repeat=3, cpus=None):
+    """Scores rows with every available model type, single-threaded and on all cores.
+
+    Returns
+    -------
+    dict
+        rows/s per model type and parallelism setting
+    """
+    import numpy as np
+    from blackfox.inference import load_predictor
+    cpus = cpus or os.cpu_count() or 1
+    x = np.random.RandomState(1).rand(rows, features).astype(np.float32)
+    settings = {
+        'random_forest_binary': [('threads=1', {'n_jobs': 1}), ('threads=%d' % cpus, {'n_jobs': cpus}),
+                                 ('processes=%d' % cpus, {'processes': cpus, 'batch_size': max(1, rows // cpus)})],
+        'random_forest_onnx': [('threads=1', {'intra_op_threads': 1}), ('threads=%d' % cpus, {'intra_op_threads': cpus})],
+        'xgboost': [('threads=1', {'nthread': 1}), ('threads=%d' % cpus, {'nthread': cpus})]
+    }
+    results = []
+    for name, (kind, model_type, data) in sorted(make_models(features).items()):
+        # on a single core the parallel settings repeat the single-threaded one
+        for setting, kwargs in dict(settings[name]).items():
+            with load_predictor(data, kind, model_type, **kwargs) as predictor:
+                # warm up (worker processes, session allocations)
+                predictor.predict(x[:1000])
+                seconds = _timed(lambda: predictor.predict(x), repeat)
+            results.append({
+                'model': name,
+                'setting': setting,
+                'rows': rows,
+                'seconds': seconds,
+                'rows_per_second': rows / seconds
+            })
+    return {'benchmark': 'predictors', 'features': features, 'cpus': cpus, 'repeat': repeat, 'results': results}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark local random forest and XGBoost scoring')
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--features', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--cpus', type=int, default=None)
+    args = parser.parse_args(argv)
+    print(json.dumps(measure(args.rows, args.features, args.repeat, args.cpus), indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
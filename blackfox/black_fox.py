@@ -6,8 +6,9 @@ import signal
 import time
 import shutil
 import hashlib
-# import ApiClient
-from blackfox_restapi.api_client import ApiClient
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from blackfox_restapi.configuration import Configuration
 # import apis into sdk package
 from blackfox_restapi.api.info_api import InfoApi
@@ -20,7 +21,6 @@ from blackfox_restapi.api.random_forest_model_api import RandomForestModelApi
 from blackfox_restapi.api.random_forest_optimization_api import RandomForestOptimizationApi
 from blackfox_restapi.api.xg_boost_model_api import XGBoostModelApi
 from blackfox_restapi.api.xg_boost_optimization_api import XGBoostOptimizationApi
-from blackfox_restapi.models.service_info import ServiceInfo
 from blackfox_restapi.models.problem_type import ProblemType
 
 from blackfox import (ApiException, NeuralNetworkType, RandomForestModelType, 
@@ -28,8 +28,16 @@ AnnOptimizationConfig, AnnSeriesOptimizationConfig, RnnOptimizationConfig,
 RandomForestOptimizationConfig, RandomForestSeriesOptimizationConfig, Range, 
 RangeInt, InputConfig, OutputConfig, AnnOptimizationEngineConfig, OptimizationAlgorithm, 
 XGBoostOptimizationConfig, XGBoostSeriesOptimizationConfig)
+from blackfox.api_client import BlackFoxApiClient
+from blackfox.retry import OutageBudget
+from blackfox.handshake import ServiceHandshake
+from blackfox.instrumentation import MetricsSink
 from blackfox.log_writer import LogWriter
 from blackfox.validation import (validate_optimization)
+from blackfox.bulk_metadata import expand_paths, hash_files
+from blackfox.model_pool import get_default_pool
+from blackfox.ensemble import Ensemble, EnsembleMember, select_generations
+from blackfox.onnx_optimization import optimize_onnx_model, compare_onnx_models
 
 
 BUF_SIZE = 65536  # lets read stuff in 64kb chunks!
@@ -43,29 +51,90 @@ class BlackFox:
     ----------
     host : str
         Web API url
+    pool_maxsize : int
+        Number of connections kept alive to the service; should be at least the number of threads using this instance
+    num_pools : int
+        Number of per-host connection pools
+    pool_block : bool
+        If True, requests wait for a free pooled connection instead of opening a new one when the pool is full
+    timeout : float or (float, float)
+        Default (connect, read) timeout in seconds for every request, None waits indefinitely
+    socket_options : list[tuple]
+        Socket options for new connections, defaults to TCP keep-alive (see keep_alive_socket_options)
+    retry_policy : RetryPolicy
+        Retry policy applied to every request, defaults to RetryPolicy()
+    circuit_breaker : CircuitBreaker
+        Circuit breaker shared by all requests, defaults to CircuitBreaker()
+    outage_budget : float
+        Seconds of consecutive transient errors tolerated while polling optimization status before the optimization is stopped
+        (continue_*) or an exception is raised (stop_*); errors that are not transient are never tolerated
+    handshake_ttl : float
+        Seconds a successful service version check is reused by all instances connecting to the same host
+    handshake_cache_path : str
+        Optional JSON file where service version checks are persisted between processes
+    metrics_sink : MetricsSink
+        Optional sink receiving request and stage timings, bytes transferred, retries and cache hits (e.g. InMemoryMetrics)
+    traffic_recorder : TrafficRecorder
+        Optional recorder capturing every request/response exchange with the service
+    traffic_replay : TrafficReplay
+        Optional recording replayed instead of connecting to the service
+    compact_statuses : bool
+        If True, optimization statuses are lightweight StatusRecord objects decoded directly from JSON,
+        with the attributes but not the type of the generated models; by default (False) the
+        generated *OptimizationStatus models are returned
+    decoder : FastDecoder
+        Decoder used for status lists, metadata and ids instead of the generated deserializer,
+        e.g. FastDecoder(backend='json'); defaults to orjson when installed
+    conversion_cache_bytes : int
+        Maximum size of converted models kept in memory by convert_ann_to/convert_ann_models,
+        least recently used ones are dropped first; 0 disables the in-memory cache (cache_dir still works)
 
     """
 
-    def __init__(self, host="http://localhost:50476/"):
+    def __init__(
+        self,
+        host="http://localhost:50476/",
+        pool_maxsize=16,
+        num_pools=4,
+        pool_block=False,
+        timeout=None,
+        socket_options=None,
+        retry_policy=None,
+        circuit_breaker=None,
+        outage_budget=600,
+        handshake_ttl=300,
+        handshake_cache_path=None,
+        metrics_sink=None,
+        traffic_recorder=None,
+        traffic_replay=None,
+        compact_statuses=False,
+        decoder=None,
+        conversion_cache_bytes=64 * 1024 * 1024
+    ):
         self.host = host
+        self.metrics = metrics_sink if metrics_sink is not None else MetricsSink()
         configuration = Configuration()
         configuration.host = host
-        self.client = ApiClient(configuration)
-        #check version
+        self.client = BlackFoxApiClient(
+            configuration,
+            num_pools=num_pools,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+            timeout=timeout,
+            socket_options=socket_options,
+            retry_policy=retry_policy,
+            circuit_breaker=circuit_breaker,
+            metrics=self.metrics,
+            recorder=traffic_recorder,
+            replay=traffic_replay,
+            compact_statuses=compact_statuses,
+            decoder=decoder
+        )
+        self.outage_budget = outage_budget
         self.info_api = InfoApi(self.client)
-        info = self.info_api.get()
-        service_version = info.version.split('.')
-        default_info = ServiceInfo()
-        default_version = default_info.version.split('.')
-        if service_version[0] > default_version[0]:
-            raise Exception('BlackFox service('+info.version+') is newer than client('+default_info.version+'). Please update client using: pip install blackfox')
-        elif service_version[0] < default_version[0]:
-            raise Exception('BlackFox service('+info.version+') is older than client('+default_info.version+'). Please revert client to previous version using: pip install blackfox==<version>')
-        elif service_version[1] < default_version[1]:
-            raise Exception('BlackFox client('+default_info.version+') has some new features than service('+info.version+'). Please revert client to previous version using: pip install blackfox==<version>')
-        elif service_version[1] > default_version[1]:
-            print('BlackFox service('+info.version+') has some new features. Please update client using: pip install blackfox')
-        
+        # the service version is checked lazily, before the first request
+        self.client.handshake = ServiceHandshake(host, self.info_api, ttl=handshake_ttl, cache_path=handshake_cache_path, metrics=self.metrics)
+
         self.data_set_api = DataSetApi(self.client)
 
         self.ann_model_api = AnnModelApi(self.client)
@@ -80,6 +149,45 @@ class BlackFox:
         self.xgb_model_api = XGBoostModelApi(self.client)
         self.xgb_optimization_api = XGBoostOptimizationApi(self.client)
 
+        # (source hash, model type, integrate_scaler) -> converted model, in LRU order
+        self.conversion_cache = OrderedDict()
+        self.conversion_cache_bytes = conversion_cache_bytes
+        self.conversion_cache_size = 0
+        self.conversion_cache_lock = threading.Lock()
+
+    def close(self):
+        """Closes pooled connections to the service."""
+        self.client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __wait_stopped(self, id, get_status):
+        """Polls the statuses of a stopped optimization until it is no longer Active, returns the last one."""
+        outage = OutageBudget(self.outage_budget, self.client.retry_policy)
+        attempt = 0
+        last_status = None
+        state = 'Active'
+        while state == 'Active':
+            try:
+                statuses = get_status(id)
+            except Exception as e:
+                if not outage.tolerate(e):
+                    raise Exception('Optimization ' + id + ' was asked to stop, but its status could not be read: ' +
+                                    str(e))
+                attempt += 1
+                time.sleep(self.client.retry_policy.backoff(attempt))
+                continue
+            outage.reset()
+            attempt = 0
+            if statuses:
+                last_status = statuses[-1]
+                state = last_status.state
+        return last_status
+
     #region log
     def __log_string(self, log_writer, msg):
         if log_writer is not None:
@@ -218,19 +326,30 @@ class BlackFox:
 
     def __sha1(self, path):
         sha1 = hashlib.sha1()
-        try:
-            with open(path, 'rb') as f:
-                while True:
-                    data = f.read(BUF_SIZE)
-                    if not data:
-                        break
-                    sha1.update(data)
-
-        except IOError:
-            print("File " + path + " doesn't exist.")
+        size = 0
+        with self.metrics.timer('stage_seconds', stage='sha1'):
+            try:
+                with open(path, 'rb') as f:
+                    while True:
+                        data = f.read(BUF_SIZE)
+                        if not data:
+                            break
+                        sha1.update(data)
+                        size += len(data)
+
+            except IOError:
+                print("File " + path + " doesn't exist.")
+        self.metrics.count('stage_bytes', size, stage='sha1')
 
         return sha1.hexdigest()
 
+    def __download_model(self, model_api, id, **kwargs):
+        with self.metrics.timer('stage_seconds', stage='download_model'):
+            temp_path = model_api.download(id, **kwargs)
+        if self.metrics.enabled:
+            self.metrics.count('stage_bytes', os.path.getsize(temp_path), stage='download_model')
+        return temp_path
+
     def __set_neurons_count(self, config):
         if config.neurons_per_layer is None:
             if config.inputs is None or config.outputs is None:
@@ -292,20 +411,23 @@ class BlackFox:
         column_range = range(0, column_count)
         headers = map(lambda i: 'column_'+str(i), column_range)
         data_set.insert(0, ','.join(headers))
-        csv = '\n'.join(data_set)
-        tmp_file.write(csv.encode("utf-8"))
+        csv = '\n'.join(data_set).encode("utf-8")
+        tmp_file.write(csv)
         tmp_file.close()
+        self.metrics.count('stage_bytes', len(csv), stage='create_tmp_csv')
         data_set_path = str(tmp_file.name)
         return data_set_path
 
     def __create_csv(self, config, input_set, output_set, input_validation_set, output_validation_set):
         data_set_path = None
         if input_set is not None and output_set is not None:
-            data_set_path = self.__create_tmp_csv(config, input_set, output_set)
+            with self.metrics.timer('stage_seconds', stage='create_tmp_csv'):
+                data_set_path = self.__create_tmp_csv(config, input_set, output_set)
 
         validation_set_path = None
         if input_validation_set is not None and output_validation_set is not None:
-            validation_set_path = self.__create_tmp_csv(config, input_validation_set, output_validation_set)
+            with self.metrics.timer('stage_seconds', stage='create_tmp_csv'):
+                validation_set_path = self.__create_tmp_csv(config, input_validation_set, output_validation_set)
 
         return data_set_path, validation_set_path
 
@@ -352,8 +474,8 @@ class BlackFox:
         self, id, integrate_scaler=False,
         model_type=NeuralNetworkType.H5, path=None
     ):
-        temp_path = self.ann_model_api.download(
-            id, integrate_scaler=integrate_scaler, model_type=model_type)
+        temp_path = self.__download_model(
+            self.ann_model_api, id, integrate_scaler=integrate_scaler, model_type=model_type)
         if path is None:
             return open(temp_path, 'rb')
         else:
@@ -363,6 +485,55 @@ class BlackFox:
         model_id = self.ann_optimization_api.get_model_id(optimization_id, generation)
         return self.download_ann_model(model_id, integrate_scaler=integrate_scaler, model_type=model_type, path=path)
 
+    def download_optimized_ann_model(
+        self, id, path, integrate_scaler=False, quantization=None, optimization_level='extended',
+        validation_inputs=None, validation_outputs=None
+    ):
+        """Downloads an ONNX model and saves a graph-optimized, optionally quantized variant next to it.
+
+        The model id and scaler setting of the downloaded model are recorded in path + '.source'; the ONNX
+        model is downloaded again unless they match, and the variant is rebuilt when it is older than the
+        model (see optimize_onnx_model).
+
+        Parameters
+        ----------
+        id : str
+            Model id
+        path : str
+            Path of the downloaded ONNX model, e.g. 'model.onnx'
+        integrate_scaler : bool
+            If True, the model is downloaded with the scaler integrated
+        quantization : str
+            None, 'int8' or 'float16'
+        optimization_level : str
+            'basic', 'extended' or 'all'
+        validation_inputs : numpy.ndarray or list
+            Optional validation rows to compare the variant with the original model
+        validation_outputs : numpy.ndarray or list
+            Optional expected outputs of the validation rows
+
+        Returns
+        -------
+        (str, dict)
+            Path of the optimized model and the compare_onnx_models report (None without validation_inputs)
+        """
+        source = 'id=' + id + '\nintegrate_scaler=' + str(bool(integrate_scaler)) + '\n'
+        source_path = path + '.source'
+        cached = False
+        if os.path.exists(path) and os.path.exists(source_path):
+            with open(source_path, encoding='utf-8') as f:
+                cached = f.read() == source
+        if not cached:
+            self.download_ann_model(id, integrate_scaler=integrate_scaler, model_type=NeuralNetworkType.ONNX, path=path)
+            with open(source_path, 'w', encoding='utf-8') as f:
+                f.write(source)
+        with self.metrics.timer('stage_seconds', stage='optimize_model'):
+            optimized_path = optimize_onnx_model(path, quantization, optimization_level)
+        report = None
+        if validation_inputs is not None:
+            report = compare_onnx_models(path, optimized_path, validation_inputs, validation_outputs)
+        return optimized_path, report
+
     def optimize_ann(
         self,
         input_set=None,
@@ -557,7 +728,8 @@ class BlackFox:
         else:
             self.__set_neurons_count(config)
 
-        self.__upload_csv(config, data_set_path, data_file, validation_set_path, validation_file)
+        with self.metrics.timer('stage_seconds', stage='upload_csv'):
+            self.__upload_csv(config, data_set_path, data_file, validation_set_path, validation_file)
         
         print("Starting...")
         if is_series:
@@ -603,6 +775,7 @@ class BlackFox:
 
         running = True
         status = None
+        outage = OutageBudget(self.outage_budget, self.client.retry_policy)
         while running:
             try:
                 statuses = self.ann_optimization_api.get_status(id)
@@ -610,20 +783,19 @@ class BlackFox:
                     status = statuses[-1]
                 running = (status.state == 'Active')
                 self.__log_nn_statues(log_writer, id, statuses)
-            except ConnectionError as e:
-                self.__log_string(log_writer, "Connection Error, please check your connection.")
-            except ApiException as e:
-                self.__log_string(log_writer, "Server Error: " + str(e.body))
-                print("Stopping optimization: "+id)
-                self.stop_ann_optimization(id)
-                running = False
-                status.state = 'Error'
+                outage.reset()
             except Exception as e:
-                self.__log_string(log_writer, "Error: " + str(e.args))
-                print("Stopping optimization: "+id)
-                self.stop_ann_optimization(id)
-                running = False
-                status.state = 'Error'
+                if outage.tolerate(e):
+                    self.__log_string(log_writer, outage.describe(e))
+                else:
+                    if isinstance(e, ApiException):
+                        self.__log_string(log_writer, "Server Error: " + str(e.body))
+                    else:
+                        self.__log_string(log_writer, "Error: " + str(e.args))
+                    print("Stopping optimization: "+id)
+                    self.stop_ann_optimization(id)
+                    running = False
+                    status.state = 'Error'
             time.sleep(status_interval)
 
         if status.state == 'Finished' or status.state == 'Stopped':
@@ -669,7 +841,8 @@ class BlackFox:
         Returns
         -------
         list[AnnOptimizationStatus]
-            A list of objects depicting the current optimization status
+            A list of objects depicting the current optimization status,
+            StatusRecord objects if the client was created with compact_statuses=True
         """
         status = self.ann_optimization_api.get_status(id)
 
@@ -679,6 +852,8 @@ class BlackFox:
         """Stops current async optimization.
 
         Sends a request for stopping the ongoing optimization, and returns the current best solution.
+        Transient errors while waiting for the optimization to stop are tolerated for outage_budget
+        seconds; other errors and longer outages raise an exception.
 
         Parameters
         ----------
@@ -687,18 +862,11 @@ class BlackFox:
         Returns
         -------
         AnnOptimizationStatus
-            An object depicting the current optimization status
+            An object depicting the current optimization status,
+            a StatusRecord if the client was created with compact_statuses=True
         """
         self.ann_optimization_api.stop(id)
-        state = 'Active'
-        last_status = None
-        while state == 'Active':
-            status = self.get_ann_optimization_status(id)
-            if status is not None or len(status) > 0:
-                last_status = status[-1]
-                state = last_status.state
-
-        return last_status
+        return self.__wait_stopped(id, self.get_ann_optimization_status)
 
     #endregion
 
@@ -719,8 +887,8 @@ class BlackFox:
         self, id, integrate_scaler=False,
         model_type=NeuralNetworkType.H5, path=None
     ):
-        temp_path = self.rnn_model_api.download(
-            id, integrate_scaler=integrate_scaler, model_type=model_type)
+        temp_path = self.__download_model(
+            self.rnn_model_api, id, integrate_scaler=integrate_scaler, model_type=model_type)
         if path is None:
             return open(temp_path, 'rb')
         else:
@@ -779,7 +947,8 @@ class BlackFox:
 
         self.__set_neurons_count(config)
 
-        self.__upload_csv(config, data_set_path, data_file, validation_set_path, validation_file)
+        with self.metrics.timer('stage_seconds', stage='upload_csv'):
+            self.__upload_csv(config, data_set_path, data_file, validation_set_path, validation_file)
 
         print("Starting...")
         return self.rnn_optimization_api.start(rnn_optimization_config=config)
@@ -878,6 +1047,7 @@ class BlackFox:
 
         running = True
         status = None
+        outage = OutageBudget(self.outage_budget, self.client.retry_policy)
         while running:
             try:
                 statuses = self.rnn_optimization_api.get_status(id)
@@ -885,20 +1055,19 @@ class BlackFox:
                     status = statuses[-1]
                 running = (status.state == 'Active')
                 self.__log_nn_statues(log_writer, id, statuses)
-            except ConnectionError as e:
-                self.__log_string(log_writer, "Connection Error, please check your connection.")
-            except ApiException as e:
-                self.__log_string(log_writer, "Server Error: " + str(e.body))
-                print("Stopping optimization: "+id)
-                self.stop_rnn_optimization(id)
-                running = False
-                status.state = 'Error'
+                outage.reset()
             except Exception as e:
-                self.__log_string(log_writer, "Error: " + str(e.args))
-                print("Stopping optimization: "+id)
-                self.stop_rnn_optimization(id)
-                running = False
-                status.state = 'Error'
+                if outage.tolerate(e):
+                    self.__log_string(log_writer, outage.describe(e))
+                else:
+                    if isinstance(e, ApiException):
+                        self.__log_string(log_writer, "Server Error: " + str(e.body))
+                    else:
+                        self.__log_string(log_writer, "Error: " + str(e.args))
+                    print("Stopping optimization: "+id)
+                    self.stop_rnn_optimization(id)
+                    running = False
+                    status.state = 'Error'
             time.sleep(status_interval)
 
         if status.state == 'Finished' or status.state == 'Stopped':
@@ -945,7 +1114,8 @@ class BlackFox:
         Returns
         -------
         list[RnnOptimizationStatus]
-            A list of objects depicting the current optimization status
+            A list of objects depicting the current optimization status,
+            StatusRecord objects if the client was created with compact_statuses=True
         """
         status = self.rnn_optimization_api.get_status(id)
 
@@ -955,6 +1125,8 @@ class BlackFox:
         """Stops current async optimization.
 
         Sends a request for stopping the ongoing optimization, and returns the current best solution.
+        Transient errors while waiting for the optimization to stop are tolerated for outage_budget
+        seconds; other errors and longer outages raise an exception.
 
         Parameters
         ----------
@@ -963,18 +1135,11 @@ class BlackFox:
         Returns
         -------
         RnnOptimizationStatus
-            An object depicting the current optimization status
+            An object depicting the current optimization status,
+            a StatusRecord if the client was created with compact_statuses=True
         """
-        self.ann_optimization_api.stop(id)
-        state = 'Active'
-        last_status = None
-        while state == 'Active':
-            status = self.get_ann_optimization_status(id)
-            if status is not None or len(status) > 0:
-                last_status = status[-1]
-                state = last_status.state
-
-        return last_status
+        self.rnn_optimization_api.stop(id)
+        return self.__wait_stopped(id, self.get_rnn_optimization_status)
 
     #endregion
 
@@ -994,7 +1159,7 @@ class BlackFox:
     def download_random_forest_model(
         self, id, model_type=RandomForestModelType.BINARY, path=None
     ):
-        temp_path = self.rf_model_api.download(id, model_type=model_type)
+        temp_path = self.__download_model(self.rf_model_api, id, model_type=model_type)
         if path is None:
             return open(temp_path, 'rb')
         else:
@@ -1185,7 +1350,8 @@ class BlackFox:
         if config.max_depth is None:
             config.max_depth = RangeInt(5, 15) 
 
-        self.__upload_csv(config, data_set_path, data_file, validation_set_path, validation_file)
+        with self.metrics.timer('stage_seconds', stage='upload_csv'):
+            self.__upload_csv(config, data_set_path, data_file, validation_set_path, validation_file)
 
         print("Starting...")
         if is_series:
@@ -1229,6 +1395,7 @@ class BlackFox:
 
         running = True
         status = None
+        outage = OutageBudget(self.outage_budget, self.client.retry_policy)
         while running:
             try:
                 statuses = self.rf_optimization_api.get_status(id)
@@ -1236,20 +1403,19 @@ class BlackFox:
                     status = statuses[-1]
                 running = (status.state == 'Active')
                 self.__log_rf_statues(log_writer, id, statuses)
-            except ConnectionError as e:
-                self.__log_string(log_writer, "Connection Error, please check your connection.")
-            except ApiException as e:
-                self.__log_string(log_writer, "Server Error: " + str(e.body))
-                print("Stopping optimization: "+id)
-                self.stop_random_forest_optimization(id)
-                running = False
-                status.state = 'Error'
+                outage.reset()
             except Exception as e:
-                self.__log_string(log_writer, "Error: " + str(e.args))
-                print("Stopping optimization: "+id)
-                self.stop_random_forest_optimization(id)
-                running = False
-                status.state = 'Error'
+                if outage.tolerate(e):
+                    self.__log_string(log_writer, outage.describe(e))
+                else:
+                    if isinstance(e, ApiException):
+                        self.__log_string(log_writer, "Server Error: " + str(e.body))
+                    else:
+                        self.__log_string(log_writer, "Error: " + str(e.args))
+                    print("Stopping optimization: "+id)
+                    self.stop_random_forest_optimization(id)
+                    running = False
+                    status.state = 'Error'
             time.sleep(status_interval)
 
         if status.state == 'Finished' or status.state == 'Stopped':
@@ -1292,7 +1458,8 @@ class BlackFox:
         Returns
         -------
         list[RandomForestOptimizationStatus]
-            A list of objects depicting the current optimization status
+            A list of objects depicting the current optimization status,
+            StatusRecord objects if the client was created with compact_statuses=True
         """
         status = self.rf_optimization_api.get_status(id)
 
@@ -1302,6 +1469,8 @@ class BlackFox:
         """Stops current async optimization.
 
         Sends a request for stopping the ongoing optimization, and returns the current best solution.
+        Transient errors while waiting for the optimization to stop are tolerated for outage_budget
+        seconds; other errors and longer outages raise an exception.
 
         Parameters
         ----------
@@ -1310,18 +1479,11 @@ class BlackFox:
         Returns
         -------
         RandomForestOptimizationStatus
-            An object depicting the current optimization status
+            An object depicting the current optimization status,
+            a StatusRecord if the client was created with compact_statuses=True
         """
         self.rf_optimization_api.stop(id)
-        state = 'Active'
-        last_status = None
-        while state == 'Active':
-            status = self.get_random_forest_optimization_status(id)
-            if status is not None or len(status) > 0:
-                last_status = status[-1]
-                state = last_status.state
-
-        return last_status
+        return self.__wait_stopped(id, self.get_random_forest_optimization_status)
 
     
     #endregion
@@ -1342,7 +1504,7 @@ class BlackFox:
     def download_xgboost_model(
         self, id, path=None
     ):
-        temp_path = self.xgb_model_api.download(id)
+        temp_path = self.__download_model(self.xgb_model_api, id)
         if path is None:
             return open(temp_path, 'rb')
         else:
@@ -1535,7 +1697,8 @@ class BlackFox:
         if config.engine_config is None:
             config.engine_config = OptimizationEngineConfig()
 
-        self.__upload_csv(config, data_set_path, data_file, validation_set_path, validation_file)
+        with self.metrics.timer('stage_seconds', stage='upload_csv'):
+            self.__upload_csv(config, data_set_path, data_file, validation_set_path, validation_file)
 
         print("Starting...")
         if is_series:
@@ -1577,6 +1740,7 @@ class BlackFox:
 
         running = True
         status = None
+        outage = OutageBudget(self.outage_budget, self.client.retry_policy)
         while running:
             try:
                 statuses = self.xgb_optimization_api.get_status(id)
@@ -1584,20 +1748,19 @@ class BlackFox:
                     status = statuses[-1]
                 running = (status.state == 'Active')
                 self.__log_xgb_statues(log_writer, id, statuses)
-            except ConnectionError as e:
-                self.__log_string(log_writer, "Connection Error, please check your connection.")
-            except ApiException as e:
-                self.__log_string(log_writer, "Server Error: " + str(e.body))
-                print("Stopping optimization: "+id)
-                self.stop_xgboost_optimization(id)
-                running = False
-                status.state = 'Error'
+                outage.reset()
             except Exception as e:
-                self.__log_string(log_writer, "Error: " + str(e.args))
-                print("Stopping optimization: "+id)
-                self.stop_xgboost_optimization(id)
-                running = False
-                status.state = 'Error'
+                if outage.tolerate(e):
+                    self.__log_string(log_writer, outage.describe(e))
+                else:
+                    if isinstance(e, ApiException):
+                        self.__log_string(log_writer, "Server Error: " + str(e.body))
+                    else:
+                        self.__log_string(log_writer, "Error: " + str(e.args))
+                    print("Stopping optimization: "+id)
+                    self.stop_xgboost_optimization(id)
+                    running = False
+                    status.state = 'Error'
             time.sleep(status_interval)
 
         if status.state == 'Finished' or status.state == 'Stopped':
@@ -1640,7 +1803,8 @@ class BlackFox:
         Returns
         -------
         list[XGBoostOptimizationStatus]
-            A list of objects depicting the current optimization status
+            A list of objects depicting the current optimization status,
+            StatusRecord objects if the client was created with compact_statuses=True
         """
         status = self.xgb_optimization_api.get_status(id)
 
@@ -1650,6 +1814,8 @@ class BlackFox:
         """Stops current async optimization.
 
         Sends a request for stopping the ongoing optimization, and returns the current best solution.
+        Transient errors while waiting for the optimization to stop are tolerated for outage_budget
+        seconds; other errors and longer outages raise an exception.
 
         Parameters
         ----------
@@ -1657,19 +1823,12 @@ class BlackFox:
             Optimization process id
         Returns
         -------
-        RandomForestOptimizationStatus
-            An object depicting the current optimization status
+        XGBoostOptimizationStatus
+            An object depicting the current optimization status,
+            a StatusRecord if the client was created with compact_statuses=True
         """
         self.xgb_optimization_api.stop(id)
-        state = 'Active'
-        last_status = None
-        while state == 'Active':
-            status = self.get_xgboost_optimization_status(id)
-            if status is not None or len(status) > 0:
-                last_status = status[-1]
-                state = last_status.state
-
-        return last_status
+        return self.__wait_stopped(id, self.get_xgboost_optimization_status)
 
     
     #endregion
@@ -1784,41 +1943,399 @@ class BlackFox:
 
         return self.xgb_model_api.get_metadata(id)
 
+    def __model_api(self, model_kind):
+        apis = {
+            'ann': self.ann_model_api,
+            'rnn': self.rnn_model_api,
+            'random_forest': self.rf_model_api,
+            'xgboost': self.xgb_model_api
+        }
+        if model_kind not in apis:
+            raise Exception('Unknown model kind ' + str(model_kind) + ', expected one of: ' + ', '.join(apis))
+        return apis[model_kind]
+
+    def iter_metadata_bulk(self, paths, model_kind='ann', processes=None, threads=8):
+        """Bulk model metadata retrieval
+
+        Hashes model files in a process pool, checks which models already exist on the service,
+        uploads only the missing ones and fetches metadata, all concurrently.
+        Records are yielded as soon as they are ready, in no particular order.
+
+        Parameters
+        ----------
+        paths : str or list[str]
+            Model files, directories or glob patterns (e.g. 'models/**/*.onnx')
+        model_kind : str
+            Model kind (ann | rnn | random_forest | xgboost)
+        processes : int
+            Number of processes used for hashing, defaults to the number of CPUs
+        threads : int
+            Number of concurrent requests sent to the service
+
+        Returns
+        -------
+        generator[dict]
+            records with path, id, uploaded, metadata and error keys
+        """
+        model_api = self.__model_api(model_kind)
+        hashed = hash_files(expand_paths(paths), processes=processes)
+
+        def record(path, id, uploaded=False, metadata=None, error=None):
+            return {'path': path, 'id': id, 'uploaded': uploaded, 'metadata': metadata, 'error': error}
+
+        # identical files are checked, uploaded and described only once
+        by_id = {}
+        for path, id, error in hashed:
+            if error is not None:
+                yield record(path, None, error=error)
+            else:
+                by_id.setdefault(id, []).append(path)
+
+        def exists(id):
+            try:
+                model_api.exists(id)
+                return True
+            except ApiException as e:
+                if e.status == 404:
+                    return False
+                raise e
+
+        def process(id):
+            uploaded = False
+            if not exists(id):
+                id = model_api.upload(file=by_id[id][0])
+                uploaded = True
+            return id, uploaded, model_api.get_metadata(id)
+
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            futures = {executor.submit(process, id): id for id in by_id}
+            for future in as_completed(futures):
+                paths = by_id[futures[future]]
+                try:
+                    id, uploaded, metadata = future.result()
+                    for path in paths:
+                        yield record(path, id, uploaded, metadata)
+                except Exception as e:
+                    for path in paths:
+                        yield record(path, futures[future], error=str(e))
+
+    def get_metadata_bulk(self, paths, model_kind='ann', sink=None, processes=None, threads=8):
+        """Bulk model metadata retrieval
+
+        Same as iter_metadata_bulk, but streams the records to a sink.
+
+        Parameters
+        ----------
+        paths : str or list[str]
+            Model files, directories or glob patterns (e.g. 'models/**/*.onnx')
+        model_kind : str
+            Model kind (ann | rnn | random_forest | xgboost)
+        sink : JsonLinesSink or ParquetSink
+            Optional sink the records are written to; the sink is closed when all records are written
+        processes : int
+            Number of processes used for hashing, defaults to the number of CPUs
+        threads : int
+            Number of concurrent requests sent to the service
+
+        Returns
+        -------
+        list[dict] or int
+            records if sink is None, otherwise the number of records written
+        """
+        records = self.iter_metadata_bulk(paths, model_kind=model_kind, processes=processes, threads=threads)
+        if sink is None:
+            return list(records)
+        count = 0
+        with sink:
+            for r in records:
+                sink.write(r)
+                count += 1
+        return count
+
     #endregion
 
     #region convert
-    def convert_ann_to(self, model_path, model_type, model_dst_path=None, integrate_scaler=False):
-        id = None
+    def __cached_conversion(self, key):
+        with self.conversion_cache_lock:
+            data = self.conversion_cache.get(key)
+            if data is not None:
+                self.conversion_cache.move_to_end(key)
+            return data
+
+    def __cache_conversion(self, key, data):
+        if len(data) > self.conversion_cache_bytes:
+            return
+        with self.conversion_cache_lock:
+            previous = self.conversion_cache.pop(key, None)
+            if previous is not None:
+                self.conversion_cache_size -= len(previous)
+            self.conversion_cache[key] = data
+            self.conversion_cache_size += len(data)
+            while self.conversion_cache_size > self.conversion_cache_bytes:
+                _, dropped = self.conversion_cache.popitem(last=False)
+                self.conversion_cache_size -= len(dropped)
+
+    def __convert_ann(self, source_hash, model_path, model_type, integrate_scaler, cache_dir):
+        key = (source_hash, model_type, integrate_scaler)
+        data = self.__cached_conversion(key)
+        if data is not None:
+            self.metrics.count('cache_hits', cache='conversion')
+            return data
+        self.metrics.count('cache_misses', cache='conversion')
+        cache_path = None
+        if cache_dir is not None:
+            cache_path = os.path.join(cache_dir, '%s-%d.%s' % (source_hash, int(integrate_scaler), model_type))
+            if os.path.exists(cache_path):
+                with open(cache_path, 'rb') as f:
+                    data = f.read()
+        if data is None:
+            id = self.upload_ann_model(model_path)
+            stream = self.download_ann_model(id, integrate_scaler=integrate_scaler, model_type=model_type)
+            data = stream.read()
+            stream.close()
+            os.remove(stream.name)
+            if cache_path is not None:
+                os.makedirs(cache_dir, exist_ok=True)
+                with open(cache_path + '.tmp', 'wb') as f:
+                    f.write(data)
+                os.replace(cache_path + '.tmp', cache_path)
+        self.__cache_conversion(key, data)
+        return data
+
+    def convert_ann_to(self, model_path, model_type, model_dst_path=None, integrate_scaler=False, cache_dir=None):
+        """Converts neural network model to another format
+
+        Conversions are cached by (model content, model type, integrate_scaler), in memory up to
+        conversion_cache_bytes and optionally in cache_dir, so converting the same model again does
+        not contact the service.
+
+        Parameters
+        ----------
+        model_path : str or BytesIO
+            Model file or model content
+        model_type : str
+            Target model file format (h5 | onnx | pb)
+        model_dst_path : str
+            Optional save path for the converted model
+        integrate_scaler : bool
+            If True, Black Fox will integrate a scaler function used for data scaling/normalization in the model
+        cache_dir : str
+            Optional directory where converted models are cached between processes
+
+        Returns
+        -------
+        BytesIO
+            byte array from converted model
+        """
+        file_path = None
         if isinstance(model_path, BytesIO):
+            content = model_path.read()
+            source_hash = hashlib.sha1(content).hexdigest()
             with NamedTemporaryFile(delete=False) as out:
-                out.write(model_path.read())
+                out.write(content)
                 file_path = str(out.name)
-            id = self.upload_network(file_path)
-            os.remove(file_path)
         else:
-            id = self.upload_network(model_path)
-        stream = self.download_network(
-            id,
-            model_type=model_type,
-            integrate_scaler=integrate_scaler,
-            path=model_dst_path
-        )
-        if stream is not None:
-            data = stream.read()
-            byte_io = BytesIO(data)
-            return byte_io
+            source_hash = self.__sha1(model_path)
+        try:
+            data = self.__convert_ann(source_hash, file_path or model_path, model_type, integrate_scaler, cache_dir)
+        finally:
+            if file_path is not None:
+                os.remove(file_path)
+        if model_dst_path is not None:
+            with open(model_dst_path, 'wb') as f:
+                f.write(data)
+        return BytesIO(data)
+
+    def convert_ann_models(self, model_paths, model_types, integrate_scaler=False, cache_dir=None, threads=8, processes=None):
+        """Converts many neural network models to many formats concurrently
+
+        Parameters
+        ----------
+        model_paths : str or list[str]
+            Model files, directories or glob patterns (e.g. 'models/*.h5')
+        model_types : list[str]
+            Target model file formats (h5 | onnx | pb)
+        integrate_scaler : bool
+            If True, Black Fox will integrate a scaler function used for data scaling/normalization in the model
+        cache_dir : str
+            Optional directory where converted models are cached between processes
+        threads : int
+            Number of concurrent conversions
+        processes : int
+            Number of processes used for hashing, defaults to the number of CPUs
+
+        Returns
+        -------
+        dict
+            (model path, model type) -> BytesIO, or the exception raised while converting
+        """
+        if isinstance(model_types, str):
+            model_types = [model_types]
+        hashed = hash_files(expand_paths(model_paths), processes=processes)
+        results = {}
+        # identical files are converted only once per model type
+        by_hash = {}
+        for path, source_hash, error in hashed:
+            if error is not None:
+                for model_type in model_types:
+                    results[(path, model_type)] = IOError(error)
+            else:
+                by_hash.setdefault(source_hash, []).append(path)
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            futures = {}
+            for source_hash, paths in by_hash.items():
+                for model_type in model_types:
+                    future = executor.submit(self.__convert_ann, source_hash, paths[0], model_type, integrate_scaler, cache_dir)
+                    futures[future] = (paths, model_type)
+            for future in as_completed(futures):
+                paths, model_type = futures[future]
+                try:
+                    data = future.result()
+                    for path in paths:
+                        results[(path, model_type)] = BytesIO(data)
+                except Exception as e:
+                    for path in paths:
+                        results[(path, model_type)] = e
+        return results
 
     def convert_ann_to_onnx(
         self, model_path,
         model_dst_path=None, integrate_scaler=False
     ):
-        self.convert_to(model_path, 'onnx', model_dst_path,
-                        integrate_scaler=integrate_scaler)
+        return self.convert_ann_to(model_path, NeuralNetworkType.ONNX, model_dst_path,
+                                   integrate_scaler=integrate_scaler)
 
     def convert_ann_to_pb(
         self, model_path,
         model_dst_path=None, integrate_scaler=False
     ):
-        self.convert_to(model_path, 'pb', model_dst_path,
-                        integrate_scaler=integrate_scaler)
+        return self.convert_ann_to(model_path, NeuralNetworkType.PB, model_dst_path,
+                                   integrate_scaler=integrate_scaler)
+    #endregion
+
+    #region local inference
+
+    def __model_bytes(self, model_id, model_kind, model_type, integrate_scaler):
+        if model_kind in ('ann', 'rnn'):
+            model_api = self.ann_model_api if model_kind == 'ann' else self.rnn_model_api
+            temp_path = self.__download_model(model_api, model_id, integrate_scaler=integrate_scaler,
+                                              model_type=model_type or NeuralNetworkType.ONNX)
+        elif model_kind == 'random_forest':
+            temp_path = self.__download_model(self.rf_model_api, model_id,
+                                              model_type=model_type or RandomForestModelType.BINARY)
+        elif model_kind == 'xgboost':
+            temp_path = self.__download_model(self.xgb_model_api, model_id)
+        else:
+            raise Exception('Unknown model kind: ' + str(model_kind))
+        try:
+            with open(temp_path, 'rb') as f:
+                return f.read()
+        finally:
+            os.remove(temp_path)
+
+    def get_predictor(self, model_id, model_kind='ann', model_type=None, integrate_scaler=True, pool=None, **kwargs):
+        """Returns a local predictor of a model, downloading and loading it only if it is not in the model pool.
+
+        Parameters
+        ----------
+        model_id : str
+            Model id, e.g. from get_model_id
+        model_kind : str
+            'ann', 'rnn', 'random_forest' or 'xgboost'
+        model_type : str
+            Model format, defaults to NeuralNetworkType.ONNX for neural networks and RandomForestModelType.BINARY for random forests
+        integrate_scaler : bool
+            If True, neural networks are downloaded with the scaler integrated in the model
+        pool : ModelPool
+            Pool keeping loaded models, defaults to the process-wide pool
+        kwargs
+            Passed to the predictor (see load_predictor)
+
+        Returns
+        -------
+        Predictor
+            OnnxPredictor, SklearnPredictor or XGBoostPredictor
+        """
+        if pool is None:
+            pool = get_default_pool()
+        if model_kind in ('ann', 'rnn'):
+            model_type = model_type or NeuralNetworkType.ONNX
+            variant = 'scaler' if integrate_scaler else None
+        else:
+            variant = None
+            if model_kind == 'random_forest':
+                model_type = model_type or RandomForestModelType.BINARY
+        return pool.get(
+            model_id,
+            lambda: self.__model_bytes(model_id, model_kind, model_type, integrate_scaler),
+            model_kind, model_type, variant, **kwargs)
+
+    def __optimization_api(self, model_kind):
+        apis = {
+            'ann': self.ann_optimization_api,
+            'rnn': self.rnn_optimization_api,
+            'random_forest': self.rf_optimization_api,
+            'xgboost': self.xgb_optimization_api
+        }
+        if model_kind not in apis:
+            raise Exception('Unknown model kind ' + str(model_kind) + ', expected one of: ' + ', '.join(apis))
+        return apis[model_kind]
+
+    def build_ensemble(
+        self, optimization_id, model_kind='ann', k=5, model_type=None, integrate_scaler=True,
+        method='mean', weights=None, threads=8, pool=None, **kwargs
+    ):
+        """Builds an ensemble of the best generation models of an optimization.
+
+        Generations are ranked by validation_set_error; generations sharing the same best model count once.
+        Model ids and models are fetched concurrently and loaded through the model pool.
+
+        Parameters
+        ----------
+        optimization_id : str
+            Optimization id
+        model_kind : str
+            'ann', 'rnn', 'random_forest' or 'xgboost'
+        k : int
+            Maximum number of ensemble members
+        model_type : str
+            Model format, see get_predictor
+        integrate_scaler : bool
+            If True, neural networks are downloaded with the scaler integrated in the model
+        method : str
+            'mean' or 'vote', see Ensemble
+        weights : str or list[float]
+            None, 'inverse_error' or one weight per member, see Ensemble
+        threads : int
+            Number of concurrent downloads and of members scored at the same time
+        pool : ModelPool
+            Pool keeping loaded models, defaults to the process-wide pool
+        kwargs
+            Passed to the predictors (see load_predictor)
+
+        Returns
+        -------
+        Ensemble
+        """
+        optimization_api = self.__optimization_api(model_kind)
+        ranked = select_generations(optimization_api.get_status(optimization_id), None)
+        selected = []
+        seen = set()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            start = 0
+            while len(selected) < k and start < len(ranked):
+                window = ranked[start:start + k - len(selected)]
+                start += len(window)
+                model_ids = executor.map(lambda s: optimization_api.get_model_id(optimization_id, s.generation), window)
+                for status, model_id in zip(window, model_ids):
+                    if model_id not in seen:
+                        seen.add(model_id)
+                        selected.append((model_id, status))
+            predictors = list(executor.map(
+                lambda m: self.get_predictor(m[0], model_kind, model_type, integrate_scaler, pool, **kwargs), selected))
+        if not selected:
+            raise Exception('Optimization ' + optimization_id + ' has no generation with a best model')
+        members = [EnsembleMember(model_id, status.generation, status.validation_set_error, predictor)
+                   for (model_id, status), predictor in zip(selected, predictors)]
+        return Ensemble(members, method=method, weights=weights, threads=threads)
     #endregion
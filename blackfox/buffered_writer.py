@@ -0,0 +1,166 @@
+import sys
+import time
+import queue
+import atexit
+import warnings
+import threading
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+class _Flush(object):
+
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class _Close(_Flush):
+    pass
+
+
+class BufferedWriter(object):
+    """Writes lines to a file or stream from a background thread.
+
+    write never blocks on disk I/O: lines are queued and written in batches by a daemon thread
+    that keeps the file open and flushes every flush_interval seconds, on flush() and at
+    interpreter exit. Use get_buffered_writer to share one writer per file between log writers.
+
+    Parameters
+    ----------
+    target : str
+        File path, or a stream such as sys.stdout
+    flush_interval : float
+        Maximum seconds a written line stays in memory
+    max_batch : int
+        Maximum number of lines written with a single write call
+
+    """
+
+    def __init__(self, target=sys.stdout, flush_interval=1.0, max_batch=1000):
+        self.target = target
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.queue = queue.Queue()
+        self.file = None
+        self.closed = False
+        self.thread = threading.Thread(target=self.__run, name='blackfox-log-writer')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def write(self, msg, clear=False):
+        """Queues msg as one line; if clear is True the file is truncated before it is written."""
+        if self.closed:
+            raise Exception('BufferedWriter is closed')
+        self.queue.put((msg, clear))
+
+    def flush(self, timeout=None):
+        """Waits until every queued line is written and flushed."""
+        if self.closed:
+            return
+        request = _Flush()
+        self.queue.put(request)
+        request.done.wait(timeout)
+
+    def close(self, timeout=None):
+        """Writes the queued lines, closes the file and stops the thread."""
+        if self.closed:
+            return
+        request = _Close()
+        self.queue.put(request)
+        request.done.wait(timeout)
+        self.closed = True
+
+    def __open(self, clear):
+        if not isinstance(self.target, str):
+            return self.target
+        if clear and self.file is not None:
+            self.file.close()
+            self.file = None
+        if self.file is None:
+            self.file = open(self.target, mode='w' if clear else 'a', encoding='utf-8')
+        return self.file
+
+    def __write(self, lines, clear):
+        if lines or clear:
+            f = self.__open(clear)
+            f.write(''.join(lines))
+
+    def __flush_file(self):
+        f = self.file if isinstance(self.target, str) else self.target
+        if f is not None:
+            f.flush()
+
+    def __run(self):
+        last_flush = time.monotonic()
+        dirty = False
+        while True:
+            timeout = max(0.0, self.flush_interval - (time.monotonic() - last_flush)) if dirty else None
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            lines = []
+            request = None
+            while item is not None:
+                if isinstance(item, _Flush):
+                    request = item
+                    break
+                msg, clear = item
+                if clear:
+                    self.__write(lines, False)
+                    lines = []
+                    self.__write([msg + '\n'], True)
+                else:
+                    lines.append(msg + '\n')
+                if len(lines) >= self.max_batch:
+                    break
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    item = None
+            try:
+                self.__write(lines, False)
+                dirty = dirty or len(lines) > 0
+                if dirty and (request is not None or time.monotonic() - last_flush >= self.flush_interval):
+                    self.__flush_file()
+                    last_flush = time.monotonic()
+                    dirty = False
+            except Exception as e:
+                print('BufferedWriter failed to write ' + str(self.target) + ': ' + str(e), file=sys.stderr)
+            if request is not None:
+                if isinstance(request, _Close):
+                    if isinstance(self.target, str) and self.file is not None:
+                        self.file.close()
+                        self.file = None
+                    request.done.set()
+                    return
+                request.done.set()
+
+
+def get_buffered_writer(target=sys.stdout, flush_interval=1.0):
+    """Returns the BufferedWriter shared by all log writers writing to target.
+
+    The first caller sets the flush interval of a shared writer; a different flush_interval
+    of a later caller is ignored with a warning.
+    """
+    key = target if isinstance(target, str) else id(target)
+    with _writers_lock:
+        writer = _writers.get(key)
+        if writer is None or writer.closed:
+            writer = _writers[key] = BufferedWriter(target, flush_interval=flush_interval)
+        elif writer.flush_interval != flush_interval:
+            warnings.warn('Shared BufferedWriter of ' + str(target) + ' keeps flush_interval ' +
+                          str(writer.flush_interval) + ', ignoring ' + str(flush_interval), stacklevel=3)
+        return writer
+
+
+def flush_all(timeout=None):
+    """Flushes every shared BufferedWriter."""
+    with _writers_lock:
+        writers = list(_writers.values())
+    for writer in writers:
+        writer.flush(timeout)
+
+
+atexit.register(flush_all, 5.0)
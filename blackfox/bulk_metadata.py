@@ -0,0 +1,168 @@
+import os
+import glob
+import json
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+BUF_SIZE = 65536
+
+
+def expand_paths(paths):
+    """Expands files, directories and glob patterns into a sorted list of unique files.
+
+    Parameters
+    ----------
+    paths : str or list[str]
+        File paths, directories (searched recursively) or glob patterns (``**`` is supported)
+
+    Returns
+    -------
+    list[str]
+        Paths of all matched files
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+    files = set()
+    for p in paths:
+        if os.path.isdir(p):
+            for root, _, names in os.walk(p):
+                for name in names:
+                    files.add(os.path.join(root, name))
+        elif glob.has_magic(p):
+            files.update(f for f in glob.glob(p, recursive=True) if os.path.isfile(f))
+        else:
+            files.add(p)
+    return sorted(files)
+
+
+def sha1_file(path):
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read(BUF_SIZE)
+            if not data:
+                break
+            sha1.update(data)
+    return sha1.hexdigest()
+
+
+def _try_sha1_file(path):
+    try:
+        return path, sha1_file(path), None
+    except IOError as e:
+        return path, None, str(e)
+
+
+def hash_files(paths, processes=None):
+    """Hashes files in a process pool.
+
+    Parameters
+    ----------
+    paths : list[str]
+        Files to hash
+    processes : int
+        Number of worker processes, defaults to the number of CPUs; 1 hashes in the calling process
+
+    Returns
+    -------
+    list[(str, str, str)]
+        (path, sha1, error) for each file, in the same order as paths
+    """
+    if processes == 1 or len(paths) <= 1:
+        return [_try_sha1_file(p) for p in paths]
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        chunksize = max(1, len(paths) // ((processes or os.cpu_count() or 1) * 4))
+        return list(executor.map(_try_sha1_file, paths, chunksize=chunksize))
+
+
+class JsonLinesSink(object):
+    """Writes metadata records to a JSON Lines file, one record per line.
+
+    Parameters
+    ----------
+    file : str
+        Output file path or an open text stream
+
+    """
+
+    def __init__(self, file):
+        if isinstance(file, str):
+            self.stream = open(file, mode='w', encoding='utf-8')
+            self.owns_stream = True
+        else:
+            self.stream = file
+            self.owns_stream = False
+
+    def write(self, record):
+        self.stream.write(json.dumps(record, default=str) + '\n')
+
+    def close(self):
+        if self.owns_stream:
+            self.stream.close()
+        else:
+            self.stream.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class ParquetSink(object):
+    """Writes metadata records to a Parquet file (requires pyarrow).
+
+    Metadata is stored as a JSON string column, since its structure differs between model types.
+
+    Parameters
+    ----------
+    path : str
+        Output file path
+    batch_size : int
+        Number of records buffered before a row group is written
+
+    """
+
+    COLUMNS = ['path', 'id', 'uploaded', 'metadata', 'error']
+
+    def __init__(self, path, batch_size=1024):
+        import pyarrow
+        self.pa = pyarrow
+        self.path = path
+        self.batch_size = batch_size
+        self.schema = pyarrow.schema([
+            ('path', pyarrow.string()),
+            ('id', pyarrow.string()),
+            ('uploaded', pyarrow.bool_()),
+            ('metadata', pyarrow.string()),
+            ('error', pyarrow.string())
+        ])
+        self.writer = None
+        self.rows = []
+
+    def write(self, record):
+        row = dict(record)
+        if row.get('metadata') is not None:
+            row['metadata'] = json.dumps(row['metadata'], default=str)
+        self.rows.append(row)
+        if len(self.rows) >= self.batch_size:
+            self.__flush()
+
+    def __flush(self):
+        import pyarrow.parquet as pq
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.path, self.schema)
+        columns = {c: [r.get(c) for r in self.rows] for c in self.COLUMNS}
+        self.writer.write_table(self.pa.table(columns, schema=self.schema))
+        self.rows = []
+
+    def close(self):
+        if self.rows or self.writer is None:
+            self.__flush()
+        self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -1,11 +1,13 @@
 from datetime import datetime
 import sys
+from blackfox.buffered_writer import get_buffered_writer
 
 
 class CsvLogWriter(object):
 
-    def __init__(self, file=sys.stdout, only_change=True, clear_file=True):
+    def __init__(self, file=sys.stdout, only_change=True, clear_file=True, buffered=False, flush_interval=1.0):
         self.log_file = file
+        self.buffer = get_buffered_writer(file, flush_interval) if buffered else None
         self.write_string(
             'Time,Status,Generation,Total generations,Validation set error,Training set error,Generation time [s],StartTime,End time,Optimization Id, Epoch', clear_file)
         self.only_change = only_change
@@ -64,10 +66,16 @@ class CsvLogWriter(object):
         self.write_random_forest_statues(id, statuses)
 
     def write_string(self, msg, clear=False):
-        if isinstance(self.log_file, str):
+        if self.buffer is not None:
+            self.buffer.write(msg, clear)
+        elif isinstance(self.log_file, str):
             mode = 'w' if clear else 'a'
             with open(self.log_file, mode=mode, encoding='utf-8', buffering=1) as f:
                 f.write(msg+'\n')
         else:
             self.log_file.write(msg+'\n')
             self.log_file.flush()
+
+    def flush(self):
+        if self.buffer is not None:
+            self.buffer.flush()
@@ -0,0 +1,131 @@
+import json
+from blackfox.status_records import STATUS_RECORDS
+
+# (method, resource path) -> response type of the endpoints decoded without ApiClient.deserialize by default:
+# optimization statuses, model metadata and model ids of a generation, the responses BlackFox polls or fetches often
+DEFAULT_ENDPOINTS = {}
+for _kind, _status in (('ann', 'list[AnnOptimizationStatus]'), ('random-forest', 'list[RandomForestOptimizationStatus]'),
+                       ('rnn', 'list[RnnOptimizationStatus]'), ('xgboost', 'list[XGBoostOptimizationStatus]')):
+    DEFAULT_ENDPOINTS[('GET', '/api/' + _kind + '/{id}/status')] = _status
+    DEFAULT_ENDPOINTS[('GET', '/api/' + _kind + '/model/{id}/metadata')] = 'object'
+    DEFAULT_ENDPOINTS[('GET', '/api/' + _kind + '/{id}/model-id/{generation}')] = 'str'
+
+
+def get_loads(backend='auto'):
+    """Returns (name, loads) of a JSON backend.
+
+    Parameters
+    ----------
+    backend : str
+        'orjson', 'json' or 'auto' (orjson if it is installed)
+
+    Returns
+    -------
+    (str, callable)
+        backend name and a loads function accepting str or bytes
+    """
+    if backend in ('auto', 'orjson'):
+        try:
+            import orjson
+            return 'orjson', orjson.loads
+        except ImportError:
+            if backend == 'orjson':
+                raise Exception('orjson is not installed, use: pip install orjson')
+    if backend not in ('auto', 'json'):
+        raise Exception('Unknown JSON backend: ' + str(backend))
+    return 'json', json.loads
+
+
+def record_decoder(record_class):
+    """Returns a function decoding a list of status dicts into record_class instances.
+
+    The (attribute, key) pairs of record_class.FIELDS are looked up once, instead of on every
+    record as StatusRecord.__init__ does.
+
+    Returns
+    -------
+    callable
+        (list[dict], deserialize) -> list[record_class]
+    """
+    fields = tuple(record_class.FIELDS)
+    new = record_class.__new__
+
+    def decode(data, deserialize):
+        records = []
+        for d in data:
+            r = new(record_class)
+            get = d.get
+            for attr, key in fields:
+                setattr(r, attr, get(key))
+            r._best_model = get('bestModel')
+            r._start_date_time = get('startDateTime')
+            r._estimated_date_time = get('estimatedDateTime')
+            r._deserialize = deserialize
+            records.append(r)
+        return records
+    return decode
+
+
+def _plain(data, deserialize):
+    return data
+
+
+def _string(data, deserialize):
+    # same conversion as ApiClient.__deserialize_primitive
+    return data if isinstance(data, str) else str(data)
+
+
+class FastDecoder(object):
+    """Decodes the responses of selected endpoints with a fast JSON backend instead of ApiClient.deserialize.
+
+    Status lists become StatusRecord objects, metadata ('object') and ids ('str') are returned
+    as parsed. Other endpoints fall back to ApiClient.deserialize.
+
+    Parameters
+    ----------
+    backend : str
+        'orjson', 'json' or 'auto' (orjson if it is installed)
+    endpoints : dict
+        (method, resource path) -> response type of the endpoints handled by the fast path,
+        resource paths as passed to ApiClient.call_api; defaults to DEFAULT_ENDPOINTS
+
+    """
+
+    def __init__(self, backend='auto', endpoints=None):
+        self.backend, self.loads = get_loads(backend)
+        self.endpoints = dict(DEFAULT_ENDPOINTS if endpoints is None else endpoints)
+        self.decoders = {}
+        for response_type in set(self.endpoints.values()):
+            if response_type in STATUS_RECORDS:
+                self.decoders[response_type] = record_decoder(STATUS_RECORDS[response_type])
+            elif response_type == 'str':
+                self.decoders[response_type] = _string
+            elif response_type == 'object':
+                self.decoders[response_type] = _plain
+            else:
+                raise Exception('Response type without fast decoder: ' + str(response_type))
+
+    def handles(self, endpoint, response_type):
+        """True if the response of endpoint, a (method, resource path) pair, is decoded by the fast path."""
+        return self.endpoints.get(endpoint) == response_type
+
+    def decode(self, data, response_type, deserialize):
+        """Decodes a response body of a handled response type.
+
+        Parameters
+        ----------
+        data : str or bytes
+            Response body
+        response_type : str
+            Response type the body is decoded into
+        deserialize : callable
+            (data, klass) -> object, used for lazily decoded fields of status records
+        """
+        try:
+            value = self.loads(data)
+        except ValueError:
+            # ApiClient.deserialize treats non JSON bodies as the value itself
+            value = data
+        if value is None:
+            return None
+        return self.decoders[response_type](value, deserialize)
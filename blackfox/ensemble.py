@@ -0,0 +1,111 @@
+from concurrent.futures import ThreadPoolExecutor
+
+
+class EnsembleMember(object):
+    """A generation model of an optimization taking part in an ensemble."""
+
+    def __init__(self, model_id, generation, validation_set_error, predictor):
+        self.model_id = model_id
+        self.generation = generation
+        self.validation_set_error = validation_set_error
+        self.predictor = predictor
+
+    def __repr__(self):
+        return 'EnsembleMember(model_id=%r, generation=%r, validation_set_error=%r)' % (
+            self.model_id, self.generation, self.validation_set_error)
+
+
+class Ensemble(object):
+    """Scores inputs with several models in parallel and combines their outputs.
+
+    Parameters
+    ----------
+    members : list[EnsembleMember]
+        Models of the ensemble
+    method : str
+        'mean' averages the outputs (regression, probabilities);
+        'vote' returns the class chosen by the (weighted) majority, where a member's class is the
+        argmax of its outputs, or output > 0.5 for single-output models
+    weights : str or list[float]
+        None for equal weights, 'inverse_error' to weight members by 1 / validation_set_error,
+        or one weight per member
+    threads : int
+        Number of members scored at the same time, defaults to the number of members
+
+    """
+
+    def __init__(self, members, method='mean', weights=None, threads=None):
+        if not members:
+            raise Exception('An ensemble needs at least one member')
+        if method not in ('mean', 'vote'):
+            raise Exception('Unknown ensemble method ' + str(method) + ', expected mean or vote')
+        import numpy
+        self.np = numpy
+        self.members = list(members)
+        self.method = method
+        if weights is None:
+            weights = [1.0] * len(self.members)
+        elif weights == 'inverse_error':
+            weights = [1.0 / max(m.validation_set_error, 1e-12) for m in self.members]
+        elif len(weights) != len(self.members):
+            raise Exception('Expected ' + str(len(self.members)) + ' weights, got ' + str(len(weights)))
+        weights = numpy.asarray(weights, dtype=numpy.float64)
+        self.weights = weights / weights.sum()
+        self.executor = ThreadPoolExecutor(max_workers=threads or len(self.members),
+                                           thread_name_prefix='blackfox-ensemble')
+
+    def predict_members(self, data):
+        """Returns the outputs of every member, shape (members, rows, outputs)."""
+        np = self.np
+        # predictors prepare the input themselves, ONNX Runtime and XGBoost release the GIL while scoring
+        outputs = list(self.executor.map(lambda m: np.asarray(m.predictor.predict(data)), self.members))
+        outputs = [o.reshape(len(o), -1) for o in outputs]
+        return np.stack(outputs)
+
+    def predict(self, data):
+        """Combines the outputs of all members.
+
+        Returns
+        -------
+        numpy.ndarray
+            (rows, outputs) weighted mean for 'mean', (rows,) class indices for 'vote'
+        """
+        np = self.np
+        outputs = self.predict_members(data)
+        if self.method == 'mean':
+            return np.tensordot(self.weights, outputs, axes=1)
+        members, rows, width = outputs.shape
+        if width == 1:
+            votes = (outputs[:, :, 0] > 0.5).astype(np.intp)
+            classes = 2
+        else:
+            votes = outputs.argmax(axis=2)
+            classes = width
+        counts = np.zeros((rows, classes))
+        row_index = np.arange(rows)
+        for m in range(members):
+            counts[row_index, votes[m]] += self.weights[m]
+        return counts.argmax(axis=1)
+
+    def close(self):
+        self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def select_generations(statuses, k):
+    """Returns the statuses of the generations with the lowest validation set error, best first.
+
+    Only generations with a best model are considered, one status per generation.
+    """
+    by_generation = {}
+    for status in statuses:
+        if status.best_model is None or status.validation_set_error is None:
+            continue
+        by_generation[status.generation] = status
+    ranked = sorted(by_generation.values(), key=lambda s: (s.validation_set_error, -s.generation))
+    return ranked[:k] if k is not None else ranked
@@ -0,0 +1,121 @@
+import os
+import json
+import time
+import threading
+from blackfox_restapi.models.service_info import ServiceInfo
+from blackfox.instrumentation import MetricsSink
+
+# host -> (service version, time of the check), shared by all BlackFox instances in the process
+_versions = {}
+_versions_lock = threading.Lock()
+
+
+def check_service_version(version):
+    """Compares the service version with the client version.
+
+    Raises an exception if the major versions differ or the service is missing features the client uses.
+    """
+    service_version = version.split('.')
+    default_info = ServiceInfo()
+    default_version = default_info.version.split('.')
+    if service_version[0] > default_version[0]:
+        raise Exception('BlackFox service('+version+') is newer than client('+default_info.version+'). Please update client using: pip install blackfox')
+    elif service_version[0] < default_version[0]:
+        raise Exception('BlackFox service('+version+') is older than client('+default_info.version+'). Please revert client to previous version using: pip install blackfox==<version>')
+    elif service_version[1] < default_version[1]:
+        raise Exception('BlackFox client('+default_info.version+') has some new features than service('+version+'). Please revert client to previous version using: pip install blackfox==<version>')
+    elif service_version[1] > default_version[1]:
+        print('BlackFox service('+version+') has some new features. Please update client using: pip install blackfox')
+
+
+def clear_cache():
+    """Forgets all service versions checked by this process."""
+    with _versions_lock:
+        _versions.clear()
+
+
+class ServiceHandshake(object):
+    """Lazy service version check, performed before the first request of a BlackFox instance.
+
+    Successful checks are cached per host for ttl seconds across all instances in the process,
+    and optionally in a JSON file shared between processes.
+
+    Parameters
+    ----------
+    host : str
+        Web API url
+    info_api : InfoApi
+        Api used to read the service version
+    ttl : float
+        Seconds a successful check stays valid
+    cache_path : str
+        Optional JSON file where successful checks are persisted
+    metrics : MetricsSink
+        Sink counting handshake cache hits and misses
+
+    """
+
+    def __init__(self, host, info_api, ttl=300, cache_path=None, metrics=None):
+        self.host = host
+        self.info_api = info_api
+        self.ttl = ttl
+        self.cache_path = cache_path
+        self.done = False
+        self.checking = False
+        self.lock = threading.RLock()
+        self.metrics = metrics if metrics is not None else MetricsSink()
+
+    def ensure(self):
+        if self.done:
+            return
+        with self.lock:
+            # the version request itself goes through the same client
+            if self.done or self.checking:
+                return
+            self.checking = True
+            try:
+                if self.__cached():
+                    self.metrics.count('cache_hits', cache='handshake')
+                else:
+                    self.metrics.count('cache_misses', cache='handshake')
+                    version = self.info_api.get().version
+                    check_service_version(version)
+                    self.__store(version)
+                self.done = True
+            finally:
+                self.checking = False
+
+    def __is_fresh(self, entry):
+        return entry is not None and time.time() - entry[1] < self.ttl
+
+    def __cached(self):
+        with _versions_lock:
+            if self.__is_fresh(_versions.get(self.host)):
+                return True
+        if self.cache_path is not None:
+            entry = self.__read_file().get(self.host)
+            if entry is not None and self.__is_fresh((entry['version'], entry['checked_at'])):
+                with _versions_lock:
+                    _versions[self.host] = (entry['version'], entry['checked_at'])
+                return True
+        return False
+
+    def __store(self, version):
+        checked_at = time.time()
+        with _versions_lock:
+            _versions[self.host] = (version, checked_at)
+        if self.cache_path is not None:
+            entries = self.__read_file()
+            entries[self.host] = {'version': version, 'checked_at': checked_at}
+            # unique per thread, handshakes of several BlackFox instances may store concurrently
+            tmp_path = self.cache_path + '.' + str(os.getpid()) + '.' + str(threading.get_ident())
+            with open(tmp_path, mode='w', encoding='utf-8') as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self.cache_path)
+
+    def __read_file(self):
+        try:
+            with open(self.cache_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return {}
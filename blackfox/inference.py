@@ -0,0 +1,371 @@
+"""Local inference for models downloaded from BlackFox.
+
+numpy, onnxruntime, joblib and xgboost are imported on first use, install the ones needed with::
+
+    pip install numpy onnxruntime
+    pip install scikit-learn joblib   # random forest BINARY models
+    pip install xgboost
+"""
+import os
+
+# ONNX tensor element types -> numpy dtype names
+_DTYPES = {
+    'tensor(float)': 'float32',
+    'tensor(double)': 'float64',
+    'tensor(float16)': 'float16',
+    'tensor(int64)': 'int64',
+    'tensor(int32)': 'int32'
+}
+
+
+def _onnxruntime():
+    try:
+        import onnxruntime
+    except ImportError:
+        raise Exception('ONNX inference requires onnxruntime, please install it using: pip install onnxruntime')
+    return onnxruntime
+
+
+def _model_source(model):
+    """Returns a path or bytes accepted by onnxruntime.InferenceSession."""
+    if isinstance(model, str):
+        if not os.path.exists(model):
+            raise Exception('Model file ' + model + " doesn't exist.")
+        return model
+    if isinstance(model, (bytes, bytearray)):
+        return bytes(model)
+    if hasattr(model, 'getvalue'):
+        # BytesIO returned by optimize_ann / continue_ann_optimization
+        return model.getvalue()
+    if hasattr(model, 'read'):
+        position = model.tell() if hasattr(model, 'tell') else None
+        data = model.read()
+        if position is not None and hasattr(model, 'seek'):
+            model.seek(position)
+        return data
+    raise Exception('Unsupported model source: ' + type(model).__name__)
+
+
+def session_options(intra_op_threads=None, inter_op_threads=1):
+    """CPU session options: full graph optimization, sequential execution.
+
+    Parameters
+    ----------
+    intra_op_threads : int
+        Threads used inside one operator, None lets onnxruntime use all cores
+    inter_op_threads : int
+        Threads running independent operators in parallel
+
+    Returns
+    -------
+    onnxruntime.SessionOptions
+    """
+    ort = _onnxruntime()
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    if intra_op_threads is not None:
+        options.intra_op_num_threads = intra_op_threads
+    if inter_op_threads is not None:
+        options.inter_op_num_threads = inter_op_threads
+    return options
+
+
+def _load_pickle(data):
+    # random forest BINARY models are scikit-learn estimators saved with joblib
+    from io import BytesIO
+    try:
+        import joblib
+        return joblib.load(BytesIO(data))
+    except ImportError:
+        import pickle
+        return pickle.loads(data)
+
+
+class Predictor(object):
+    """Base of the local predictors: selects and encodes input columns like the optimization did, then scores in batches.
+
+    Parameters
+    ----------
+    batch_size : int
+        Maximum number of rows scored at once
+    preprocessor : Preprocessor
+        Optional scaling/encoding of raw inputs, for models without an integrated scaler
+    feature_selection : list[bool]
+        Optional input columns used by the model (best_model.feature_selection), in input column order
+
+    """
+
+    def __init__(self, batch_size=65536, preprocessor=None, feature_selection=None):
+        import numpy
+        self.np = numpy
+        self.batch_size = batch_size
+        self.preprocessor = preprocessor
+        self.feature_index = None
+        if feature_selection is not None and not all(feature_selection):
+            if preprocessor is not None:
+                # every raw input may be encoded into several columns
+                widths = [c.width for c in preprocessor.inputs]
+                index = [j for i, selected in enumerate(feature_selection) if selected
+                         for j in range(preprocessor.offsets[i], preprocessor.offsets[i] + widths[i])]
+            else:
+                index = [i for i, selected in enumerate(feature_selection) if selected]
+            self.feature_index = numpy.array(index, dtype=numpy.intp)
+
+    def prepare(self, data):
+        """Returns the model input for raw input rows."""
+        x = self.np.asarray(data)
+        if self.preprocessor is not None:
+            x = self.preprocessor.transform_inputs(x)
+        elif x.ndim == 1:
+            x = x[self.np.newaxis]
+        if self.feature_index is not None:
+            x = x[:, self.feature_index]
+        return x
+
+    def _predict_batch(self, x):
+        raise Exception(type(self).__name__ + ' does not implement _predict_batch, use a subclass of Predictor')
+
+    def predict(self, data, batch_size=None):
+        """Predicts outputs for all rows of data.
+
+        Parameters
+        ----------
+        data : numpy.ndarray or list
+            Raw input rows in the column order of the optimization data set
+        batch_size : int
+            Overrides the batch size of the predictor
+
+        Returns
+        -------
+        numpy.ndarray
+            Model output for every row
+        """
+        x = self.prepare(data)
+        batch_size = batch_size or self.batch_size
+        rows = x.shape[0]
+        if rows <= batch_size:
+            return self.np.asarray(self._predict_batch(x))
+        result = None
+        for start in range(0, rows, batch_size):
+            y = self.np.asarray(self._predict_batch(x[start:start + batch_size]))
+            if result is None:
+                result = self.np.empty((rows,) + y.shape[1:], dtype=y.dtype)
+            result[start:start + len(y)] = y
+        return result
+
+    def predict_batches(self, batches):
+        """Predicts every batch of an iterable (e.g. chunks read from a file), yielding outputs in order."""
+        for batch in batches:
+            yield self.predict(batch)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class OnnxPredictor(Predictor):
+    """Runs batched predictions of an ONNX model on the CPU with ONNX Runtime.
+
+    Use ANN/RNN models downloaded with model_type=NeuralNetworkType.ONNX, ideally with integrate_scaler=True
+    so the predictor can be fed raw (unscaled) data, or random forests downloaded with RandomForestModelType.ONNX.
+
+    Parameters
+    ----------
+    model : str or BytesIO or bytes
+        Model path, or the BytesIO returned by optimize_ann / continue_ann_optimization
+    batch_size : int
+        Maximum number of rows passed to one session run
+    intra_op_threads : int
+        Threads used inside one operator, None uses all cores
+    inter_op_threads : int
+        Threads running independent operators in parallel
+    providers : list[str]
+        ONNX Runtime execution providers, defaults to CPUExecutionProvider
+    output : int or str
+        Model output returned by predict (index or name), e.g. 1 for classifier probabilities
+    preprocessor : Preprocessor
+        Optional scaling/encoding of raw inputs, for models without an integrated scaler
+    feature_selection : list[bool]
+        Optional input columns used by the model
+
+    """
+
+    def __init__(self, model, batch_size=65536, intra_op_threads=None, inter_op_threads=1, providers=None,
+                 output=0, preprocessor=None, feature_selection=None):
+        super(OnnxPredictor, self).__init__(batch_size, preprocessor, feature_selection)
+        ort = _onnxruntime()
+        self.session = ort.InferenceSession(
+            _model_source(model),
+            sess_options=session_options(intra_op_threads, inter_op_threads),
+            providers=providers if providers is not None else ['CPUExecutionProvider']
+        )
+        inputs = self.session.get_inputs()
+        if len(inputs) != 1:
+            raise Exception('Expected a model with one input, got ' + str(len(inputs)))
+        self.input_name = inputs[0].name
+        self.input_shape = inputs[0].shape
+        self.dtype = self.np.dtype(_DTYPES.get(inputs[0].type, 'float32'))
+        self.output_names = [o.name for o in self.session.get_outputs()]
+        self.output_name = output if isinstance(output, str) else self.output_names[output]
+
+    def prepare(self, data):
+        if self.preprocessor is None and self.feature_index is None:
+            x = self.np.ascontiguousarray(data, dtype=self.dtype)
+            # a single row of a model with (batch, features) input
+            if x.ndim == len(self.input_shape) - 1:
+                x = x[self.np.newaxis]
+            return x
+        return self.np.ascontiguousarray(super(OnnxPredictor, self).prepare(data), dtype=self.dtype)
+
+    def _predict_batch(self, x):
+        return self.session.run([self.output_name], {self.input_name: x})[0]
+
+
+def _init_worker(data, method):
+    global _worker_model, _worker_method
+    _worker_model = _load_pickle(data)
+    _worker_method = method
+
+
+def _worker_predict(x):
+    return getattr(_worker_model, _worker_method)(x)
+
+
+class SklearnPredictor(Predictor):
+    """Scores a random forest downloaded with RandomForestModelType.BINARY (a scikit-learn estimator).
+
+    By default the estimator scores with its own thread pool (n_jobs); with processes set, batches
+    are scored by a pool of worker processes, each holding its own copy of the model.
+
+    Loading the model unpickles it, only load models from a BlackFox service you trust.
+
+    Parameters
+    ----------
+    model : str or BytesIO or bytes
+        Model path or content
+    batch_size : int
+        Rows scored by one call or sent to one worker process
+    n_jobs : int
+        Threads used by the estimator, -1 uses all cores
+    processes : int
+        Number of worker processes, None scores in this process
+    method : str
+        Estimator method called, e.g. 'predict_proba' for classifiers
+    preprocessor : Preprocessor
+        Optional encoding of raw inputs
+    feature_selection : list[bool]
+        Optional input columns used by the model
+
+    """
+
+    def __init__(self, model, batch_size=65536, n_jobs=-1, processes=None, method='predict',
+                 preprocessor=None, feature_selection=None):
+        super(SklearnPredictor, self).__init__(batch_size, preprocessor, feature_selection)
+        source = _model_source(model)
+        if isinstance(source, bytes):
+            data = source
+        else:
+            with open(source, 'rb') as f:
+                data = f.read()
+        self.method = method
+        self.pool = None
+        if processes is not None:
+            from concurrent.futures import ProcessPoolExecutor
+            self.pool = ProcessPoolExecutor(processes, initializer=_init_worker, initargs=(data, method))
+            self.estimator = None
+        else:
+            self.estimator = _load_pickle(data)
+            if n_jobs is not None and hasattr(self.estimator, 'n_jobs'):
+                self.estimator.n_jobs = n_jobs
+
+    def _predict_batch(self, x):
+        return getattr(self.estimator, self.method)(x)
+
+    def predict(self, data, batch_size=None):
+        if self.pool is None:
+            return super(SklearnPredictor, self).predict(data, batch_size)
+        x = self.prepare(data)
+        batch_size = batch_size or self.batch_size
+        chunks = [x[start:start + batch_size] for start in range(0, x.shape[0], batch_size)]
+        return self.np.concatenate(list(self.pool.map(_worker_predict, chunks)))
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+
+class XGBoostPredictor(Predictor):
+    """Scores an XGBoost model downloaded with download_xgboost_model using XGBoost's native multithreading.
+
+    Parameters
+    ----------
+    model : str or BytesIO or bytes
+        Model path or content (any format accepted by Booster.load_model)
+    batch_size : int
+        Maximum number of rows scored at once
+    nthread : int
+        Threads used by XGBoost, None uses all cores
+    preprocessor : Preprocessor
+        Optional encoding of raw inputs
+    feature_selection : list[bool]
+        Optional input columns used by the model
+
+    """
+
+    def __init__(self, model, batch_size=262144, nthread=None, preprocessor=None, feature_selection=None):
+        super(XGBoostPredictor, self).__init__(batch_size, preprocessor, feature_selection)
+        try:
+            import xgboost
+        except ImportError:
+            raise Exception('XGBoost inference requires xgboost, please install it using: pip install xgboost')
+        source = _model_source(model)
+        self.booster = xgboost.Booster()
+        self.booster.load_model(bytearray(source) if isinstance(source, bytes) else source)
+        if nthread is not None:
+            self.booster.set_param({'nthread': nthread})
+
+    def _predict_batch(self, x):
+        return self.booster.inplace_predict(x)
+
+
+def load_predictor(model, model_kind='ann', model_type=None, **kwargs):
+    """Returns the predictor for a downloaded model.
+
+    Parameters
+    ----------
+    model : str or BytesIO or bytes
+        Model path or content
+    model_kind : str
+        'ann', 'rnn', 'random_forest' or 'xgboost'
+    model_type : str
+        Format of the model, 'onnx' for ANN/RNN models and RandomForestModelType for random forests
+    kwargs
+        Passed to the predictor
+
+    Returns
+    -------
+    Predictor
+    """
+    if model_kind in ('ann', 'rnn'):
+        if model_type not in (None, 'onnx'):
+            raise Exception('Only ONNX neural network models can be scored locally, download them with NeuralNetworkType.ONNX')
+        return OnnxPredictor(model, **kwargs)
+    if model_kind == 'random_forest':
+        if model_type == 'onnx':
+            return OnnxPredictor(model, **kwargs)
+        return SklearnPredictor(model, **kwargs)
+    if model_kind == 'xgboost':
+        return XGBoostPredictor(model, **kwargs)
+    raise Exception('Unknown model kind: ' + str(model_kind))
+
+
+def predict_onnx(model, data, batch_size=65536, intra_op_threads=None):
+    """Loads an ONNX model and predicts outputs for data, see OnnxPredictor."""
+    return OnnxPredictor(model, batch_size=batch_size, intra_op_threads=intra_op_threads).predict(data)
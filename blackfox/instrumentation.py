@@ -0,0 +1,156 @@
+import time
+import threading
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, float('inf'))
+
+
+class _NullTimer(object):
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer(object):
+
+    def __init__(self, sink, name, labels):
+        self.sink = sink
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.sink.observe(self.name, time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class MetricsSink(object):
+    """Receives client metrics; this base sink is disabled and ignores everything.
+
+    Subclasses set enabled to True and implement observe and count.
+    Metrics recorded by BlackFox:
+
+    - api_request_seconds (endpoint): duration of every *Api call, including retries
+    - api_bytes_sent, api_bytes_received (endpoint): request and response body sizes
+    - api_retries (endpoint): retried requests
+    - stage_seconds (stage): sha1, create_tmp_csv, upload_csv and download_model durations
+    - stage_bytes (stage): bytes hashed, written to csv or downloaded
+    - cache_hits, cache_misses (cache): handshake and conversion caches
+
+    """
+
+    enabled = False
+
+    def observe(self, name, value, **labels):
+        """Records a value (usually seconds) in the histogram name."""
+        pass
+
+    def count(self, name, value=1, **labels):
+        """Adds value to the counter name."""
+        pass
+
+    def timer(self, name, **labels):
+        """Context manager observing the duration of its block in seconds."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name, labels)
+
+
+class Histogram(object):
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def quantile(self, q):
+        """Estimates the q quantile as the upper bound of the bucket containing it."""
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        total = 0
+        for bound, c in zip(self.buckets, self.counts):
+            total += c
+            if total >= rank:
+                return bound
+        return self.buckets[-1]
+
+
+class InMemoryMetrics(MetricsSink):
+    """Thread-safe metrics sink keeping histograms and counters in memory.
+
+    Parameters
+    ----------
+    buckets : list[float]
+        Upper bounds of histogram buckets
+
+    """
+
+    enabled = True
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.histograms = {}
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def count(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def snapshot(self):
+        """Returns a copy of all metrics.
+
+        Returns
+        -------
+        dict
+            'histograms': list of {name, labels, count, sum, p50, p99, buckets},
+            'counters': list of {name, labels, value}
+        """
+        with self.lock:
+            histograms = [{
+                'name': name,
+                'labels': dict(labels),
+                'count': h.count,
+                'sum': h.sum,
+                'p50': h.quantile(0.5),
+                'p99': h.quantile(0.99),
+                'buckets': list(zip(h.buckets, h.counts))
+            } for (name, labels), h in self.histograms.items()]
+            counters = [{
+                'name': name,
+                'labels': dict(labels),
+                'value': value
+            } for (name, labels), value in self.counters.items()]
+        return {'histograms': histograms, 'counters': counters}
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+            self.counters.clear()
@@ -1,5 +1,6 @@
 from datetime import datetime
 import sys
+from blackfox.buffered_writer import get_buffered_writer
 
 class LogWriter(object):
     """LogWriter provides logging capabilities for an ongoing Black Fox optimization.
@@ -8,11 +9,16 @@ class LogWriter(object):
     ----------
     file : str
         Optional file or sys.stdout used for logging
+    buffered : bool
+        If True, messages are written by a background thread that keeps the file open (see BufferedWriter)
+    flush_interval : float
+        Maximum seconds a buffered message waits before it is flushed
 
     """
 
-    def __init__(self, file=sys.stdout):
+    def __init__(self, file=sys.stdout, buffered=False, flush_interval=1.0):
         self.log_file = file
+        self.buffer = get_buffered_writer(file, flush_interval) if buffered else None
 
     def write_neural_network_statues(self, id, statuses):
         status = statuses[-1]
@@ -66,9 +72,16 @@ class LogWriter(object):
         self.write_random_forest_statues(id, statuses)
 
     def write_string(self, msg):
-        if isinstance(self.log_file, str):
+        if self.buffer is not None:
+            self.buffer.write(msg)
+        elif isinstance(self.log_file, str):
             with open(self.log_file, mode='a', encoding='utf-8', buffering=1) as f:
                 f.write(msg+'\n')
         else:
             self.log_file.write(msg+'\n')
             self.log_file.flush()
+
+    def flush(self):
+        """Waits until buffered messages are written."""
+        if self.buffer is not None:
+            self.buffer.flush()
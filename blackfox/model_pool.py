@@ -0,0 +1,219 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from blackfox.instrumentation import MetricsSink
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def _source_size(source):
+    if isinstance(source, str):
+        return os.path.getsize(source)
+    if hasattr(source, 'getbuffer'):
+        return source.getbuffer().nbytes
+    if isinstance(source, (bytes, bytearray)):
+        return len(source)
+    return 0
+
+
+def _hashable(value):
+    """Key part of a load_predictor option; lists (e.g. feature_selection, providers) become tuples."""
+    if isinstance(value, (list, tuple)):
+        return tuple(_hashable(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted(((k, _hashable(v)) for k, v in value.items()), key=lambda item: repr(item[0])))
+    if isinstance(value, (set, frozenset)):
+        return frozenset(_hashable(v) for v in value)
+    if hasattr(value, 'tolist') and hasattr(value, 'shape'):
+        # numpy arrays and scalars
+        return _hashable(value.tolist())
+    try:
+        hash(value)
+    except TypeError:
+        # other unhashable options only match the same object
+        return (type(value).__name__, id(value))
+    return value
+
+
+class _Entry(object):
+
+    def __init__(self):
+        self.future = Future()
+        self.size = 0
+
+    def close(self):
+        if self.future.done() and self.future.exception() is None:
+            self.future.result().close()
+
+
+def _close(entries):
+    # called without the pool lock, closing may wait for worker processes
+    for entry in entries:
+        entry.close()
+
+
+class ModelPool(object):
+    """Thread-safe LRU pool of loaded predictors, keyed by model id and format.
+
+    Each model is loaded once, even when several threads ask for it at the same time. When the
+    artifacts of the loaded models exceed max_bytes (or there are more than max_models), the least
+    recently used ones are dropped and closed (worker processes, sessions), so callers should get
+    predictors from the pool when they need them rather than keep them.
+
+    Parameters
+    ----------
+    max_bytes : int
+        Maximum total size of the model artifacts kept loaded
+    max_models : int
+        Optional maximum number of loaded models
+    metrics : MetricsSink
+        Sink counting cache_hits and cache_misses (cache='model_pool')
+
+    """
+
+    def __init__(self, max_bytes=1024 ** 3, max_models=None, metrics=None):
+        self.max_bytes = max_bytes
+        self.max_models = max_models
+        self.metrics = metrics if metrics is not None else MetricsSink()
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        self.executor = None
+
+    def get(self, model_id, source, model_kind='ann', model_type=None, variant=None, **kwargs):
+        """Returns the loaded predictor of a model, loading it on first use.
+
+        Parameters
+        ----------
+        model_id : str
+            Model id, e.g. from get_model_id
+        source : str or bytes or BytesIO or callable
+            Model path or content, or a function returning it (called only when the model is not loaded)
+        model_kind : str
+            'ann', 'rnn', 'random_forest' or 'xgboost'
+        model_type : str
+            Model format, see load_predictor
+        variant : str
+            Optional extra key part for different artifacts of the same model (e.g. with integrated scaler)
+        kwargs
+            Passed to load_predictor; predictors created with different options are pooled separately
+
+        Returns
+        -------
+        Predictor
+        """
+        key = (model_id, model_kind, model_type, variant, _hashable(kwargs))
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                load = False
+            else:
+                entry = self.entries[key] = _Entry()
+                self.misses += 1
+                load = True
+        self.metrics.count('cache_hits' if not load else 'cache_misses', cache='model_pool')
+        if not load:
+            return entry.future.result()
+        try:
+            from blackfox.inference import load_predictor
+            if callable(source):
+                source = source()
+            size = _source_size(source)
+            predictor = load_predictor(source, model_kind, model_type, **kwargs)
+        except Exception as e:
+            with self.lock:
+                if self.entries.get(key) is entry:
+                    del self.entries[key]
+            entry.future.set_exception(e)
+            raise e
+        with self.lock:
+            entry.size = size
+            dropped = []
+            if self.entries.get(key) is entry:
+                self.bytes += size
+                dropped = self.__evict(keep=key)
+        entry.future.set_result(predictor)
+        _close(dropped)
+        return predictor
+
+    def __evict(self, keep):
+        # called with self.lock held; models still loading are skipped
+        dropped = []
+        for key in list(self.entries):
+            if self.bytes <= self.max_bytes and (self.max_models is None or len(self.entries) <= self.max_models):
+                break
+            entry = self.entries[key]
+            if key == keep or not entry.future.done():
+                continue
+            del self.entries[key]
+            self.bytes -= entry.size
+            self.evictions += 1
+            dropped.append(entry)
+        return dropped
+
+    def preload(self, model_id, source, model_kind='ann', model_type=None, variant=None, **kwargs):
+        """Loads a model in the background, e.g. the next model a batch job will need.
+
+        Returns
+        -------
+        concurrent.futures.Future
+            resolves to the predictor
+        """
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='blackfox-model-preload')
+        return self.executor.submit(self.get, model_id, source, model_kind, model_type, variant, **kwargs)
+
+    def evict(self, model_id):
+        """Drops and closes every loaded variant of a model."""
+        dropped = []
+        with self.lock:
+            for key in [k for k in self.entries if k[0] == model_id]:
+                entry = self.entries.pop(key)
+                if entry.future.done():
+                    self.bytes -= entry.size
+                dropped.append(entry)
+        _close(dropped)
+
+    def clear(self):
+        """Drops and closes every loaded model."""
+        with self.lock:
+            dropped = list(self.entries.values())
+            self.entries.clear()
+            self.bytes = 0
+        _close(dropped)
+
+    def close(self):
+        """Closes every loaded model and the preload threads."""
+        self.clear()
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown()
+
+    def stats(self):
+        """Returns models, bytes, hits, misses and evictions."""
+        with self.lock:
+            return {
+                'models': len(self.entries),
+                'bytes': self.bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+
+def get_default_pool():
+    """Returns the process-wide ModelPool used by BlackFox.get_predictor."""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = ModelPool()
+        return _default_pool
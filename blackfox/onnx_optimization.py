@@ -0,0 +1,183 @@
+"""Post-download optimization of ONNX neural network models for CPU inference.
+
+Graph optimizations (constant folding, node fusion) are applied by ONNX Runtime and saved, so they
+do not run again on every load. Dynamic int8 quantization needs onnxruntime.quantization, float16
+conversion needs onnxconverter-common; both are imported on first use. float16 models keep float32
+inputs and outputs; on CPU, ONNX Runtime has few float16 kernels, so they mainly save memory.
+"""
+import os
+import time
+
+QUANTIZATIONS = [None, 'int8', 'float16']
+
+OPTIMIZATION_LEVELS = ['basic', 'extended', 'all']
+
+
+def optimized_model_path(model_path, quantization=None, optimization_level='extended'):
+    """Returns the cache path of an optimized variant, next to the original model.
+
+    model.onnx -> model.extended.onnx, model.extended.int8.onnx, model.basic.float16.onnx, ...
+    """
+    root, ext = os.path.splitext(model_path)
+    return root + '.' + optimization_level + ('.' + quantization if quantization else '') + (ext or '.onnx')
+
+
+def _options(quantization, optimization_level):
+    return 'optimization_level=' + optimization_level + '\nquantization=' + str(quantization) + '\n'
+
+
+def _is_fresh(model_path, output_path, options):
+    """True if the variant exists, is newer than the model and was built with the same options."""
+    options_path = output_path + '.options'
+    if not os.path.exists(output_path) or not os.path.exists(options_path):
+        return False
+    if os.path.getmtime(output_path) < os.path.getmtime(model_path):
+        return False
+    with open(options_path, encoding='utf-8') as f:
+        return f.read() == options
+
+
+def _quantize(source, target, quantization):
+    if quantization == 'int8':
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(source, target, weight_type=QuantType.QInt8)
+    else:
+        import onnx
+        from onnxconverter_common import float16
+        model = onnx.load(source)
+        # casts of a graph input to its own type (skl2onnx adds one) are dropped by the converter
+        # without casting the input to float16, they are no-ops so they become Identity nodes
+        input_types = dict((i.name, i.type.tensor_type.elem_type) for i in model.graph.input)
+        for node in model.graph.node:
+            to = [a.i for a in node.attribute if a.name == 'to']
+            if node.op_type == 'Cast' and to and input_types.get(node.input[0]) == to[0]:
+                node.op_type = 'Identity'
+                del node.attribute[:]
+        model = float16.convert_float_to_float16(model, keep_io_types=True)
+        onnx.save(model, target)
+
+
+def _optimize_graph(source, target, optimization_level):
+    import onnxruntime
+    levels = {
+        'basic': onnxruntime.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+        'extended': onnxruntime.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+        'all': onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    }
+    options = onnxruntime.SessionOptions()
+    options.graph_optimization_level = levels[optimization_level]
+    options.optimized_model_filepath = target
+    onnxruntime.InferenceSession(source, options, providers=['CPUExecutionProvider'])
+
+
+def optimize_onnx_model(model_path, quantization=None, optimization_level='extended', output_path=None, force=False):
+    """Saves a graph-optimized and optionally quantized variant of an ONNX model.
+
+    The variant is cached: it is built again when it is older than the original model, when it was built
+    with other options (recorded in output_path + '.options') or when force is True.
+
+    Parameters
+    ----------
+    model_path : str
+        ONNX model, e.g. from download_ann_model(model_type=NeuralNetworkType.ONNX)
+    quantization : str
+        None, 'int8' (dynamic quantization of the weights) or 'float16'
+    optimization_level : str
+        'basic', 'extended' or 'all'; 'all' adds layout optimizations specific to the CPU it ran on
+    output_path : str
+        Path of the variant, defaults to optimized_model_path(model_path, quantization, optimization_level)
+    force : bool
+        If True, the variant is built even if the cached one is up to date
+
+    Returns
+    -------
+    str
+        Path of the optimized model
+    """
+    if quantization not in QUANTIZATIONS:
+        raise Exception('Unknown quantization ' + str(quantization) + ', expected int8 or float16')
+    if optimization_level not in OPTIMIZATION_LEVELS:
+        raise Exception('Unknown optimization level ' + str(optimization_level) + ', expected basic, extended or all')
+    if output_path is None:
+        output_path = optimized_model_path(model_path, quantization, optimization_level)
+    options = _options(quantization, optimization_level)
+    if not force and _is_fresh(model_path, output_path, options):
+        return output_path
+    # written next to the target and renamed, so a watching ModelServer never reads a partial model
+    temp_path = output_path + '.tmp'
+    quantized_path = output_path + '.quantized.tmp'
+    try:
+        source = model_path
+        if quantization is not None:
+            # quantized before fusion, the quantizer only knows the standard operators
+            _quantize(model_path, quantized_path, quantization)
+            source = quantized_path
+        _optimize_graph(source, temp_path, optimization_level)
+        os.replace(temp_path, output_path)
+        with open(output_path + '.options', 'w', encoding='utf-8') as f:
+            f.write(options)
+    finally:
+        for path in (temp_path, quantized_path):
+            if os.path.exists(path):
+                os.remove(path)
+    return output_path
+
+
+def _latency(predictor, x, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        predictor.predict(x)
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return times[len(times) // 2] * 1000
+
+
+def compare_onnx_models(original_path, optimized_path, inputs, outputs=None, repeat=20, **kwargs):
+    """Compares an optimized model with the original on a validation set.
+
+    Parameters
+    ----------
+    original_path : str
+        Original ONNX model
+    optimized_path : str
+        Optimized ONNX model, e.g. from optimize_onnx_model
+    inputs : numpy.ndarray or list
+        Validation input rows
+    outputs : numpy.ndarray or list
+        Optional expected outputs, adds the RMSE of both models
+    repeat : int
+        Number of timed runs, the median is reported
+    kwargs
+        Passed to OnnxPredictor (e.g. preprocessor, intra_op_threads)
+
+    Returns
+    -------
+    dict
+        max_abs_delta and mean_abs_delta between the predictions, original_rmse and optimized_rmse,
+        median single_row_ms and batch_ms of both models, single_row_speedup and batch_speedup,
+        original_bytes and optimized_bytes
+    """
+    import numpy as np
+    from blackfox.inference import OnnxPredictor
+    x = np.asarray(inputs)
+    report = {
+        'original_bytes': os.path.getsize(original_path),
+        'optimized_bytes': os.path.getsize(optimized_path)
+    }
+    predictions = {}
+    for name, path in (('original', original_path), ('optimized', optimized_path)):
+        with OnnxPredictor(path, **kwargs) as predictor:
+            predictions[name] = np.asarray(predictor.predict(x), dtype=np.float64)
+            report[name + '_single_row_ms'] = _latency(predictor, x[:1], repeat)
+            report[name + '_batch_ms'] = _latency(predictor, x, repeat)
+        if outputs is not None:
+            expected = np.asarray(outputs, dtype=np.float64).reshape(predictions[name].shape)
+            report[name + '_rmse'] = float(np.sqrt(np.mean((predictions[name] - expected) ** 2)))
+    delta = np.abs(predictions['optimized'] - predictions['original'])
+    report['max_abs_delta'] = float(delta.max()) if delta.size else 0.0
+    report['mean_abs_delta'] = float(delta.mean()) if delta.size else 0.0
+    for latency in ('single_row', 'batch'):
+        optimized = report['optimized_' + latency + '_ms']
+        report[latency + '_speedup'] = report['original_' + latency + '_ms'] / optimized if optimized > 0 else None
+    return report
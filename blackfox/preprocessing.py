@@ -0,0 +1,269 @@
+"""Client-side replay of the input/output scaling and encodings applied by BlackFox.
+
+Needed for models downloaded with integrate_scaler=False. numpy is imported on first use.
+"""
+
+ENCODINGS = ['None', 'OneHot', 'Dummy', 'Target', 'Effect', 'CountOfFrequency', 'OrderInteger']
+
+
+def _numpy():
+    import numpy
+    return numpy
+
+
+def get_field(obj, *names):
+    """Reads the first present attribute or key of obj, accepting swagger models and camelCase/snake_case dicts."""
+    if obj is None:
+        return None
+    for name in names:
+        if isinstance(obj, dict):
+            if obj.get(name) is not None:
+                return obj[name]
+        elif getattr(obj, name, None) is not None:
+            return getattr(obj, name)
+    return None
+
+
+def _range(column):
+    r = get_field(column, 'range')
+    return get_field(r, 'min'), get_field(r, 'max')
+
+
+class _Column(object):
+
+    def __init__(self, index, encoding, low=None, high=None, categories=None, values=None):
+        if encoding not in ENCODINGS:
+            raise Exception('Unknown encoding ' + str(encoding) + ' of column ' + str(index))
+        self.index = index
+        self.encoding = encoding
+        self.min = low
+        self.max = high
+        self.categories = list(categories) if categories is not None else None
+        self.values = dict(values) if values is not None else None
+        if encoding in ('OneHot', 'Dummy', 'Effect', 'OrderInteger') and not self.categories:
+            raise Exception('Column ' + str(index) + ' with ' + encoding + ' encoding needs its categories')
+        if encoding in ('Target', 'CountOfFrequency'):
+            if not self.values:
+                raise Exception('Column ' + str(index) + ' with ' + encoding + ' encoding needs its category values')
+            self.min = low if low is not None else min(self.values.values())
+            self.max = high if high is not None else max(self.values.values())
+        if encoding == 'None' and (self.min is None or self.max is None):
+            raise Exception('Column ' + str(index) + ' needs a range')
+
+    @property
+    def width(self):
+        if self.encoding == 'OneHot':
+            return len(self.categories)
+        if self.encoding in ('Dummy', 'Effect'):
+            return len(self.categories) - 1
+        return 1
+
+
+class Preprocessor(object):
+    """Vectorized input scaling/encoding and output inverse scaling.
+
+    Numeric inputs ('None' encoding) are min-max scaled from their range to feature_range;
+    categorical inputs are encoded (OneHot, Dummy, Effect) or mapped to a number (OrderInteger,
+    Target, CountOfFrequency) which is then scaled like a numeric input. Outputs are scaled
+    between their range and feature_range.
+
+    Parameters
+    ----------
+    inputs : list[dict]
+        Per input column: range ({'min', 'max'}), encoding, and for categorical encodings
+        categories (ordered list) or values (category -> number, for Target and CountOfFrequency)
+    outputs : list[dict]
+        Per output column: range ({'min', 'max'})
+    feature_range : (float, float)
+        Range of the scaled values seen by the model
+
+    """
+
+    def __init__(self, inputs, outputs, feature_range=(-1.0, 1.0)):
+        np = _numpy()
+        self.np = np
+        self.feature_range = (float(feature_range[0]), float(feature_range[1]))
+        self.inputs = []
+        for i, column in enumerate(inputs):
+            encoding = get_field(column, 'encoding') or 'None'
+            if isinstance(encoding, (list, tuple)):
+                if len(encoding) != 1:
+                    raise Exception('Input ' + str(i) + ' has encodings ' + str(encoding) +
+                                    '; build the preprocessor from metadata with the encoding chosen by the optimization')
+                encoding = encoding[0]
+            low, high = _range(column)
+            self.inputs.append(_Column(i, encoding, low, high,
+                                       get_field(column, 'categories'), get_field(column, 'values', 'categoryValues')))
+        self.outputs = []
+        for i, column in enumerate(outputs):
+            low, high = _range(column)
+            if low is None or high is None:
+                raise Exception('Output ' + str(i) + ' needs a range')
+            self.outputs.append((float(low), float(high)))
+        numeric = [c for c in self.inputs if c.encoding == 'None']
+        self.numeric_index = np.array([c.index for c in numeric], dtype=np.intp)
+        self.numeric_min, self.numeric_scale, self.numeric_offset = self.__scale(
+            [c.min for c in numeric], [c.max for c in numeric])
+        self.output_min, self.output_scale, self.output_offset = self.__scale(
+            [o[0] for o in self.outputs], [o[1] for o in self.outputs])
+        self.categorical = [c for c in self.inputs if c.encoding != 'None']
+        # start of every input column in the encoded matrix
+        self.offsets = []
+        width = 0
+        for c in self.inputs:
+            self.offsets.append(width)
+            width += c.width
+        self.width = width
+
+    def __scale(self, low, high):
+        """Returns min, multiplier and offset mapping [low, high] onto feature_range as (x - min) * multiplier + offset.
+
+        Constant columns get a zero multiplier and map to the middle of feature_range, like __scaled.
+        """
+        np = self.np
+        low = np.asarray(low, dtype=np.float64)
+        span = np.asarray(high, dtype=np.float64) - low
+        a, b = self.feature_range
+        constant = ~(span > 0)
+        scale = np.where(constant, 0.0, (b - a) / np.where(constant, 1, span))
+        offset = np.where(constant, (a + b) / 2, a)
+        return low, scale, offset
+
+    @classmethod
+    def from_config(cls, config, feature_range=(-1.0, 1.0), categories=None, values=None):
+        """Builds the preprocessor from an optimization config filled by optimize_* (config.inputs, config.outputs).
+
+        Parameters
+        ----------
+        config : AnnOptimizationConfig
+            Config whose inputs/outputs have ranges and a single encoding per input
+        categories : dict
+            Input index -> ordered categories, for OneHot, Dummy, Effect and OrderInteger inputs
+        values : dict
+            Input index -> {category: number}, for Target and CountOfFrequency inputs
+        """
+        inputs = []
+        for i, c in enumerate(config.inputs):
+            low, high = _range(c)
+            inputs.append({
+                'range': {'min': low, 'max': high},
+                'encoding': c.encoding,
+                'categories': (categories or {}).get(i),
+                'values': (values or {}).get(i)
+            })
+        outputs = [{'range': {'min': _range(c)[0], 'max': _range(c)[1]}} for c in config.outputs]
+        return cls(inputs, outputs, feature_range)
+
+    @classmethod
+    def from_metadata(cls, metadata, config=None, feature_range=None):
+        """Builds the preprocessor from a get_*_metadata dict.
+
+        Input and output columns are read from metadata['inputs'] / metadata['outputs'] and fall back
+        to config.inputs / config.outputs; the feature range is read from metadata['featureRange']
+        or metadata['scaler']['featureRange'] unless given.
+        """
+        inputs = get_field(metadata, 'inputs')
+        outputs = get_field(metadata, 'outputs')
+        if inputs is None or outputs is None:
+            if config is None:
+                raise Exception('Metadata has no inputs/outputs, pass the optimization config')
+            fallback = cls.from_config(config)
+            inputs = inputs if inputs is not None else [
+                {'range': {'min': c.min, 'max': c.max}, 'encoding': c.encoding,
+                 'categories': c.categories, 'values': c.values} for c in fallback.inputs]
+            outputs = outputs if outputs is not None else [
+                {'range': {'min': o[0], 'max': o[1]}} for o in fallback.outputs]
+        if feature_range is None:
+            feature_range = get_field(metadata, 'featureRange', 'feature_range') or \
+                get_field(get_field(metadata, 'scaler'), 'featureRange', 'feature_range') or (-1.0, 1.0)
+        return cls(inputs, outputs, feature_range)
+
+    def __codes(self, column, data):
+        """Index of every value in column.categories, -1 for unknown values; the lookup runs once per distinct value."""
+        np = self.np
+        uniques, inverse = np.unique(np.asarray(data).astype(str), return_inverse=True)
+        index = dict((str(c), i) for i, c in enumerate(column.categories))
+        table = np.array([index.get(u, -1) for u in uniques], dtype=np.intp)
+        return table[inverse.reshape(-1)]
+
+    def __mapped(self, column, data):
+        np = self.np
+        uniques, inverse = np.unique(np.asarray(data).astype(str), return_inverse=True)
+        values = dict((str(k), v) for k, v in column.values.items())
+        table = np.array([values.get(u, np.nan) for u in uniques], dtype=np.float64)
+        return table[inverse.reshape(-1)]
+
+    def __scaled(self, values, low, high):
+        a, b = self.feature_range
+        span = high - low
+        if span <= 0:
+            return self.np.full(values.shape, (a + b) / 2)
+        return (values - low) * ((b - a) / span) + a
+
+    def transform_inputs(self, data, dtype='float32'):
+        """Scales and encodes raw input rows.
+
+        Parameters
+        ----------
+        data : numpy.ndarray or list
+            (rows, inputs) raw input values; categorical columns may hold strings
+
+        Returns
+        -------
+        numpy.ndarray
+            (rows, encoded width) array fed to a model without an integrated scaler
+        """
+        np = self.np
+        x = np.asarray(data)
+        if x.ndim == 1:
+            x = x[np.newaxis]
+        if x.shape[1] != len(self.inputs):
+            raise Exception('Expected ' + str(len(self.inputs)) + ' input columns, got ' + str(x.shape[1]))
+        rows = x.shape[0]
+        if not self.categorical:
+            # all inputs numeric: one vectorized expression over the whole batch
+            return ((x.astype(np.float64) - self.numeric_min) * self.numeric_scale + self.numeric_offset).astype(dtype)
+        result = np.zeros((rows, self.width), dtype=dtype)
+        if len(self.numeric_index):
+            offsets = np.array([self.offsets[i] for i in self.numeric_index], dtype=np.intp)
+            numeric = x[:, self.numeric_index].astype(np.float64)
+            result[:, offsets] = (numeric - self.numeric_min) * self.numeric_scale + self.numeric_offset
+        for column in self.categorical:
+            start = self.offsets[column.index]
+            data = x[:, column.index]
+            if column.encoding in ('Target', 'CountOfFrequency'):
+                result[:, start] = self.__scaled(self.__mapped(column, data), column.min, column.max)
+                continue
+            codes = self.__codes(column, data)
+            if column.encoding == 'OrderInteger':
+                values = codes.astype(np.float64)
+                values[codes < 0] = np.nan
+                result[:, start] = self.__scaled(values, 0.0, len(column.categories) - 1.0)
+                continue
+            known = codes >= 0
+            if column.encoding == 'OneHot':
+                result[np.nonzero(known)[0], start + codes[known]] = 1
+            else:
+                # Dummy and Effect drop the last category; Effect codes it as -1 in every column
+                last = len(column.categories) - 1
+                kept = known & (codes < last)
+                result[np.nonzero(kept)[0], start + codes[kept]] = 1
+                if column.encoding == 'Effect':
+                    result[codes == last, start:start + last] = -1
+        return result
+
+    def transform_outputs(self, data, dtype='float32'):
+        """Scales raw output rows to the feature range."""
+        np = self.np
+        y = np.asarray(data, dtype=np.float64)
+        return ((y - self.output_min) * self.output_scale + self.output_offset).astype(dtype)
+
+    def inverse_transform_outputs(self, data):
+        """Maps model outputs from the feature range back to the output ranges."""
+        np = self.np
+        y = np.asarray(data, dtype=np.float64)
+        if y.ndim == 1:
+            y = y[:, np.newaxis]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            inverse = np.where(self.output_scale > 0, 1 / np.where(self.output_scale > 0, self.output_scale, 1), 0.0)
+        return (y - self.output_offset) * inverse + self.output_min
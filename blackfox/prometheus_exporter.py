@@ -0,0 +1,182 @@
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+STATES = ['Active', 'Finished', 'Stopped', 'Error']
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join('%s="%s"' % (k, _escape(v)) for k, v in sorted(labels.items())) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+def _timestamp(value):
+    if value is None:
+        return None
+    if hasattr(value, 'timestamp'):
+        return value.timestamp()
+    return float(value)
+
+
+class PrometheusExporter(object):
+    """Publishes the state of running optimizations in Prometheus text format.
+
+    The exporter is a log writer: pass it (alone or in a list with other writers) as log_writer
+    to optimize_* or continue_*_optimization and it will follow every status poll.
+    Client-side counters and poll latency are exported from an InMemoryMetrics sink,
+    when the same sink is passed to BlackFox as metrics_sink.
+
+    Parameters
+    ----------
+    port : int
+        Port the HTTP server listens on, 0 picks a free port
+    addr : str
+        Address the HTTP server binds to
+    metrics : InMemoryMetrics
+        Optional metrics sink whose histograms and counters are exported as well
+
+    """
+
+    def __init__(self, port=9464, addr='127.0.0.1', metrics=None):
+        self.port = port
+        self.addr = addr
+        self.metrics = metrics
+        # (optimization id, engine) -> last status
+        self.runs = {}
+        self.lock = threading.Lock()
+        self.server = None
+        self.thread = None
+
+    def write_neural_network_statues(self, id, statuses):
+        engine = 'rnn' if type(statuses[-1]).__name__.startswith('Rnn') else 'ann'
+        self.__update(id, engine, statuses[-1])
+
+    def write_random_forest_statues(self, id, statuses):
+        self.__update(id, 'random_forest', statuses[-1])
+
+    def write_xgboost_statues(self, id, statuses):
+        self.__update(id, 'xgboost', statuses[-1])
+
+    def write_string(self, msg):
+        pass
+
+    def __update(self, id, engine, status):
+        with self.lock:
+            self.runs[(id, engine)] = (status, time.time())
+
+    def remove(self, id):
+        """Stops exporting an optimization."""
+        with self.lock:
+            for key in [k for k in self.runs if k[0] == id]:
+                del self.runs[key]
+
+    def render(self):
+        """Returns all metrics in Prometheus text exposition format."""
+        lines = []
+        with self.lock:
+            runs = list(self.runs.items())
+
+        def gauge(name, help, samples):
+            lines.append('# HELP %s %s' % (name, help))
+            lines.append('# TYPE %s gauge' % name)
+            for labels, value in samples:
+                if value is not None:
+                    lines.append('%s%s %s' % (name, _labels(labels), _number(value)))
+
+        def run_gauge(name, help, get):
+            gauge(name, help, [({'optimization_id': id, 'engine': engine}, get(status, updated))
+                               for (id, engine), (status, updated) in runs])
+
+        run_gauge('blackfox_optimization_generation', 'Current generation',
+                  lambda s, u: s.generation)
+        run_gauge('blackfox_optimization_total_generations', 'Total number of generations',
+                  lambda s, u: s.total_generations)
+        run_gauge('blackfox_optimization_validation_error', 'Validation set error of the best model',
+                  lambda s, u: s.validation_set_error)
+        run_gauge('blackfox_optimization_training_error', 'Training set error of the best model',
+                  lambda s, u: s.training_set_error)
+        run_gauge('blackfox_optimization_generation_seconds', 'Duration of the last generation',
+                  lambda s, u: s.generation_seconds)
+        run_gauge('blackfox_optimization_estimated_completion_timestamp_seconds', 'Estimated end of the optimization',
+                  lambda s, u: _timestamp(s.estimated_date_time))
+        run_gauge('blackfox_optimization_last_update_timestamp_seconds', 'Time of the last status poll',
+                  lambda s, u: u)
+        gauge('blackfox_optimization_state', 'Optimization state, 1 for the current state',
+              [({'optimization_id': id, 'engine': engine, 'state': state}, 1 if status.state == state else 0)
+               for (id, engine), (status, _) in runs for state in STATES])
+
+        if self.metrics is not None:
+            self.__render_client_metrics(lines)
+        return '\n'.join(lines) + '\n'
+
+    def __render_client_metrics(self, lines):
+        snapshot = self.metrics.snapshot()
+        histograms = {}
+        for h in snapshot['histograms']:
+            histograms.setdefault(h['name'], []).append(h)
+        for name, samples in sorted(histograms.items()):
+            metric = 'blackfox_client_' + name
+            lines.append('# TYPE %s histogram' % metric)
+            for h in samples:
+                cumulative = 0
+                for bound, count in h['buckets']:
+                    cumulative += count
+                    labels = dict(h['labels'], le=_number(bound))
+                    lines.append('%s_bucket%s %d' % (metric, _labels(labels), cumulative))
+                lines.append('%s_sum%s %s' % (metric, _labels(h['labels']), _number(h['sum'])))
+                lines.append('%s_count%s %d' % (metric, _labels(h['labels']), h['count']))
+        counters = {}
+        for c in snapshot['counters']:
+            counters.setdefault(c['name'], []).append(c)
+        for name, samples in sorted(counters.items()):
+            metric = 'blackfox_client_' + name + '_total'
+            lines.append('# TYPE %s counter' % metric)
+            for c in samples:
+                lines.append('%s%s %s' % (metric, _labels(c['labels']), _number(c['value'])))
+
+    def start(self):
+        """Starts the HTTP server on a background daemon thread and returns self."""
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = exporter.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((self.addr, self.port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, name='blackfox-prometheus-exporter')
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
@@ -0,0 +1,163 @@
+import time
+import random
+import threading
+from urllib3.exceptions import HTTPError, MaxRetryError, NewConnectionError, ConnectTimeoutError, SSLError
+from blackfox_restapi.rest import ApiException
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request while the circuit breaker is open."""
+    pass
+
+
+class RetryPolicy(object):
+    """Decides which failed requests are retried and how long to wait between attempts.
+
+    Requests that failed before reaching the service (connection refused, connect timeout) are
+    retried for every method. Other transient failures (dropped connections, read timeouts and
+    retry_statuses responses) are retried only for idempotent methods, since a POST may already
+    have started an optimization on the service. 500 Internal Server Error is not transient by
+    default: the service failed to handle the request itself, so asking again rarely helps; add it
+    to retry_statuses to retry it too.
+
+    Parameters
+    ----------
+    max_attempts : int
+        Maximum number of attempts per request, 1 disables retries
+    backoff_base : float
+        Base delay in seconds, doubled after every attempt
+    backoff_max : float
+        Maximum delay in seconds between two attempts
+    retry_statuses : list[int]
+        HTTP statuses considered transient
+    retry_non_idempotent : bool
+        If True, POST requests are retried on all transient failures
+
+    """
+
+    IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS'])
+
+    def __init__(self, max_attempts=5, backoff_base=0.5, backoff_max=30.0,
+                 retry_statuses=(429, 502, 503, 504), retry_non_idempotent=False):
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_statuses = frozenset(retry_statuses)
+        self.retry_non_idempotent = retry_non_idempotent
+
+    def is_connect_error(self, e):
+        if isinstance(e, MaxRetryError):
+            e = e.reason
+        return isinstance(e, (NewConnectionError, ConnectTimeoutError))
+
+    def is_transient(self, e):
+        """Returns True if the exception is caused by a (possibly) temporary outage."""
+        if isinstance(e, ApiException):
+            # status 0 is an SSL error, which is not going away on its own
+            return e.status in self.retry_statuses
+        if isinstance(e, MaxRetryError) and isinstance(e.reason, SSLError):
+            return False
+        return isinstance(e, (HTTPError, ConnectionError, CircuitOpenError))
+
+    def should_retry(self, method, e, attempt):
+        if attempt >= self.max_attempts or isinstance(e, CircuitOpenError):
+            return False
+        if self.is_connect_error(e):
+            return True
+        if not self.is_transient(e):
+            return False
+        return self.retry_non_idempotent or method.upper() in self.IDEMPOTENT_METHODS
+
+    def backoff(self, attempt):
+        """Delay before the next attempt, exponential with full jitter."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1))))
+
+
+class CircuitBreaker(object):
+    """Fails requests fast after repeated transient failures, giving the service time to recover.
+
+    After failure_threshold consecutive failures the circuit opens and requests raise
+    CircuitOpenError without being sent. After reset_timeout seconds a single trial request
+    is let through; if it succeeds the circuit closes again.
+
+    Parameters
+    ----------
+    failure_threshold : int
+        Consecutive transient failures that open the circuit
+    reset_timeout : float
+        Seconds the circuit stays open before a trial request is allowed
+
+    """
+
+    CLOSED = 'Closed'
+    OPEN = 'Open'
+    HALF_OPEN = 'HalfOpen'
+
+    def __init__(self, failure_threshold=10, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CircuitBreaker.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    def before_request(self):
+        with self.lock:
+            if self.state == CircuitBreaker.CLOSED:
+                return
+            if self.state == CircuitBreaker.OPEN and time.time() - self.opened_at >= self.reset_timeout:
+                self.state = CircuitBreaker.HALF_OPEN
+                return
+            raise CircuitOpenError(
+                'BlackFox service is unavailable, circuit opened after ' + str(self.failures) + ' failures')
+
+    def record_success(self):
+        with self.lock:
+            self.state = CircuitBreaker.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == CircuitBreaker.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = CircuitBreaker.OPEN
+                self.opened_at = time.time()
+
+
+class OutageBudget(object):
+    """Tracks how long polling has been failing with transient errors.
+
+    Errors that are not transient for the policy (e.g. 500 with the default retry_statuses) are
+    never tolerated. Once an outage lasts longer than seconds, tolerate returns False too: the
+    continue_* loops then log the error and stop the optimization, and the stop_* methods raise
+    an exception saying the status of the stopped optimization could not be read.
+
+    Parameters
+    ----------
+    seconds : float
+        How long an outage is tolerated before polling gives up
+    policy : RetryPolicy
+        Policy used to tell transient errors from permanent ones
+
+    """
+
+    def __init__(self, seconds, policy):
+        self.seconds = seconds
+        self.policy = policy
+        self.start = None
+
+    def tolerate(self, e):
+        if not self.policy.is_transient(e):
+            return False
+        if self.start is None:
+            self.start = time.time()
+        return time.time() - self.start <= self.seconds
+
+    def describe(self, e):
+        """Log message of a tolerated error, with the status code of server errors."""
+        if isinstance(e, ApiException):
+            return 'Server Error ' + str(e.status) + ', retrying: ' + str(e.reason)
+        return 'Connection Error, retrying: ' + str(e)
+
+    def reset(self):
+        self.start = None
@@ -0,0 +1,348 @@
+"""Low-latency local serving of downloaded BlackFox models.
+
+Concurrent requests are coalesced into micro-batches scored by one Predictor call::
+
+    server = ModelServer(model_path='model.onnx', loader=lambda path: load_predictor(path, 'ann'))
+    server.start(port=8080)   # POST /predict {"rows": [[...], ...]}, GET /stats
+
+The model file is reloaded when continue_*_optimization (model_path=...) writes a newer model.
+"""
+import os
+import sys
+import json
+import time
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from blackfox.instrumentation import MetricsSink
+
+_STOP = object()
+
+
+class _Request(object):
+
+    __slots__ = ('rows', 'single', 'future', 'start')
+
+    def __init__(self, rows, single):
+        self.rows = rows
+        self.single = single
+        self.future = Future()
+        self.start = time.perf_counter()
+
+
+class ModelServer(object):
+    """Serves a Predictor, scoring concurrent requests in micro-batches.
+
+    A request waits at most max_wait seconds for other requests to share its batch;
+    a batch is scored as soon as it holds max_batch_size rows.
+
+    Parameters
+    ----------
+    predictor : Predictor
+        Predictor to serve, or None to load model_path with loader
+    model_path : str
+        Model file to load and watch for newer versions
+    loader : callable
+        path -> Predictor, e.g. lambda path: load_predictor(path, 'xgboost')
+    max_batch_size : int
+        Maximum number of rows scored together
+    max_wait : float
+        Maximum seconds a request waits for a batch to fill
+    workers : int
+        Number of threads scoring batches concurrently
+    reload_interval : float
+        Seconds between checks of model_path, None disables hot reload
+    latency_window : int
+        Number of most recent request latencies kept for percentiles
+    metrics : MetricsSink
+        Optional sink receiving serving_latency_seconds and serving_batch_rows
+
+    """
+
+    def __init__(self, predictor=None, model_path=None, loader=None, max_batch_size=64, max_wait=0.002, workers=1,
+                 reload_interval=1.0, latency_window=10000, metrics=None):
+        if predictor is None and (model_path is None or loader is None):
+            raise Exception('ModelServer needs a predictor or a model_path and a loader')
+        self.model_path = model_path
+        self.loader = loader
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.metrics = metrics if metrics is not None else MetricsSink()
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.latencies = deque(maxlen=latency_window)
+        self.requests = 0
+        self.batches = 0
+        self.batch_rows = 0
+        self.errors = 0
+        self.version = 0
+        self.model_stamp = None
+        # predictor -> number of batches using it, retired predictors are closed when unused
+        self.in_use = {}
+        self.retired = []
+        self.predictor = None
+        if predictor is None:
+            self.model_stamp = self.__stamp()
+            predictor = loader(model_path)
+        self.__swap(predictor)
+        self.running = True
+        self.threads = []
+        for i in range(workers):
+            thread = threading.Thread(target=self.__work, name='blackfox-model-server-%d' % i)
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+        if model_path is not None and loader is not None and reload_interval is not None:
+            self.reload_interval = reload_interval
+            thread = threading.Thread(target=self.__watch, name='blackfox-model-watcher')
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+        self.http_server = None
+
+    def submit(self, rows):
+        """Queues one row (1-D) or several rows (2-D) for scoring.
+
+        Returns
+        -------
+        concurrent.futures.Future
+            resolves to the output of the row, or the outputs of the rows
+        """
+        if not self.running:
+            raise Exception('ModelServer is stopped')
+        import numpy
+        x = numpy.asarray(rows)
+        single = x.ndim == 1
+        request = _Request(x[numpy.newaxis] if single else x, single)
+        self.queue.put(request)
+        return request.future
+
+    def predict(self, rows, timeout=None):
+        """Scores rows in the next micro-batch and waits for the result."""
+        return self.submit(rows).result(timeout)
+
+    def reload(self, predictor=None):
+        """Replaces the served model; batches in progress finish with the previous one.
+
+        Parameters
+        ----------
+        predictor : Predictor
+            New predictor, None loads model_path with loader
+        """
+        if predictor is None:
+            self.model_stamp = self.__stamp()
+            predictor = self.loader(self.model_path)
+        self.__swap(predictor)
+
+    def __swap(self, predictor):
+        with self.lock:
+            previous = self.predictor
+            self.predictor = predictor
+            self.version += 1
+            if previous is not None:
+                self.retired.append(previous)
+            self.__close_retired()
+
+    def __close_retired(self):
+        # called with self.lock held
+        for predictor in [p for p in self.retired if self.in_use.get(id(p), 0) == 0]:
+            self.retired.remove(predictor)
+            self.in_use.pop(id(predictor), None)
+            if hasattr(predictor, 'close'):
+                predictor.close()
+
+    def __stamp(self):
+        stat = os.stat(self.model_path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def __watch(self):
+        pending = None
+        while self.running:
+            time.sleep(self.reload_interval)
+            try:
+                stamp = self.__stamp()
+            except OSError:
+                continue
+            if stamp == self.model_stamp:
+                pending = None
+            elif stamp == pending:
+                # unchanged for a whole interval, the download finished writing it
+                try:
+                    self.reload()
+                except Exception as e:
+                    print('ModelServer failed to reload ' + self.model_path + ': ' + str(e), file=sys.stderr)
+                    self.model_stamp = stamp
+                pending = None
+            else:
+                pending = stamp
+
+    def __collect(self, first):
+        requests = [first]
+        rows = len(first.rows)
+        # max_wait counts from the arrival of the oldest request
+        deadline = first.start + self.max_wait
+        while rows < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                request = self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is _STOP:
+                self.queue.put(_STOP)
+                break
+            requests.append(request)
+            rows += len(request.rows)
+        return requests, rows
+
+    def __work(self):
+        import numpy
+        while True:
+            first = self.queue.get()
+            if first is _STOP:
+                # let the other workers see it too
+                self.queue.put(_STOP)
+                return
+            requests, rows = self.__collect(first)
+            with self.lock:
+                predictor = self.predictor
+                self.in_use[id(predictor)] = self.in_use.get(id(predictor), 0) + 1
+            try:
+                # requests are scored together only with rows of the same shape, so a malformed
+                # request fails alone instead of failing the whole batch
+                groups = {}
+                for request in requests:
+                    groups.setdefault(request.rows.shape[1:], []).append(request)
+                for group in groups.values():
+                    self.__score(predictor, group, numpy)
+            finally:
+                with self.lock:
+                    self.in_use[id(predictor)] -= 1
+                    self.__close_retired()
+            done = time.perf_counter()
+            with self.lock:
+                self.requests += len(requests)
+                self.batches += 1
+                self.batch_rows += rows
+                for request in requests:
+                    self.latencies.append(done - request.start)
+            if self.metrics.enabled:
+                self.metrics.observe('serving_batch_rows', rows)
+                for request in requests:
+                    self.metrics.observe('serving_latency_seconds', done - request.start)
+
+    def __score(self, predictor, requests, numpy):
+        try:
+            x = requests[0].rows if len(requests) == 1 else numpy.concatenate([r.rows for r in requests])
+            y = predictor.predict(x)
+        except Exception as e:
+            for request in requests:
+                request.future.set_exception(e)
+            with self.lock:
+                self.errors += len(requests)
+            return
+        offset = 0
+        for request in requests:
+            n = len(request.rows)
+            request.future.set_result(y[offset] if request.single else y[offset:offset + n])
+            offset += n
+
+    def stats(self):
+        """Returns request, batch and latency statistics.
+
+        Returns
+        -------
+        dict
+            requests, batches, mean_batch_rows, errors, model_version and p50_ms/p99_ms
+            over the latency_window most recent requests
+        """
+        with self.lock:
+            latencies = sorted(self.latencies)
+            stats = {
+                'requests': self.requests,
+                'batches': self.batches,
+                'mean_batch_rows': self.batch_rows / self.batches if self.batches else None,
+                'errors': self.errors,
+                'model_version': self.version
+            }
+
+        def percentile(q):
+            if not latencies:
+                return None
+            return latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+        stats['p50_ms'] = percentile(0.5)
+        stats['p99_ms'] = percentile(0.99)
+        return stats
+
+    def start(self, port=8080, addr='127.0.0.1'):
+        """Serves POST /predict ({"rows": [[...]]} or {"row": [...]}) and GET /stats over HTTP on a daemon thread."""
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def __reply(self, status, obj):
+                body = json.dumps(obj).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path.split('?')[0] == '/stats':
+                    self.__reply(200, server.stats())
+                else:
+                    self.__reply(404, {'error': 'Not Found'})
+
+            def do_POST(self):
+                if self.path.split('?')[0] != '/predict':
+                    self.__reply(404, {'error': 'Not Found'})
+                    return
+                length = int(self.headers.get('Content-Length') or 0)
+                try:
+                    request = json.loads(self.rfile.read(length).decode('utf-8'))
+                    rows = request['rows'] if 'rows' in request else request['row']
+                except (ValueError, KeyError, TypeError):
+                    self.__reply(400, {'error': 'Expected {"rows": [[...]]} or {"row": [...]}'})
+                    return
+                try:
+                    result = server.predict(rows)
+                except Exception as e:
+                    self.__reply(500, {'error': str(e)})
+                    return
+                self.__reply(200, {'predictions': result.tolist(), 'model_version': server.version})
+
+            def log_message(self, format, *args):
+                pass
+
+        self.http_server = ThreadingHTTPServer((addr, port), Handler)
+        self.http_server.daemon_threads = True
+        self.port = self.http_server.server_address[1]
+        thread = threading.Thread(target=self.http_server.serve_forever, name='blackfox-model-server-http')
+        thread.daemon = True
+        thread.start()
+        return self
+
+    def stop(self):
+        """Stops the HTTP server and the workers after the queued requests are scored, and closes the predictor."""
+        if self.http_server is not None:
+            self.http_server.shutdown()
+            self.http_server.server_close()
+            self.http_server = None
+        if self.running:
+            self.running = False
+            self.queue.put(_STOP)
+            for thread in self.threads:
+                thread.join(self.max_wait + 5)
+            with self.lock:
+                self.retired.append(self.predictor)
+                self.__close_retired()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
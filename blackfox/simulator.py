@@ -0,0 +1,407 @@
+"""Local stand-in for the BlackFox Web API, for load and performance testing of the client.
+
+Usage::
+
+    python -m blackfox.simulator --port 50476 --latency 0.02 --error-rate 0.01 --generation-seconds 0.5
+
+or in-process::
+
+    with Simulator(generation_seconds=0.1) as sim:
+        bf = BlackFox(sim.url)
+
+The simulator implements the endpoints used by DataSetApi, the *ModelApi and *OptimizationApi
+classes and InfoApi. Optimizations advance one generation every generation_seconds, with
+synthetic, slowly converging errors; models are random bytes identified by their sha1.
+"""
+import re
+import sys
+import json
+import math
+import time
+import uuid
+import random
+import hashlib
+import argparse
+import threading
+from datetime import datetime, timedelta, timezone
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+ENGINES = ['ann', 'rnn', 'random-forest', 'xgboost']
+
+_ENGINE = '(?P<engine>ann|rnn|random-forest|xgboost)'
+_ROUTES = [
+    ('GET', r'/api/info$', 'info'),
+    ('HEAD', r'/api/dataset/(?P<id>[^/]+)$', 'data_set_exists'),
+    ('GET', r'/api/dataset/(?P<id>[^/]+)$', 'data_set_download'),
+    ('POST', r'/api/dataset$', 'data_set_upload'),
+    ('HEAD', r'/api/' + _ENGINE + r'/model/(?P<id>[^/]+)$', 'model_exists'),
+    ('GET', r'/api/' + _ENGINE + r'/model/(?P<id>[^/]+)/metadata$', 'model_metadata'),
+    ('GET', r'/api/' + _ENGINE + r'/model/(?P<id>[^/]+)$', 'model_download'),
+    ('POST', r'/api/' + _ENGINE + r'/model$', 'model_upload'),
+    ('POST', r'/api/' + _ENGINE + r'(?P<series>/series)?$', 'start'),
+    ('GET', r'/api/' + _ENGINE + r'/(?P<id>[^/]+)/status$', 'status'),
+    ('GET', r'/api/' + _ENGINE + r'/(?P<id>[^/]+)/model-id/(?P<generation>\d+)$', 'model_id'),
+    ('POST', r'/api/' + _ENGINE + r'/(?P<id>[^/]+)/action/stop$', 'stop'),
+    ('DELETE', r'/api/' + _ENGINE + r'/(?P<id>[^/]+)$', 'delete'),
+]
+_ROUTES = [(method, re.compile(pattern), name) for method, pattern, name in _ROUTES]
+
+
+class SimulatedOptimization(object):
+
+    def __init__(self, engine, config, total_generations, generation_seconds, seed):
+        self.id = str(uuid.uuid4())
+        self.engine = engine
+        self.config = config
+        self.total_generations = total_generations
+        self.generation_seconds = generation_seconds
+        self.start = time.time()
+        self.stopped_at = None
+        random_state = random.Random(seed)
+        self.initial_error = random_state.uniform(0.2, 1.0)
+        self.decay = random_state.uniform(3, 8)
+        self.noise = [random_state.uniform(0.95, 1.05) for _ in range(total_generations + 1)]
+        inputs = config.get('inputs') or [None]
+        self.feature_selection = [random_state.random() > 0.2 for _ in inputs]
+
+    def generation(self, now):
+        end = self.stopped_at if self.stopped_at is not None else now
+        return min(self.total_generations, int((end - self.start) / self.generation_seconds))
+
+    def state(self, now):
+        if self.stopped_at is not None:
+            return 'Stopped'
+        if self.generation(now) >= self.total_generations:
+            return 'Finished'
+        return 'Active'
+
+    def best_model(self):
+        if self.engine in ('ann', 'rnn'):
+            return {
+                'hiddenLayers': [{'neuronCount': 8, 'activationFunction': 'ReLu', 'dropout': 0.1}],
+                'featureSelection': self.feature_selection
+            }
+        if self.engine == 'random-forest':
+            return {'numberOfEstimators': 100, 'maxDepth': 10, 'maxFeatures': 0.5, 'featureSelection': self.feature_selection}
+        return {'nEstimators': 100, 'maxDepth': 6, 'learningRate': 0.1, 'featureSelection': self.feature_selection}
+
+    def status(self, generation, state):
+        error = self.initial_error * math.exp(-generation / self.decay) * self.noise[generation]
+        start = datetime.fromtimestamp(self.start, timezone.utc)
+        status = {
+            'guid': self.id,
+            'state': state,
+            'generation': generation,
+            'totalGenerations': self.total_generations,
+            'validationSetError': error,
+            'trainingSetError': error * 0.9,
+            'bestModel': self.best_model() if generation > 0 else None,
+            'startDateTime': start.isoformat(),
+            'estimatedDateTime': (start + timedelta(seconds=self.total_generations * self.generation_seconds)).isoformat(),
+            'generationSeconds': int(self.generation_seconds),
+            'metricName': 'MAE'
+        }
+        if self.engine in ('ann', 'rnn'):
+            status['epoch'] = 100
+        else:
+            status['featureSelection'] = self.feature_selection
+        return status
+
+    def statuses(self, now):
+        generation = self.generation(now)
+        state = self.state(now)
+        history = [self.status(g, 'Active') for g in range(generation)]
+        history.append(self.status(generation, state))
+        return history
+
+
+class SimulatedService(object):
+    """In-memory BlackFox service state and request handling, independent of the HTTP server.
+
+    Parameters
+    ----------
+    latency : float
+        Seconds added to every response
+    latency_jitter : float
+        Maximum random seconds added on top of latency
+    error_rate : float
+        Probability of answering a request with one of error_statuses
+    error_statuses : list[int]
+        Statuses used for injected errors
+    generation_seconds : float
+        Seconds it takes an optimization to advance one generation
+    total_generations : int
+        Generations per optimization, unless the config sets engineConfig.maxNumOfGenerations
+    model_size : int
+        Size in bytes of generated models
+    version : str
+        Service version reported by /api/info, defaults to the client version
+    seed : int
+        Seed for latency, error injection and synthetic errors
+
+    """
+
+    def __init__(self, latency=0.0, latency_jitter=0.0, error_rate=0.0, error_statuses=(502, 503),
+                 generation_seconds=1.0, total_generations=10, model_size=64 * 1024, version=None, seed=None):
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.error_statuses = list(error_statuses)
+        self.generation_seconds = generation_seconds
+        self.total_generations = total_generations
+        self.model_size = model_size
+        if version is None:
+            from blackfox_restapi.models.service_info import ServiceInfo
+            version = ServiceInfo().version
+        self.version = version
+        self.random = random.Random(seed)
+        self.data_sets = {}
+        self.models = dict((engine, {}) for engine in ENGINES)
+        self.optimizations = {}
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def handle(self, method, url, body=b'', headers=None):
+        """Handles one request.
+
+        Returns
+        -------
+        (int, dict, bytes)
+            status, headers and body of the response
+        """
+        with self.lock:
+            self.requests += 1
+            delay = self.latency + self.random.uniform(0, self.latency_jitter)
+            fail = self.error_rate > 0 and self.random.random() < self.error_rate
+            error_status = self.random.choice(self.error_statuses) if fail else None
+        if delay > 0:
+            time.sleep(delay)
+        if fail:
+            return self.__json(error_status, {'title': 'Injected error', 'status': error_status})
+        parsed = urlparse(url)
+        for route_method, pattern, name in _ROUTES:
+            if route_method != method:
+                continue
+            m = pattern.match(parsed.path)
+            if m is not None:
+                params = m.groupdict()
+                query = dict((k, v[-1]) for k, v in parse_qs(parsed.query).items())
+                return getattr(self, '_' + name)(params, query, body, headers or {})
+        return self.__json(404, {'title': 'Not Found', 'status': 404})
+
+    def __json(self, status, obj):
+        return status, {'Content-Type': 'application/json'}, json.dumps(obj).encode('utf-8')
+
+    def __bytes(self, data):
+        return 200, {'Content-Type': 'application/octet-stream'}, data
+
+    def __empty(self, status):
+        return status, {}, b''
+
+    def __file(self, body, headers):
+        content_type = headers.get('Content-Type', '')
+        message = BytesParser().parsebytes(b'Content-Type: ' + content_type.encode('latin-1') + b'\r\n\r\n' + body)
+        if message.is_multipart():
+            for part in message.get_payload():
+                if part.get_param('name', header='content-disposition') == 'file':
+                    return part.get_payload(decode=True)
+        return body
+
+    def __optimization(self, params):
+        with self.lock:
+            return self.optimizations.get((params['engine'], params['id']))
+
+    def _info(self, params, query, body, headers):
+        return self.__json(200, {'version': self.version})
+
+    def _data_set_exists(self, params, query, body, headers):
+        return self.__empty(200 if params['id'] in self.data_sets else 404)
+
+    def _data_set_download(self, params, query, body, headers):
+        data = self.data_sets.get(params['id'])
+        return self.__bytes(data) if data is not None else self.__empty(404)
+
+    def _data_set_upload(self, params, query, body, headers):
+        data = self.__file(body, headers)
+        id = hashlib.sha1(data).hexdigest()
+        with self.lock:
+            self.data_sets[id] = data
+        return self.__json(200, id)
+
+    def _model_exists(self, params, query, body, headers):
+        return self.__empty(200 if params['id'] in self.models[params['engine']] else 404)
+
+    def _model_metadata(self, params, query, body, headers):
+        data = self.models[params['engine']].get(params['id'])
+        if data is None:
+            return self.__empty(404)
+        return self.__json(200, {'id': params['id'], 'engine': params['engine'], 'size': len(data)})
+
+    def _model_download(self, params, query, body, headers):
+        data = self.models[params['engine']].get(params['id'])
+        if data is None:
+            return self.__empty(404)
+        model_type = query.get('modelType')
+        if model_type is not None:
+            # a converted model is a different file
+            data = hashlib.sha1(data + model_type.encode('utf-8')).digest() + data
+        return self.__bytes(data)
+
+    def _model_upload(self, params, query, body, headers):
+        data = self.__file(body, headers)
+        id = hashlib.sha1(data).hexdigest()
+        with self.lock:
+            self.models[params['engine']][id] = data
+        return self.__json(200, id)
+
+    def _start(self, params, query, body, headers):
+        config = json.loads(body.decode('utf-8')) if body else {}
+        engine_config = config.get('engineConfig') or {}
+        total_generations = engine_config.get('maxNumOfGenerations') or self.total_generations
+        with self.lock:
+            seed = self.random.random()
+        optimization = SimulatedOptimization(params['engine'], config, total_generations, self.generation_seconds, seed)
+        with self.lock:
+            self.optimizations[(params['engine'], optimization.id)] = optimization
+        return self.__json(200, optimization.id)
+
+    def _status(self, params, query, body, headers):
+        optimization = self.__optimization(params)
+        if optimization is None:
+            return self.__empty(404)
+        return self.__json(200, optimization.statuses(time.time()))
+
+    def _model_id(self, params, query, body, headers):
+        optimization = self.__optimization(params)
+        if optimization is None:
+            return self.__empty(404)
+        seed = (optimization.id + '/' + params['generation']).encode('utf-8')
+        data = (hashlib.sha1(seed).digest() * (self.model_size // 20 + 1))[:self.model_size]
+        id = hashlib.sha1(data).hexdigest()
+        with self.lock:
+            self.models[params['engine']][id] = data
+        return self.__json(200, id)
+
+    def _stop(self, params, query, body, headers):
+        optimization = self.__optimization(params)
+        if optimization is None:
+            return self.__empty(404)
+        if optimization.state(time.time()) == 'Active':
+            optimization.stopped_at = time.time()
+        return self.__empty(200)
+
+    def _delete(self, params, query, body, headers):
+        with self.lock:
+            optimization = self.optimizations.pop((params['engine'], params['id']), None)
+        return self.__empty(200 if optimization is not None else 404)
+
+
+class Simulator(object):
+    """Runs a SimulatedService behind an HTTP server on a background thread.
+
+    Parameters
+    ----------
+    service : SimulatedService
+        Service to expose, created from kwargs if None
+    host : str
+        Address the server binds to
+    port : int
+        Port the server listens on, 0 picks a free port
+
+    """
+
+    def __init__(self, service=None, host='127.0.0.1', port=0, **kwargs):
+        self.service = service if service is not None else SimulatedService(**kwargs)
+        self.host = host
+        self.port = port
+        self.server = None
+        self.thread = None
+
+    @property
+    def url(self):
+        return 'http://%s:%d' % (self.host, self.port)
+
+    def start(self):
+        service = self.service
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # headers and body are written separately, Nagle would delay the body until the next ACK
+            disable_nagle_algorithm = True
+
+            def __handle(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length > 0 else b''
+                status, headers, data = service.handle(self.command, self.path, body, dict(self.headers.items()))
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                if self.command != 'HEAD':
+                    self.wfile.write(data)
+
+            do_GET = do_HEAD = do_POST = do_DELETE = __handle
+
+            def log_message(self, format, *args):
+                pass
+
+        class Server(ThreadingHTTPServer):
+            daemon_threads = True
+            request_queue_size = 1024
+
+        self.server = Server((self.host, self.port), Handler)
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, name='blackfox-simulator')
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Simulated BlackFox Web API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=50476)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--latency-jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--generation-seconds', type=float, default=1.0)
+    parser.add_argument('--total-generations', type=int, default=10)
+    parser.add_argument('--model-size', type=int, default=64 * 1024)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args(argv)
+    simulator = Simulator(
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        latency_jitter=args.latency_jitter,
+        error_rate=args.error_rate,
+        generation_seconds=args.generation_seconds,
+        total_generations=args.total_generations,
+        model_size=args.model_size,
+        seed=args.seed
+    ).start()
+    print('BlackFox simulator listening on ' + simulator.url)
+    try:
+        simulator.thread.join()
+    except KeyboardInterrupt:
+        simulator.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,127 @@
+import pprint
+
+
+class StatusRecord(object):
+    """Lightweight optimization status, decoded directly from the status endpoint JSON.
+
+    Records have the attributes of the generated *OptimizationStatus models but use __slots__
+    and skip the validating setters. best_model, start_date_time and estimated_date_time are
+    deserialized on first access, since log writers and polling loops mostly read the numbers
+    of the last status only.
+    """
+
+    __slots__ = ('guid', 'state', 'generation', 'total_generations', 'validation_set_error', 'training_set_error',
+                 'generation_seconds', 'metric_name', '_best_model', '_start_date_time', '_estimated_date_time',
+                 '_deserialize')
+
+    # (attribute, JSON key) of eagerly decoded fields
+    FIELDS = (
+        ('guid', 'guid'),
+        ('state', 'state'),
+        ('generation', 'generation'),
+        ('total_generations', 'totalGenerations'),
+        ('validation_set_error', 'validationSetError'),
+        ('training_set_error', 'trainingSetError'),
+        ('generation_seconds', 'generationSeconds'),
+        ('metric_name', 'metricName')
+    )
+    # swagger model of best_model
+    MODEL_TYPE = None
+
+    def __init__(self, data, deserialize):
+        get = data.get
+        for attr, key in self.FIELDS:
+            setattr(self, attr, get(key))
+        self._best_model = get('bestModel')
+        self._start_date_time = get('startDateTime')
+        self._estimated_date_time = get('estimatedDateTime')
+        self._deserialize = deserialize
+
+    def __lazy(self, value, klass):
+        if value is None or not isinstance(value, (str, dict)):
+            return value, False
+        return self._deserialize(value, klass), True
+
+    @property
+    def best_model(self):
+        value, decoded = self.__lazy(self._best_model, self.MODEL_TYPE)
+        if decoded:
+            self._best_model = value
+        return value
+
+    @best_model.setter
+    def best_model(self, value):
+        self._best_model = value
+
+    @property
+    def start_date_time(self):
+        value, decoded = self.__lazy(self._start_date_time, 'datetime')
+        if decoded:
+            self._start_date_time = value
+        return value
+
+    @start_date_time.setter
+    def start_date_time(self, value):
+        self._start_date_time = value
+
+    @property
+    def estimated_date_time(self):
+        value, decoded = self.__lazy(self._estimated_date_time, 'datetime')
+        if decoded:
+            self._estimated_date_time = value
+        return value
+
+    @estimated_date_time.setter
+    def estimated_date_time(self, value):
+        self._estimated_date_time = value
+
+    def to_dict(self):
+        """Returns the record as a dict with the keys of the generated model's to_dict."""
+        result = dict((attr, getattr(self, attr)) for attr, _ in self.FIELDS)
+        best_model = self.best_model
+        result['best_model'] = best_model.to_dict() if hasattr(best_model, 'to_dict') else best_model
+        result['start_date_time'] = self.start_date_time
+        result['estimated_date_time'] = self.estimated_date_time
+        return result
+
+    def __repr__(self):
+        return pprint.pformat(self.to_dict())
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.to_dict() == other.to_dict()
+
+    def __ne__(self, other):
+        return not self == other
+
+
+class AnnStatusRecord(StatusRecord):
+    __slots__ = ('epoch',)
+    FIELDS = StatusRecord.FIELDS + (('epoch', 'epoch'),)
+    MODEL_TYPE = 'AnnModel'
+
+
+class RnnStatusRecord(StatusRecord):
+    __slots__ = ('epoch',)
+    FIELDS = StatusRecord.FIELDS + (('epoch', 'epoch'),)
+    MODEL_TYPE = 'RnnModel'
+
+
+class RandomForestStatusRecord(StatusRecord):
+    __slots__ = ('feature_selection',)
+    FIELDS = StatusRecord.FIELDS + (('feature_selection', 'featureSelection'),)
+    MODEL_TYPE = 'RandomForestModel'
+
+
+class XGBoostStatusRecord(StatusRecord):
+    __slots__ = ()
+    MODEL_TYPE = 'XGBoostModel'
+
+
+# response_type of the status endpoints -> record class
+STATUS_RECORDS = {
+    'list[AnnOptimizationStatus]': AnnStatusRecord,
+    'list[RnnOptimizationStatus]': RnnStatusRecord,
+    'list[RandomForestOptimizationStatus]': RandomForestStatusRecord,
+    'list[XGBoostOptimizationStatus]': XGBoostStatusRecord
+}
+
@@ -0,0 +1,202 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+
+COLUMNS = [
+    'optimization_id', 'engine', 'generation', 'state', 'total_generations',
+    'validation_set_error', 'training_set_error', 'metric_name', 'epoch',
+    'generation_seconds', 'start_date_time', 'estimated_date_time', 'best_model', 'recorded_at'
+]
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS statuses (
+    optimization_id TEXT NOT NULL,
+    engine TEXT NOT NULL,
+    generation INTEGER NOT NULL,
+    state TEXT,
+    total_generations INTEGER,
+    validation_set_error REAL,
+    training_set_error REAL,
+    metric_name TEXT,
+    epoch INTEGER,
+    generation_seconds INTEGER,
+    start_date_time TEXT,
+    estimated_date_time TEXT,
+    best_model TEXT,
+    recorded_at REAL NOT NULL,
+    PRIMARY KEY (optimization_id, generation)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS statuses_best ON statuses (optimization_id, validation_set_error);
+CREATE INDEX IF NOT EXISTS statuses_recorded_at ON statuses (recorded_at);
+'''
+
+
+def _text(value):
+    if value is None:
+        return None
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+class StatusStore(object):
+    """Stores optimization status history in an indexed SQLite database (WAL mode).
+
+    The store is a log writer: pass it (alone or in a list with other writers) as log_writer
+    to optimize_* or continue_*_optimization. Every generation of every run is one row keyed
+    by (optimization_id, generation); each poll only writes generations not stored yet and
+    the latest status. Several processes can write to the same database.
+
+    Parameters
+    ----------
+    path : str
+        SQLite database file, ':memory:' keeps the history in memory
+    timeout : float
+        Seconds to wait for a database lock held by another process
+
+    """
+
+    def __init__(self, path='status.db', timeout=30.0):
+        self.path = path
+        self.connection = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.lock = threading.Lock()
+        with self.lock:
+            if path != ':memory:':
+                self.connection.execute('PRAGMA journal_mode=WAL')
+                self.connection.execute('PRAGMA synchronous=NORMAL')
+            self.connection.executescript(_SCHEMA)
+        # optimization id -> last generation stored
+        self.stored = {}
+
+    def write_neural_network_statues(self, id, statuses):
+        engine = 'rnn' if type(statuses[-1]).__name__.startswith('Rnn') else 'ann'
+        self.append(id, engine, statuses)
+
+    def write_random_forest_statues(self, id, statuses):
+        self.append(id, 'random_forest', statuses)
+
+    def write_xgboost_statues(self, id, statuses):
+        self.append(id, 'xgboost', statuses)
+
+    def write_string(self, msg):
+        pass
+
+    def __row(self, id, engine, status, recorded_at):
+        best_model = status.best_model
+        if best_model is not None:
+            best_model = json.dumps(best_model.to_dict() if hasattr(best_model, 'to_dict') else best_model, default=str)
+        return (
+            id, engine, status.generation, status.state, status.total_generations,
+            status.validation_set_error, status.training_set_error, status.metric_name,
+            getattr(status, 'epoch', None), status.generation_seconds,
+            _text(status.start_date_time), _text(status.estimated_date_time), best_model, recorded_at
+        )
+
+    def append(self, id, engine, statuses):
+        """Stores the generations of statuses not stored yet, and the latest status."""
+        if not statuses:
+            return
+        recorded_at = time.time()
+        last = self.stored.get(id, -1)
+        rows = [self.__row(id, engine, s, recorded_at) for s in statuses[:-1] if s.generation > last]
+        rows.append(self.__row(id, engine, statuses[-1], recorded_at))
+        with self.lock:
+            with self.connection:
+                self.connection.executemany(
+                    'INSERT OR REPLACE INTO statuses VALUES (' + ','.join('?' * len(COLUMNS)) + ')', rows)
+        self.stored[id] = max(last, statuses[-1].generation - 1)
+
+    def __query(self, sql, params=()):
+        with self.lock:
+            return [dict(r) for r in self.connection.execute(sql, params).fetchall()]
+
+    def runs(self):
+        """Returns one row per optimization: id, engine, last generation, state and time of the last update."""
+        return self.__query('''
+            SELECT s.optimization_id, s.engine, s.generation, s.total_generations, s.state, s.recorded_at
+            FROM statuses s
+            JOIN (SELECT optimization_id, MAX(generation) AS generation FROM statuses GROUP BY optimization_id) last
+            USING (optimization_id, generation)
+            ORDER BY s.recorded_at''')
+
+    def history(self, id):
+        """Returns all stored statuses of an optimization ordered by generation."""
+        return self.__query('SELECT * FROM statuses WHERE optimization_id = ? ORDER BY generation', (id,))
+
+    def best_validation_errors(self):
+        """Returns the lowest validation set error of every optimization and the generation reaching it."""
+        return self.__query('''
+            SELECT optimization_id, engine, generation, MIN(validation_set_error) AS validation_set_error,
+                   training_set_error, metric_name
+            FROM statuses
+            GROUP BY optimization_id
+            ORDER BY validation_set_error''')
+
+    def best_validation_error_over_time(self, id=None, since=None):
+        """Returns the best validation set error reached so far after every generation.
+
+        Parameters
+        ----------
+        id : str
+            Optional optimization id, all optimizations if None
+        since : float
+            Optional unix time, only generations recorded after it are returned
+
+        Returns
+        -------
+        list[dict]
+            optimization_id, generation, recorded_at, validation_set_error and best_validation_set_error
+        """
+        conditions = []
+        params = []
+        if id is not None:
+            conditions.append('optimization_id = ?')
+            params.append(id)
+        where = ('WHERE ' + ' AND '.join(conditions)) if conditions else ''
+        sql = '''
+            SELECT optimization_id, generation, recorded_at, validation_set_error,
+                   MIN(validation_set_error) OVER (PARTITION BY optimization_id ORDER BY generation) AS best_validation_set_error
+            FROM statuses ''' + where
+        if since is not None:
+            # the running minimum includes generations recorded before since
+            sql = 'SELECT * FROM (' + sql + ') WHERE recorded_at >= ?'
+            params.append(since)
+        return self.__query(sql + ' ORDER BY optimization_id, generation', params)
+
+    def export_parquet(self, directory, id=None):
+        """Writes the history to Parquet files partitioned by optimization id (requires pyarrow).
+
+        Files are written as directory/optimization_id=<id>/statuses.parquet, readable as one
+        dataset with pyarrow.dataset or pandas.read_parquet(directory).
+
+        Returns
+        -------
+        list[str]
+            written file paths
+        """
+        import pyarrow
+        import pyarrow.parquet as pq
+        ids = [id] if id is not None else [r['optimization_id'] for r in self.runs()]
+        paths = []
+        for optimization_id in ids:
+            rows = self.history(optimization_id)
+            partition = os.path.join(directory, 'optimization_id=' + optimization_id)
+            os.makedirs(partition, exist_ok=True)
+            columns = dict((c, [r[c] for r in rows]) for c in COLUMNS if c != 'optimization_id')
+            path = os.path.join(partition, 'statuses.parquet')
+            pq.write_table(pyarrow.table(columns), path)
+            paths.append(path)
+        return paths
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,194 @@
+import io
+import gzip
+import json
+import time
+import base64
+import hashlib
+import threading
+from collections import deque
+from urllib.parse import urlparse, urlencode
+from blackfox_restapi.rest import ApiException
+
+FORMAT_VERSION = 1
+# bodies at least this large are stored once and referenced by sha1 afterwards
+_BLOB_MIN_SIZE = 4096
+
+
+def _key(method, url, query_params):
+    path = urlparse(url).path
+    query = urlencode(sorted((str(k), str(v)) for k, v in (query_params or [])))
+    return method.upper() + ' ' + path + ('?' + query if query else '')
+
+
+class TrafficRecorder(object):
+    """Records every request/response exchange of a BlackFox instance to a gzip compressed JSON lines file.
+
+    Status sequences, metadata, data sets and model bytes are stored as received; identical large
+    bodies (e.g. the same model downloaded twice) are stored once. Error responses and connection
+    failures are recorded too, so retries replay the same way.
+
+    Parameters
+    ----------
+    path : str
+        Recording file, usually ending with .jsonl.gz
+    compresslevel : int
+        gzip compression level
+
+    """
+
+    def __init__(self, path, compresslevel=6):
+        self.path = path
+        self.file = gzip.open(path, mode='wt', encoding='utf-8', compresslevel=compresslevel)
+        self.start = time.perf_counter()
+        self.blobs = set()
+        self.lock = threading.Lock()
+        self.__write({'format': FORMAT_VERSION, 'recorded_at': time.time()})
+
+    def __write(self, record):
+        self.file.write(json.dumps(record, separators=(',', ':')))
+        self.file.write('\n')
+
+    def __body(self, record, data):
+        if data is None:
+            return
+        if isinstance(data, str):
+            record['text'] = data
+            return
+        if len(data) >= _BLOB_MIN_SIZE:
+            digest = hashlib.sha1(data).hexdigest()
+            record['blob'] = digest
+            if digest in self.blobs:
+                return
+            self.blobs.add(digest)
+        record['b64'] = base64.b64encode(data).decode('ascii')
+
+    def record(self, method, url, query_params, response=None, error=None):
+        """Appends one exchange; response is a RESTResponse, error the exception raised instead."""
+        record = {'key': _key(method, url, query_params)}
+        if isinstance(error, ApiException) and error.status:
+            record['status'] = error.status
+            record['reason'] = error.reason
+            record['headers'] = dict(error.headers or {})
+            data = error.body
+        elif error is not None:
+            record['error'] = type(error).__name__ + ': ' + str(error)
+            data = None
+        else:
+            record['status'] = response.status
+            record['reason'] = response.reason
+            record['headers'] = dict(response.getheaders() or {})
+            data = response.data
+        with self.lock:
+            if self.file is None:
+                return
+            record['t'] = round(time.perf_counter() - self.start, 6)
+            self.__body(record, data)
+            self.__write(record)
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class ReplayResponse(io.IOBase):
+    """Recorded response with the RESTResponse interface used by ApiClient."""
+
+    def __init__(self, status, reason, headers, data):
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.data = data
+
+    def getheaders(self):
+        return self.headers
+
+    def getheader(self, name, default=None):
+        for k, v in self.headers.items():
+            if k.lower() == name.lower():
+                return v
+        return default
+
+
+class TrafficReplay(object):
+    """Serves a TrafficRecorder recording instead of sending requests to the service.
+
+    Responses to the same request are served in recorded order, each no earlier than its time after
+    the first recorded exchange divided by speed since the first replayed request, so an optimization recorded over hours
+    replays in seconds at speed=1000. Pass status_interval=0 to continue_*_optimization to let the
+    recording set the polling pace.
+
+    Parameters
+    ----------
+    path : str
+        Recording file written by TrafficRecorder
+    speed : float
+        Replay speed factor, None serves responses without waiting
+
+    """
+
+    def __init__(self, path, speed=1.0):
+        self.path = path
+        self.speed = speed
+        self.exchanges = {}
+        self.start = None
+        # recorded times count from the recorder's construction, replay pacing from the first request
+        self.origin = None
+        self.lock = threading.Lock()
+        blobs = {}
+        with gzip.open(path, mode='rt', encoding='utf-8') as f:
+            header = json.loads(f.readline())
+            if header.get('format') != FORMAT_VERSION:
+                raise Exception('Unsupported traffic recording format: ' + str(header.get('format')))
+            for line in f:
+                record = json.loads(line)
+                if 'b64' in record:
+                    data = base64.b64decode(record.pop('b64'))
+                    if 'blob' in record:
+                        blobs[record['blob']] = data
+                    record['data'] = data
+                elif 'blob' in record:
+                    record['data'] = blobs[record['blob']]
+                else:
+                    record['data'] = record.pop('text', None)
+                self.exchanges.setdefault(record['key'], deque()).append(record)
+                if self.origin is None or record['t'] < self.origin:
+                    self.origin = record['t']
+
+    def remaining(self):
+        """Number of recorded exchanges not replayed yet."""
+        with self.lock:
+            return sum(len(q) for q in self.exchanges.values())
+
+    def sleep(self, seconds):
+        """Waits seconds scaled by the replay speed, used for retry backoff."""
+        if self.speed:
+            time.sleep(seconds / self.speed)
+
+    def request(self, method, url, query_params=None):
+        """Returns the next recorded response to the request, raising recorded errors."""
+        key = _key(method, url, query_params)
+        with self.lock:
+            if self.start is None:
+                self.start = time.perf_counter()
+            queue = self.exchanges.get(key)
+            if not queue:
+                raise Exception('No recorded response left for ' + key)
+            record = queue.popleft()
+        if self.speed:
+            delay = self.start + (record['t'] - self.origin) / self.speed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        if 'error' in record:
+            raise ConnectionError('Replayed ' + record['error'])
+        response = ReplayResponse(record['status'], record['reason'], record['headers'], record['data'])
+        if not 200 <= response.status <= 299:
+            raise ApiException(http_resp=response)
+        return response
@@ -0,0 +1,209 @@
+"""Client-side materialization of the windowed features of series models.
+
+For the sample at time t, an input column with window w, step s and shift h contributes the
+samples t - h - w + 1 ... t - h, oldest first, in w // s groups of s samples. Without aggregation
+the last (most recent) sample of every group is a feature, with Avg/Sum the mean/sum of the
+group. An output column with window w and shift h holds the samples t + h ... t + h + w - 1.
+
+Windows are strided views of the input columns (numpy.lib.stride_tricks), so rows are never
+copied one by one; numpy is imported on first use.
+"""
+from blackfox.preprocessing import get_field
+
+AGGREGATIONS = ['None', 'Avg', 'Sum']
+
+
+class _InputWindow(object):
+
+    def __init__(self, index, window, step, shift, aggregation):
+        aggregation = aggregation or 'None'
+        if aggregation not in AGGREGATIONS:
+            raise Exception('Unknown aggregation type ' + str(aggregation) + ' of input ' + str(index))
+        if window < 1 or step < 1 or shift < 0:
+            raise Exception('Input ' + str(index) + ' needs window >= 1, step >= 1 and shift >= 0')
+        self.index = index
+        self.window = window
+        self.step = step
+        self.shift = shift
+        self.aggregation = aggregation
+        self.width = window // step
+        if self.width == 0:
+            raise Exception('Input ' + str(index) + ' has a window smaller than its step')
+        # samples before t (inclusive) needed by the window
+        self.history = shift + window
+
+
+class SeriesWindows(object):
+    """Builds the lagged and shifted feature matrix a series model expects.
+
+    Parameters
+    ----------
+    input_windows : list[InputWindowConfig]
+        One window per input column (window, step, shift, aggregation_type), e.g. the
+        input_window_configs of the model's AnnSeriesTrainingConfig; dicts are accepted too
+    output_windows : list[OutputWindowConfig]
+        Optional window per output column (window, shift), needed for training targets only
+    output_sample_step : int
+        Keeps every output_sample_step-th sample
+
+    """
+
+    def __init__(self, input_windows, output_windows=None, output_sample_step=1):
+        import numpy
+        self.np = numpy
+        self.inputs = []
+        for i, w in enumerate(input_windows):
+            self.inputs.append(_InputWindow(
+                i, int(get_field(w, 'window') or 1), int(get_field(w, 'step') or 1), int(get_field(w, 'shift') or 0),
+                get_field(w, 'aggregation_type', 'aggregationType')))
+        self.outputs = [(int(get_field(w, 'window') or 1), int(get_field(w, 'shift') or 0))
+                        for w in output_windows or []]
+        self.output_sample_step = int(output_sample_step or 1)
+        self.history = max(w.history for w in self.inputs)
+        # samples after t needed by the output windows
+        self.horizon = max([shift + window - 1 for window, shift in self.outputs] or [0])
+        self.width = sum(w.width for w in self.inputs)
+        self.output_width = sum(window for window, shift in self.outputs)
+
+    @classmethod
+    def from_config(cls, config):
+        """Builds the windows from a series training config (input_window_configs, output_window_configs)."""
+        return cls(get_field(config, 'input_window_configs', 'inputWindowConfigs'),
+                   get_field(config, 'output_window_configs', 'outputWindowConfigs'),
+                   get_field(config, 'output_sample_step', 'outputSampleStep'))
+
+    @classmethod
+    def from_metadata(cls, metadata):
+        """Builds the windows from a get_*_metadata dict of a series model.
+
+        The training config may be nested under 'trainingConfig' or 'config'.
+        """
+        config = get_field(metadata, 'trainingConfig', 'training_config', 'config') or metadata
+        if get_field(config, 'input_window_configs', 'inputWindowConfigs') is None:
+            raise Exception('Metadata has no input window configs, is it a series model?')
+        return cls.from_config(config)
+
+    def __window_features(self, column, w, times):
+        """Features of one input column for the sample times; a strided view unless aggregated."""
+        np = self.np
+        from numpy.lib.stride_tricks import sliding_window_view
+        # windows[k] holds the samples k ... k + window - 1, the window of time k + window - 1 + shift
+        windows = sliding_window_view(column, w.window)
+        windows = windows[times - w.shift - w.window + 1]
+        # when step does not divide window, the oldest window % step samples are unused
+        start = w.window - w.width * w.step
+        if w.aggregation == 'None':
+            return windows[:, start + w.step - 1::w.step]
+        groups = windows[:, start:].reshape(len(times), w.width, w.step)
+        return groups.mean(axis=2) if w.aggregation == 'Avg' else groups.sum(axis=2)
+
+    def sample_times(self, samples, targets=False):
+        """Times t with a complete input window (and output window if targets is True), keeping every output_sample_step-th."""
+        np = self.np
+        last = samples - 1 - (self.horizon if targets else 0)
+        return np.arange(self.history - 1, last + 1, self.output_sample_step if targets else 1, dtype=np.intp)
+
+    def transform_inputs(self, inputs, times=None, dtype='float32'):
+        """Returns the (len(times), width) feature matrix, by default for every time with a complete window.
+
+        Parameters
+        ----------
+        inputs : numpy.ndarray or list
+            (samples, inputs) raw input series
+        times : numpy.ndarray
+            Optional sample times to build features for
+        """
+        np = self.np
+        x = np.asarray(inputs)
+        if x.ndim == 1:
+            x = x[:, np.newaxis]
+        if x.shape[1] != len(self.inputs):
+            raise Exception('Expected ' + str(len(self.inputs)) + ' input columns, got ' + str(x.shape[1]))
+        if times is None:
+            times = self.sample_times(len(x))
+        result = np.empty((len(times), self.width), dtype=dtype)
+        if len(times) == 0:
+            return result
+        offset = 0
+        for w in self.inputs:
+            result[:, offset:offset + w.width] = self.__window_features(x[:, w.index], w, times)
+            offset += w.width
+        return result
+
+    def transform_outputs(self, outputs, times, dtype='float32'):
+        """Returns the (len(times), output_width) target matrix of the output windows."""
+        np = self.np
+        from numpy.lib.stride_tricks import sliding_window_view
+        y = np.asarray(outputs)
+        if y.ndim == 1:
+            y = y[:, np.newaxis]
+        if y.shape[1] != len(self.outputs):
+            raise Exception('Expected ' + str(len(self.outputs)) + ' output columns, got ' + str(y.shape[1]))
+        result = np.empty((len(times), self.output_width), dtype=dtype)
+        if len(times) == 0:
+            return result
+        offset = 0
+        for i, (window, shift) in enumerate(self.outputs):
+            result[:, offset:offset + window] = sliding_window_view(y[:, i], window)[times + shift]
+            offset += window
+        return result
+
+    def transform(self, inputs, outputs, dtype='float32'):
+        """Returns aligned features and targets for every time with complete input and output windows.
+
+        Returns
+        -------
+        (numpy.ndarray, numpy.ndarray)
+            (rows, width) features and (rows, output_width) targets
+        """
+        times = self.sample_times(len(inputs), targets=True)
+        return self.transform_inputs(inputs, times, dtype), self.transform_outputs(outputs, times, dtype)
+
+    def stream(self, dtype='float32'):
+        """Returns a SeriesWindowStream building features of samples as they arrive."""
+        return SeriesWindowStream(self, dtype)
+
+
+class SeriesWindowStream(object):
+    """Streaming feature builder: keeps the last history - 1 samples between pushes.
+
+    Parameters
+    ----------
+    windows : SeriesWindows
+        Windows of the model
+    dtype : str
+        Feature dtype
+
+    """
+
+    def __init__(self, windows, dtype='float32'):
+        self.windows = windows
+        self.dtype = dtype
+        self.np = windows.np
+        self.tail = None
+
+    def push(self, samples):
+        """Adds one sample (1-D, one value per input column) or several samples (2-D) of the input series.
+
+        Returns
+        -------
+        numpy.ndarray
+            (rows, width) features of every pushed sample with a complete window, oldest first;
+            empty until history samples have arrived
+        """
+        np = self.np
+        x = np.asarray(samples)
+        if x.ndim == 0:
+            x = x.reshape(1, 1)
+        elif x.ndim == 1:
+            x = x[np.newaxis]
+        if x.shape[1] != len(self.windows.inputs):
+            raise Exception('Expected ' + str(len(self.windows.inputs)) + ' input columns, got ' + str(x.shape[1]))
+        if self.tail is not None and len(self.tail):
+            x = np.concatenate([self.tail, x])
+        keep = self.windows.history - 1
+        self.tail = x[max(0, len(x) - keep):].copy() if keep else x[:0].copy()
+        return self.windows.transform_inputs(x, dtype=self.dtype)
+
+    def reset(self):
+        self.tail = None
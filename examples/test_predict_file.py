@@ -1,29 +1,11 @@
-from blackfox import BlackFox, PredictionFileConfig, Range
+from blackfox import predict_file
 
-blackfox_url = 'http://147.91.204.14:32701'
-bf = BlackFox(blackfox_url)
-
-config = PredictionFileConfig(
-    input_ranges=[
-        Range(min=0, max=1),
-        Range(min=0, max=1),
-        Range(min=0, max=1),
-        Range(min=0, max=1),
-        Range(min=0, max=1),
-        Range(min=0, max=1),
-        Range(min=0, max=1),
-        Range(min=0, max=1),
-        Range(min=0, max=1)
-    ],
-    output_ranges=[
-        Range(min=0, max=1),
-        Range(min=0, max=1)
-    ]
-)
-
-bf.predict_from_file_keras(
-    config,
-    'data/optimized_network_cancer.h5',
+# model saved by test_optimize_sync_onnx.py, with integrated scaler;
+# the model file is loaded through the process-wide model pool
+stats = predict_file(
+    'data/optimized_network_cancer.onnx',
     'data/cancer_test_set_input.csv',
     'data/cancer_predict.csv'
 )
+
+print(stats)
@@ -0,0 +1,14 @@
+from blackfox import OnnxPredictor, predict_file
+
+# model saved by test_optimize_sync_onnx.py, with integrated scaler;
+# one ONNX Runtime thread per compute thread keeps every core busy without oversubscription
+predictor = OnnxPredictor('data/optimized_network_cancer.onnx', batch_size=65536, intra_op_threads=1)
+
+stats = predict_file(
+    predictor,
+    'data/cancer_test_set_input.csv',
+    'data/cancer_predict.csv',
+    chunk_rows=65536
+)
+
+print(stats)
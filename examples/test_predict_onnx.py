@@ -0,0 +1,17 @@
+from blackfox import OnnxPredictor
+import csv
+
+input_columns = 9
+input_set = []
+
+with open('data/cancer_training_set.csv') as csv_file:
+    csv_reader = csv.reader(csv_file, delimiter=',')
+    next(csv_reader)
+    for row in csv_reader:
+        input_set.append(list(map(float, row))[:input_columns])
+
+# model saved by test_optimize_sync_onnx.py, with integrated scaler
+predictor = OnnxPredictor('data/optimized_network_cancer.onnx', batch_size=4096, intra_op_threads=4)
+result = predictor.predict(input_set)
+
+print(result[:10])
@@ -21,7 +21,7 @@ VERSION = "5.0.0"
 # prerequisite: setuptools
 # http://pypi.python.org/pypi/setuptools
 
-REQUIRES = ["urllib3 >= 1.15", "six >= 1.10", "certifi", "python-dateutil", "blackfox-restapi >= 5.0.0, < 5.1.0"]
+REQUIRES = ["urllib3 >= 1.26", "six >= 1.10", "certifi", "python-dateutil", "blackfox-restapi >= 5.0.0, < 5.1.0"]
 
 setup(
     name=NAME,
@@ -0,0 +1,47 @@
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from blackfox import BlackFox
+from blackfox.retry import RetryPolicy
+from blackfox.simulator import Simulator
+
+
+class TestApiClient(unittest.TestCase):
+
+    def setUp(self):
+        self.simulator = Simulator().start()
+        self.addCleanup(self.simulator.stop)
+
+    def test_pool_sizes(self):
+        with BlackFox(self.simulator.url, num_pools=2, pool_maxsize=7) as bf:
+            pool_manager = bf.client.rest_client.pool_manager
+            self.assertEqual(pool_manager.connection_pool_kw['maxsize'], 7)
+            self.assertIsNotNone(bf.info_api.get())
+
+    def test_redirects_are_followed(self):
+        target = self.simulator.url
+
+        class Redirect(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self.send_response(307)
+                self.send_header('Location', target + self.path)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Redirect)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = 'http://127.0.0.1:%d' % server.server_address[1]
+        with BlackFox(url, retry_policy=RetryPolicy(max_attempts=1)) as bf:
+            self.assertEqual(bf.info_api.get().version, self.simulator.service.version)
+
+
+if __name__ == '__main__':
+    unittest.main()
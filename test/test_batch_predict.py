@@ -0,0 +1,66 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from blackfox.batch_predict import iter_csv_chunks, predict_file
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class _SumPredictor(object):
+    """Predicts the sum of every row."""
+
+    preprocessor = None
+
+    def predict(self, rows):
+        return numpy.asarray(rows, dtype=numpy.float64).sum(axis=1)
+
+
+@unittest.skipIf(numpy is None, 'numpy is needed')
+class TestBatchPredict(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.input_path = os.path.join(self.dir, 'input.csv')
+        with open(self.input_path, 'w') as f:
+            f.write('1,2,3\n4,5,6\n7,8,9\n')
+
+    def __without_pandas(self):
+        # the csv module fallback is used when pandas cannot be imported
+        pandas = sys.modules.get('pandas')
+        sys.modules['pandas'] = None
+        if pandas is not None:
+            self.addCleanup(sys.modules.__setitem__, 'pandas', pandas)
+        else:
+            self.addCleanup(sys.modules.pop, 'pandas')
+
+    def test_headerless_input(self):
+        output_path = os.path.join(self.dir, 'output.csv')
+        stats = predict_file(_SumPredictor(), self.input_path, output_path, chunk_rows=2, columns=[0, 2],
+                             header=False, threads=2)
+        self.assertEqual(stats['rows'], 3)
+        numpy.testing.assert_allclose(numpy.loadtxt(output_path, delimiter=','), [4.0, 10.0, 16.0])
+
+    def test_headerless_input_without_pandas(self):
+        self.__without_pandas()
+        chunks = list(iter_csv_chunks(self.input_path, chunk_rows=2, columns=[2, 0], header=False))
+        numpy.testing.assert_allclose(numpy.concatenate(chunks), [[3, 1], [6, 4], [9, 7]])
+
+    def test_named_columns_need_a_header(self):
+        self.__without_pandas()
+        with self.assertRaises(ValueError):
+            list(iter_csv_chunks(self.input_path, columns=['a'], header=False))
+        output_path = os.path.join(self.dir, 'output.csv')
+        with self.assertRaises(ValueError):
+            predict_file(_SumPredictor(), self.input_path, output_path, columns=['a'], header=False)
+        self.assertFalse(os.path.exists(output_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
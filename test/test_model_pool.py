@@ -0,0 +1,66 @@
+import pickle
+import unittest
+
+from blackfox import BlackFox
+from blackfox.model_pool import ModelPool
+from blackfox.simulator import SimulatedService, Simulator
+
+try:
+    import numpy
+    from sklearn.linear_model import LinearRegression
+except ImportError:
+    numpy = None
+
+
+class _RawModelService(SimulatedService):
+    """Serves uploaded models unchanged, whatever the requested model type."""
+
+    def _model_download(self, params, query, body, headers):
+        data = self.models[params['engine']].get(params['id'])
+        if data is None:
+            return 404, {}, b''
+        return 200, {'Content-Type': 'application/octet-stream'}, data
+
+
+@unittest.skipIf(numpy is None, 'numpy and scikit-learn are needed')
+class TestModelPool(unittest.TestCase):
+
+    def setUp(self):
+        x = numpy.array([[0.0, 1.0], [1.0, 0.0], [2.0, 1.0], [3.0, 2.0]])
+        self.estimator = LinearRegression().fit(x, x[:, 0] + 2 * x[:, 1])
+        self.simulator = Simulator(service=_RawModelService()).start()
+        self.bf = BlackFox(self.simulator.url)
+        self.pool = ModelPool()
+
+    def tearDown(self):
+        self.pool.close()
+        self.bf.close()
+        self.simulator.stop()
+
+    def test_get_predictor_with_feature_selection(self):
+        model_id = self.bf.rf_model_api.upload(file=self.__model_file())
+        rows = [[0.0, 9.0, 1.0], [2.0, 9.0, 1.0]]
+        predictor = self.bf.get_predictor(model_id, 'random_forest', feature_selection=[True, False, True],
+                                          pool=self.pool)
+        numpy.testing.assert_allclose(predictor.predict(rows), [2.0, 4.0])
+        # the same options hit the pooled predictor
+        again = self.bf.get_predictor(model_id, 'random_forest', feature_selection=[True, False, True],
+                                      pool=self.pool)
+        self.assertIs(again, predictor)
+        self.assertEqual(self.pool.stats()['hits'], 1)
+        other = self.bf.get_predictor(model_id, 'random_forest', feature_selection=[True, True, False],
+                                      pool=self.pool)
+        self.assertIsNot(other, predictor)
+
+    def __model_file(self):
+        import os
+        import tempfile
+        fd, path = tempfile.mkstemp(suffix='.bin')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(self.estimator, f)
+        self.addCleanup(os.remove, path)
+        return path
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+
+from blackfox import AnnOptimizationConfig, BlackFox, RnnOptimizationConfig
+from blackfox.retry import OutageBudget, RetryPolicy
+from blackfox.simulator import SimulatedService, Simulator
+from blackfox_restapi.rest import ApiException
+
+
+class _FailingStatusService(SimulatedService):
+    """Answers status requests with a fixed error status."""
+
+    def __init__(self, status, **kwargs):
+        super(_FailingStatusService, self).__init__(**kwargs)
+        self.status = status
+
+    def _status(self, params, query, body, headers):
+        return self.status, {'Content-Type': 'application/json'}, b'{"title": "Failed"}'
+
+
+class TestRetry(unittest.TestCase):
+
+    def test_server_errors_are_described_with_their_status(self):
+        e = ApiException(status=503, reason='Service Unavailable')
+        self.assertEqual(OutageBudget(1, RetryPolicy()).describe(e), 'Server Error 503, retrying: Service Unavailable')
+
+    def test_internal_server_error_is_not_transient(self):
+        policy = RetryPolicy()
+        self.assertFalse(policy.is_transient(ApiException(status=500)))
+        self.assertTrue(policy.is_transient(ApiException(status=503)))
+        self.assertFalse(OutageBudget(600, policy).tolerate(ApiException(status=500)))
+
+    def __stop(self, status, outage_budget):
+        simulator = Simulator(service=_FailingStatusService(status)).start()
+        self.addCleanup(simulator.stop)
+        with BlackFox(simulator.url, retry_policy=RetryPolicy(max_attempts=1, backoff_base=0.001),
+                      outage_budget=outage_budget) as bf:
+            id = bf.ann_optimization_api.start(ann_optimization_config=AnnOptimizationConfig())
+            with self.assertRaises(Exception) as raised:
+                bf.stop_ann_optimization(id)
+        self.assertIn('was asked to stop, but its status could not be read', str(raised.exception))
+
+    def test_stop_returns_the_last_status(self):
+        simulator = Simulator(generation_seconds=60).start()
+        self.addCleanup(simulator.stop)
+        with BlackFox(simulator.url) as bf:
+            id = bf.ann_optimization_api.start(ann_optimization_config=AnnOptimizationConfig())
+            self.assertNotEqual(bf.stop_ann_optimization(id).state, 'Active')
+            id = bf.rnn_optimization_api.start(rnn_optimization_config=RnnOptimizationConfig())
+            self.assertNotEqual(bf.stop_rnn_optimization(id).state, 'Active')
+
+    def test_stop_raises_on_server_error(self):
+        self.__stop(500, outage_budget=600)
+
+    def test_stop_raises_after_outage_budget(self):
+        self.__stop(503, outage_budget=0.05)
+
+
+if __name__ == '__main__':
+    unittest.main()
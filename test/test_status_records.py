@@ -0,0 +1,45 @@
+import time
+import unittest
+
+from blackfox import AnnOptimizationConfig, BlackFox
+from blackfox.simulator import Simulator
+from blackfox.status_records import StatusRecord
+from blackfox_restapi.models.ann_optimization_status import AnnOptimizationStatus
+
+
+class TestStatusRecords(unittest.TestCase):
+
+    def setUp(self):
+        self.simulator = Simulator(generation_seconds=0.01, total_generations=2).start()
+        self.addCleanup(self.simulator.stop)
+
+    def __statuses(self, **kwargs):
+        with BlackFox(self.simulator.url, **kwargs) as bf:
+            data_set_id = bf.data_set_api.upload(file=self.__data_set())
+            id = bf.ann_optimization_api.start(
+                ann_optimization_config=AnnOptimizationConfig(dataset_id=data_set_id))
+            time.sleep(0.05)
+            return bf.get_ann_optimization_status(id)
+
+    def __data_set(self):
+        import os
+        import tempfile
+        fd, path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(fd, 'w') as f:
+            f.write('column_0,column_1\n0.1,0.2\n0.3,0.4\n')
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_generated_models_by_default(self):
+        statuses = self.__statuses()
+        self.assertTrue(statuses)
+        self.assertIsInstance(statuses[-1], AnnOptimizationStatus)
+
+    def test_compact_statuses(self):
+        statuses = self.__statuses(compact_statuses=True)
+        self.assertIsInstance(statuses[-1], StatusRecord)
+        self.assertIn(statuses[-1].to_dict()['state'], ('Active', 'Finished'))
+
+
+if __name__ == '__main__':
+    unittest.main()